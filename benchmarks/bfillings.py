@@ -0,0 +1,103 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from os.path import join
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from micronota.bfillings import prodigal, diamond
+
+from . import synthetic
+
+
+class ProdigalParseFaa(object):
+    params = ([1000, 10000, 100000], [1, 100])
+    param_names = ['genes', 'contigs']
+
+    def setup(self, n, seqs):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'prodigal.faa')
+        synthetic.write_faa(self.fp, n, seqs)
+
+    def teardown(self, n, seqs):
+        rmtree(self.tmp)
+
+    def time_parse_faa(self, n, seqs):
+        for _ in prodigal.FeaturePred._parse_faa(self.fp):
+            pass
+
+
+class DiamondParseTabular(object):
+    params = [1000, 10000, 100000]
+    param_names = ['queries']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'hits.diamond')
+        queries = [i for i, _ in synthetic.proteins(n)]
+        synthetic.write_tabular(self.fp, queries)
+
+    def teardown(self, n):
+        rmtree(self.tmp)
+
+    def time_parse_tabular(self, n):
+        diamond.FeatureAnnt.parse_tabular(self.fp)
+
+    def time_parse_tabular_top(self, n):
+        diamond.FeatureAnnt.parse_tabular(self.fp, top=None, within=10)
+
+
+class DiamondParseSam(object):
+    params = [1000, 10000, 100000]
+    param_names = ['alignments']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'hits.sam')
+        synthetic.write_sam(self.fp, n)
+
+    def teardown(self, n):
+        rmtree(self.tmp)
+
+    def time_parse_sam(self, n):
+        diamond.FeatureAnnt.parse_sam(self.fp)
+
+
+class _FeatureAnnt(diamond.FeatureAnnt):
+    '''DIAMOND is stubbed out: the search results are written in setup.'''
+    def run_blast(self, *args, **kwargs):
+        pass
+
+    def run_view(self, *args, **kwargs):
+        pass
+
+
+class DiamondCascade(object):
+    '''The bookkeeping of the cascade search over the partitions.'''
+    params = ([1000, 10000], [2, 10])
+    param_names = ['queries', 'databases']
+
+    def setup(self, n, dbs):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'query.fa')
+        records = synthetic.proteins(n)
+        synthetic.write_fasta(self.fp, records)
+        self.dat = ['db%d' % i for i in range(dbs)]
+        # each query hits only one of the databases
+        for k, db in enumerate(self.dat):
+            synthetic.write_tabular(
+                join(self.tmp, '%s.diamond' % db),
+                [id for i, (id, _) in enumerate(records) if i % dbs == k],
+                seed=k)
+
+    def teardown(self, n, dbs):
+        rmtree(self.tmp)
+
+    def time_annotate_fp(self, n, dbs):
+        obj = _FeatureAnnt(self.dat, self.tmp, join(self.tmp, 'tmp'))
+        obj._annotate_fp(self.fp)
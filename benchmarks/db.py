@@ -0,0 +1,78 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from os.path import join
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from micronota.db import _uniref
+from micronota.db.tigrfam import _read_info
+
+from . import synthetic
+
+
+class TigrfamReadInfo(object):
+    params = [1000, 100000]
+    param_names = ['lines']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'TIGR00001.INFO')
+        synthetic.write_info(self.fp, n)
+
+    def teardown(self, n):
+        rmtree(self.tmp)
+
+    def time_read_info(self, n):
+        for _ in _read_info(self.fp):
+            pass
+
+
+class UnirefCreateMetadata(object):
+    params = [1000, 10000]
+    param_names = ['entries']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        self.fps = [join(self.tmp, 'sprot.xml.gz'),
+                    join(self.tmp, 'trembl.xml.gz')]
+        synthetic.write_uniprot_xml(self.fps[0], n // 2)
+        synthetic.write_uniprot_xml(
+            self.fps[1], n - n // 2, dataset='TrEMBL', start=n // 2)
+        self.db_fp = join(self.tmp, 'uniprotkb.db')
+
+    def teardown(self, n):
+        rmtree(self.tmp)
+
+    def time_create_metadata(self, n):
+        _uniref.create_metadata(self.fps, self.db_fp, force=True)
+
+
+class UnirefSort(object):
+    params = [1000, 10000]
+    param_names = ['sequences']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        xml_fp = join(self.tmp, 'sprot.xml.gz')
+        synthetic.write_uniprot_xml(xml_fp, n)
+        self.db_fp = join(self.tmp, 'uniprotkb.db')
+        _uniref.create_metadata([xml_fp], self.db_fp)
+        self.uniref_fp = join(self.tmp, 'uniref100.fasta')
+        synthetic.write_uniref(self.uniref_fp, n)
+        # DIAMOND is stubbed out
+        self._make_db = _uniref.make_db
+        _uniref.make_db = lambda fp: None
+
+    def teardown(self, n):
+        _uniref.make_db = self._make_db
+        rmtree(self.tmp)
+
+    def time_sort_uniref(self, n):
+        _uniref.sort_uniref(self.db_fp, self.uniref_fp,
+                            join(self.tmp, 'out'), 100, force=True)
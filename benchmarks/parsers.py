@@ -0,0 +1,66 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from os.path import join
+from tempfile import mkdtemp
+from shutil import rmtree
+
+from micronota.parsers.embl import (
+    _embl_to_generator, read_fields, read_fields_parallel)
+from micronota.parsers.sam import _sam_to_generator, read_table
+
+from . import synthetic
+
+
+class EMBL(object):
+    params = [100, 1000, 10000]
+    param_names = ['records']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'uniprot.embl')
+        synthetic.write_embl(self.fp, n)
+
+    def teardown(self, n):
+        rmtree(self.tmp)
+
+    def time_read(self, n):
+        for _ in _embl_to_generator(self.fp):
+            pass
+
+    def time_read_fields(self, n):
+        for _ in read_fields(self.fp):
+            pass
+
+    def time_read_fields_sequence(self, n):
+        for _ in read_fields(self.fp, sequence=True):
+            pass
+
+    def time_read_fields_parallel(self, n):
+        for _ in read_fields_parallel(self.fp, chunk_size=1 << 20):
+            pass
+
+
+class SAM(object):
+    params = [100, 1000, 10000]
+    param_names = ['records']
+
+    def setup(self, n):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'hits.sam')
+        synthetic.write_sam(self.fp, n)
+
+    def teardown(self, n):
+        rmtree(self.tmp)
+
+    def time_read(self, n):
+        for _ in _sam_to_generator(self.fp):
+            pass
+
+    def time_read_table(self, n):
+        read_table(self.fp, tags=['AS', 'ZE'])
@@ -0,0 +1,189 @@
+r'''
+Synthetic inputs
+================
+
+Deterministic generators of the inputs for the benchmarks. The same seed
+and size always give the same content, so the timings of different
+commits are comparable.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import gzip
+from random import Random
+
+
+_AA = 'ACDEFGHIKLMNPQRSTVWY'
+_NT = 'ACGT'
+_KINGDOMS = ['Bacteria', 'Archaea', 'Viruses', 'Eukaryota', 'other']
+
+
+def rng(seed=0):
+    return Random(seed)
+
+
+def protein(r, length):
+    return ''.join(r.choice(_AA) for _ in range(length))
+
+
+def dna(r, length):
+    return ''.join(r.choice(_NT) for _ in range(length))
+
+
+def write_faa(fp, n, seqs=1, seed=0):
+    '''Write a Prodigal protein output of ``n`` genes on ``seqs`` contigs.'''
+    r = rng(seed)
+    per_seq = -(-n // seqs)
+    with open(fp, 'w') as f:
+        for i in range(n):
+            ordinal, j = divmod(i, per_seq)
+            start = j * 300 + 1
+            end = start + 299
+            strand = 1 if i % 2 else -1
+            f.write('>contig%d_%d # %d # %d # %d # ID=%d_%d;partial=00;'
+                    'start_type=ATG;rbs_motif=None;rbs_spacer=None;'
+                    'gc_cont=0.500\n' % (
+                        ordinal + 1, j + 1, start, end, strand,
+                        ordinal + 1, j + 1))
+            f.write(protein(r, 99))
+            f.write('\n')
+
+
+def write_fasta(fp, records):
+    '''Write (ID, sequence) pairs in fasta format.'''
+    with open(fp, 'w') as f:
+        for id, seq in records:
+            f.write('>%s\n%s\n' % (id, seq))
+
+
+def proteins(n, redundancy=0.0, seed=0):
+    '''Return ``n`` (ID, protein) pairs.
+
+    ``redundancy`` is the fraction of the proteins that are copies of
+    the earlier ones.
+    '''
+    r = rng(seed)
+    res = []
+    for i in range(n):
+        if res and r.random() < redundancy:
+            seq = r.choice(res)[1]
+        else:
+            seq = protein(r, 99)
+        res.append(('%d_%d' % (i // 1000 + 1, i % 1000 + 1), seq))
+    return res
+
+
+def write_tabular(fp, queries, hits=5, seed=0):
+    '''Write DIAMOND tabular output with ``hits`` hits per query.'''
+    r = rng(seed)
+    with open(fp, 'w') as f:
+        for q in queries:
+            for _ in range(hits):
+                bitscore = round(r.uniform(30, 500), 1)
+                f.write('\t'.join(str(i) for i in [
+                    q, 'UniRef100_P%05d' % r.randrange(100000),
+                    round(r.uniform(30, 100), 1), 99, r.randrange(20),
+                    r.randrange(5), 1, 99, 1, 99,
+                    '%.1e' % r.uniform(1e-50, 1e-3), bitscore]))
+                f.write('\n')
+
+
+def features(n, seed=0):
+    '''Return ``n`` CDS features and their intervals.'''
+    from skbio.metadata import Feature
+    im = {}
+    for i, (id, seq) in enumerate(proteins(n, seed=seed)):
+        start = i * 300
+        im[Feature(type_='CDS', id=id, translation=seq,
+                   location='%d..%d' % (start + 1, start + 300))] = [
+                       (start, start + 300)]
+    return im
+
+
+def write_embl(fp, n, seed=0):
+    '''Write ``n`` UniProtKB records in EMBL format.'''
+    r = rng(seed)
+    with open(fp, 'w') as f:
+        for i in range(n):
+            seq = protein(r, r.randrange(100, 500))
+            f.write(
+                'ID   P%05d_SYNTH              Reviewed;         %d AA.\n'
+                'AC   P%05d;\n'
+                'DE   RecName: Full=Synthetic protein %d;\n'
+                'OS   Escherichia coli.\n'
+                'OC   Bacteria; Proteobacteria; Gammaproteobacteria.\n'
+                'OX   NCBI_TaxID=562;\n'
+                'DR   EMBL; AY%06d; AAT%05d.1; -; Genomic_DNA.\n'
+                'DR   Pfam; PF%05d; Synth; 1.\n'
+                'PE   4: Predicted;\n'
+                'KW   Complete proteome; Reference proteome;\n'
+                'SQ   SEQUENCE   %d AA;  29735 MW;  B4840739BF7D4121 CRC64;'
+                '\n' % (i, len(seq), i, i, i, i, i, len(seq)))
+            for j in range(0, len(seq), 60):
+                line = seq[j:j+60]
+                f.write('     %s\n' % ' '.join(
+                    line[k:k+10] for k in range(0, len(line), 10)))
+            f.write('//\n')
+
+
+def write_sam(fp, n, seed=0):
+    '''Write ``n`` DIAMOND alignments in SAM format.'''
+    r = rng(seed)
+    with open(fp, 'w') as f:
+        f.write('@HD\tVN:1.5\tSO:query\n'
+                '@PG\tPN:DIAMOND\n'
+                '@mm\tBlastX\n'
+                '@CO\tBlastX-like alignments\n')
+        for i in range(n):
+            seq = protein(r, r.randrange(100, 300))
+            f.write('\t'.join([
+                'WP_%09d.1' % i, '0', 'UniRef100_P%05d' % r.randrange(100000),
+                '1', '255', '%dM' % len(seq), '*', '0', '0', seq, '*',
+                'AS:i:%d' % r.randrange(50, 600), 'NM:i:%d' % r.randrange(10),
+                'ZL:i:%d' % len(seq), 'ZR:i:%d' % r.randrange(100, 2000),
+                'ZE:f:%.1e' % r.uniform(1e-100, 1e-3),
+                'ZI:i:%d' % r.randrange(30, 100), 'ZF:i:1', 'ZS:i:1',
+                'MD:Z:%d' % len(seq)]))
+            f.write('\n')
+
+
+def write_info(fp, n, seed=0):
+    '''Write a TIGRFAM INFO file of ``n`` lines.'''
+    r = rng(seed)
+    lines = ['AC  TIGR%05d', 'ID  synth_%d', 'DE  synthetic family %d',
+             'TC  %d.00 %d.00', 'NC  %d.00 %d.00', 'EC  1.1.1.%d 2.2.2.%d',
+             'RM  PMID: %d', 'CC  comment %d', 'GS  gene%d']
+    with open(fp, 'w') as f:
+        for i in range(n):
+            line = r.choice(lines)
+            f.write(line % ((i,) * line.count('%')))
+            f.write('\n')
+
+
+def write_uniprot_xml(fp, n, dataset='Swiss-Prot', start=0, seed=0):
+    '''Write ``n`` gzipped UniProtKB XML entries.'''
+    r = rng(seed)
+    with gzip.open(fp, 'wt') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<uniprot xmlns="http://uniprot.org/uniprot" '
+                'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">\n')
+        for i in range(start, start + n):
+            f.write('<entry dataset="%s"><accession>P%05d</accession>'
+                    '<organism><lineage><taxon>%s</taxon>'
+                    '<taxon>Proteobacteria</taxon></lineage></organism>'
+                    '</entry>\n' % (dataset, i, r.choice(_KINGDOMS[:4])))
+        f.write('</uniprot>\n')
+
+
+def write_uniref(fp, n, resolution=100, seed=0):
+    '''Write ``n`` UniRef sequences of accessions P00000 to P{n-1}.'''
+    r = rng(seed)
+    write_fasta(fp, (('UniRef%d_P%05d' % (resolution, i),
+                      protein(r, r.randrange(100, 300))) for i in range(n)))
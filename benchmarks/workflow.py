@@ -0,0 +1,58 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from os.path import join
+from tempfile import mkdtemp
+from shutil import rmtree
+
+import pandas as pd
+
+from micronota.workflow import _update, _write_cds, _dedup
+
+from . import synthetic
+
+
+class Update(object):
+    params = [1000, 10000, 100000]
+    param_names = ['features']
+
+    def setup(self, n):
+        self.im = synthetic.features(n)
+        # half of the proteins have a hit
+        ids = [f['id'] for f in self.im][::2]
+        self.res = pd.DataFrame({'sseqid': ids}, index=ids)
+
+    def time_update(self, n):
+        _update(dict(self.im), 'id', self.res)
+
+
+class WriteCds(object):
+    params = ([1000, 10000, 100000], ['', '.gz'])
+    param_names = ['proteins', 'suffix']
+
+    def setup(self, n, suffix):
+        self.tmp = mkdtemp()
+        self.fp = join(self.tmp, 'cds.fa' + suffix)
+        self.cds = synthetic.proteins(n)
+
+    def teardown(self, n, suffix):
+        rmtree(self.tmp)
+
+    def time_write_cds(self, n, suffix):
+        _write_cds(self.fp, self.cds)
+
+
+class Dedup(object):
+    params = ([10000, 100000], [0.0, 0.5])
+    param_names = ['proteins', 'redundancy']
+
+    def setup(self, n, redundancy):
+        self.cds = synthetic.proteins(n, redundancy)
+
+    def time_dedup(self, n, redundancy):
+        _dedup(self.cds)
@@ -6,9 +6,5 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
-# import the parsers so they are available
-from .parsers import embl  # noqa
-
-
 __credits__ = "https://github.com/biocore/micronota/graphs/contributors"
 __version__ = "0.1.0.dev0"
@@ -22,6 +22,15 @@ class SubclassImplementError(Exception):
         super().__init__('%s: %s' % (message, cls))
 
 
+def _tmp_dir(obj):
+    '''Create the temp dir only when it is needed.'''
+    if obj._tmp_dir is None:
+        obj._tmp_dir = mkdtemp(prefix='tmp', dir=obj.out_dir)
+    else:
+        makedirs(obj._tmp_dir, exist_ok=True)
+    return obj._tmp_dir
+
+
 class IntervalMetadataPred(metaclass=ABCMeta):
     '''
     Attributes
@@ -33,7 +42,8 @@ class IntervalMetadataPred(metaclass=ABCMeta):
     out_dir : str
         output directory
     tmp_dir : str
-        temp directory
+        temp directory. It is created inside ``out_dir`` on first use
+        if it is not given.
     '''
     @classmethod
     def __subclasshook__(cls, C):
@@ -51,11 +61,11 @@ class IntervalMetadataPred(metaclass=ABCMeta):
         self.out_dir = out_dir
         # create dir if not exist
         makedirs(self.out_dir, exist_ok=True)
-        if tmp_dir is None:
-            self.tmp_dir = mkdtemp(prefix='tmp', dir=out_dir)
-        else:
-            self.tmp_dir = tmp_dir
-        makedirs(self.tmp_dir, exist_ok=True)
+        self._tmp_dir = tmp_dir
+
+    @property
+    def tmp_dir(self):
+        return _tmp_dir(self)
 
     def __call__(self, input, **kwargs) -> dict:
         '''Identify features for the input.
@@ -102,7 +112,8 @@ class MetadataPred(metaclass=ABCMeta):
     out_dir : str
         output directory
     tmp_dir : str
-        temp directory
+        temp directory. It is created inside ``out_dir`` on first use
+        if it is not given.
     '''
     @classmethod
     def __subclasshook__(cls, C):
@@ -120,11 +131,11 @@ class MetadataPred(metaclass=ABCMeta):
         self.out_dir = out_dir
         # create dir if not exist
         makedirs(self.out_dir, exist_ok=True)
-        if tmp_dir is None:
-            self.tmp_dir = mkdtemp(prefix='tmp', dir=out_dir)
-        else:
-            self.tmp_dir = tmp_dir
-        makedirs(self.tmp_dir, exist_ok=True)
+        self._tmp_dir = tmp_dir
+
+    @property
+    def tmp_dir(self):
+        return _tmp_dir(self)
 
     def __call__(self, input, **kwargs):
         '''
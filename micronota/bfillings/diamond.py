@@ -6,10 +6,11 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from os import stat
 from os.path import join, basename, splitext
 from logging import getLogger
+from time import time
 
+import numpy as np
 import pandas as pd
 from burrito.parameters import FlagParameter, ValuedParameter
 from burrito.util import (
@@ -18,6 +19,9 @@ from skbio import read
 
 from .util import _get_parameter
 from ._base import MetadataPred
+from ..util import _open
+from ..parsers.sam import iter_alignments, parse_tags, SAMFormatError
+from ..report import stage
 
 
 _OPTIONS_FLAG = {
@@ -151,6 +155,90 @@ class DiamondView(Diamond):
         ['--daa', '--out', '--outfmt', '--forwardonly']}
 
 
+# the default criteria to rank the hits of a query and the columns that
+# are better when lower
+_RANK = ['bitscore', 'evalue', 'pident']
+_ASCENDING = {'evalue', 'mismatch', 'gapopen', 'priority'}
+
+
+def _criteria(column):
+    '''Return the ranking columns with ``column`` as the 1st one.'''
+    if isinstance(column, str):
+        column = [column] + [i for i in _RANK if i != column]
+    return list(column), [i in _ASCENDING for i in column]
+
+
+def rank_hits(df, by=_RANK, ascending=None, top=1, within=None,
+              query='qseqid'):
+    '''Rank the hits of each query by multiple criteria.
+
+    The hits are sorted by the columns in ``by`` with the 1st as the
+    primary key; ties that remain are kept in their original order. It
+    is vectorized with ``numpy.lexsort`` instead of grouping the hits in
+    Python, and only the hits that can be kept are sorted.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The hits, one per row.
+    by : list of str
+        The numeric columns to rank the hits by, e.g. "bitscore", then
+        "evalue", then "pident", or "priority" of the partition.
+    ascending : list of bool or None
+        Whether each column in ``by`` is better when lower. By default
+        it is True for e-value, mismatch, gapopen and priority.
+    top : int or None
+        Keep the ``top`` best hits of each query. ``None`` keeps all.
+    within : float or None
+        Keep the hits whose ``by[0]`` score is within this percentage of
+        the best score of the query, like the ``--top`` option of diamond.
+    query : str
+        The column (or the index if it is not a column) of query IDs.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The kept hits indexed by query, grouped in the order of the
+        first occurrence of each query and sorted from the best.
+    '''
+    by = list(by)
+    if ascending is None:
+        ascending = [i in _ASCENDING for i in by]
+    if query in df.columns:
+        df = df.set_index(query)
+    n = len(df)
+    if n == 0:
+        return df
+    codes, _ = pd.factorize(df.index)
+    # only the hits that can be kept are sorted: with the best primary
+    # score of their query for top 1, or within the range of it
+    if top == 1 or within is not None:
+        score = df[by[0]].values
+        best = pd.Series(score).groupby(codes).transform(
+            'min' if ascending[0] else 'max').values
+        if within is None:
+            mask = score == best
+        elif ascending[0]:
+            mask = score <= best * (1 + within / 100)
+        else:
+            mask = score >= best * (1 - within / 100)
+        rows = np.flatnonzero(mask)
+        df = df.iloc[rows]
+        codes = codes[rows]
+        n = len(rows)
+    # lexsort sorts by the last key first
+    keys = [df[c].values if asc else -df[c].values
+            for c, asc in zip(reversed(by), reversed(ascending))]
+    keys.append(codes)
+    order = np.lexsort(keys)
+    if top is not None:
+        codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+        order = order[rank < top]
+    return df.iloc[order]
+
+
 def make_db(in_fp, out_fp=None, params=None):
     '''Format database from a fasta file.
 
@@ -188,11 +276,19 @@ class FeatureAnnt(MetadataPred):
     ----------
     dat : list of str
         list of file path to databases.
+    cache : ``micronota.residency.DBResidency`` or None
+        It keeps the databases resident in memory. The next database is
+        loaded while the current one is searched.
+    searched : list of dict
+        The ``partition`` (i.e. database name), the number of
+        ``queries`` and ``hits`` and the ``seconds`` of each database
+        searched in the last run.
     '''
     def __init__(self, dat, out_dir, tmp_dir=None, cache=None):
         super().__init__(dat, out_dir, tmp_dir)
         self.cache = cache
         self.dat = dat
+        self.searched = []
 
     def _annotate_fp(self, fp, aligner='blastp', evalue=0.001, cpus=1,
                      outfmt='tab', params=None) -> pd.DataFrame:
@@ -200,28 +296,52 @@ class FeatureAnnt(MetadataPred):
 
         Parameters
         ----------
+        outfmt : str
+            The format of the search results, "tab" or "sam". The SAM
+            results also have the details of the best alignments (see
+            ``parse_sam``).
         params : dict-like
             Parameters for diamond blastp/blastx that pass to ``run_blast``.
         '''
         found = []
         res = pd.DataFrame()
-        for db in self.dat:
+        self.searched = []
+        with _open(fp) as f:
+            n = sum(1 for line in f if line.startswith('>'))
+        for i, db in enumerate(self.dat):
             out_prefix = splitext(basename(db))[0]
+            start = time()
+            if self.cache is not None:
+                db = self.cache.resident(db)
+                # loaded while this one is searched; it can't evict this
+                # one, which ``resident`` has pinned
+                self.cache.prefetch(self.dat[i+1:i+2])
             daa_fp = join(self.out_dir, '%s.daa' % out_prefix)
-            out_fp = join(self.out_dir, '%s.diamond' % out_prefix)
+            if outfmt == 'sam':
+                out_fp = join(self.out_dir, '%s.sam' % out_prefix)
+                parse = self.parse_sam
+            else:
+                out_fp = join(self.out_dir, '%s.diamond' % out_prefix)
+                parse = self.parse_tabular
             self.run_blast(fp, daa_fp, db, aligner=aligner,
                            evalue=evalue, cpus=cpus, params=params)
             self.run_view(daa_fp, out_fp, params={'--outfmt': outfmt})
-            res = res.append(self.parse_tabular(out_fp))
+            hits = parse(out_fp)
+            self.searched.append({'partition': out_prefix, 'queries': n,
+                                  'hits': len(hits),
+                                  'seconds': time() - start})
+            res = res.append(hits)
             found.extend(res.index)
             # save to a tmp file the seqs that do not hit current database
-            new_fp = join(self.tmp_dir, '%s.fa' % out_prefix)
-            with open(new_fp, 'w') as f:
-                for seq in read(fp, format='fasta'):
+            new_fp = join(self.tmp_dir, '%s.fa.gz' % out_prefix)
+            n = 0
+            with _open(fp) as i_f, _open(new_fp, 'w') as o_f:
+                for seq in read(i_f, format='fasta'):
                     if seq.metadata['id'] not in found:
-                        seq.write(f, format='fasta')
+                        seq.write(o_f, format='fasta')
+                        n += 1
             # no seq left
-            if stat(new_fp).st_size == 0:
+            if n == 0:
                 break
             else:
                 fp = new_fp
@@ -270,7 +390,8 @@ class FeatureAnnt(MetadataPred):
         blast.Parameters['--tmpdir'].on(self.tmp_dir)
 
         logger.info('Running: %s' % blast.BaseCommand)
-        blast_res = blast()
+        with stage('diamond %s' % aligner, db=basename(db)):
+            blast_res = blast()
         blast_res.cleanUp()
         return blast_res
 
@@ -287,21 +408,29 @@ class FeatureAnnt(MetadataPred):
         view = DiamondView(InputHandler='_input_as_paths')
         view.Parameters['--daa'].on(daa_fp)
         view.Parameters['--out'].on(out_fp)
+        if params is not None and '--outfmt' in params:
+            view.Parameters['--outfmt'].on(params['--outfmt'])
         logger.info('Running: %s' % view.BaseCommand)
-        view_res = view()
+        with stage('diamond view'):
+            view_res = view()
         view_res.cleanUp()
         return view_res
 
     @staticmethod
-    def parse_tabular(diamond_res, column='bitscore'):
+    def parse_tabular(diamond_res, column='bitscore', top=1, within=None):
         '''Parse the output of diamond blastp/blastx.
 
         Parameters
         ----------
         diamond_res : str
             file path
-        column : str
-            The column used to pick the best hits.
+        column : str, list of str or None
+            The column used to pick the best hits. The ties are broken by
+            the other columns of bitscore, evalue and pident. It can also
+            be a list of the columns to rank by (see ``rank_hits``). If
+            it is ``None``, all the hits are returned.
+        top, within
+            See ``rank_hits``.
 
         Returns
         -------
@@ -312,15 +441,76 @@ class FeatureAnnt(MetadataPred):
                    'gapopen', 'qstart', 'qend', 'sstart', 'send',
                    'evalue', 'bitscore']
         df = pd.read_table(diamond_res, names=columns)
-        # pick the rows that have highest bitscore for each qseqid
-        # df_max = df.groupby('qseqid').apply(
-        #     lambda r: r[r[column] == r[column].max()])
         if column is not None:
-            idx = df.groupby('qseqid')[column].idxmax()
-            df_max = df.loc[idx]
-            df_max.index = idx.index
-            df = df_max[['sseqid', 'evalue', 'bitscore']]
-        else:
-            df = df[['sseqid', 'evalue', 'bitscore']]
+            by, ascending = _criteria(column)
+            df = rank_hits(df, by, ascending, top=top, within=within)
+        return df[['sseqid', 'evalue', 'bitscore']]
+
+    @staticmethod
+    def parse_sam(diamond_res, column='bitscore'):
+        '''Parse the SAM output of diamond blastp/blastx.
+
+        The alignments are streamed and only the best one of each query
+        is kept, so the memory does not grow with the number of hits.
+
+        Parameters
+        ----------
+        diamond_res : str
+            file path
+        column : str, list of str or None
+            The column used to pick the best hits, "bitscore", "evalue"
+            (the lowest) or "pident", with the ties broken by the other
+            two, or a list of them. If it is ``None``, all the hits are
+            returned.
 
+        Returns
+        -------
+        pandas.DataFrame
+            The best matched records for each query sequence, with the
+            columns of ``parse_tabular`` and the details of the
+            alignment: ``pident``, ``sstart`` and ``qstart`` (1-based),
+            and the ``cigar`` and ``md`` strings. The unmapped queries
+            are left out.
+
+        Raises
+        ------
+        SAMFormatError
+            If an alignment misses the tag of a column to rank the hits
+            by, e.g. the file is not written by DIAMOND.
+        '''
+        columns = ['sseqid', 'evalue', 'bitscore',
+                   'pident', 'sstart', 'qstart', 'cigar', 'md']
+        hits = {} if column is not None else []
+        if column is not None:
+            by, ascending = _criteria(column)
+            idx = [columns.index(i) for i in by]
+            signs = [-1 if i else 1 for i in ascending]
+        with _open(diamond_res) as f:
+            for fields in iter_alignments(f):
+                # DIAMOND also writes the queries without hits as unmapped
+                if int(fields[1]) & 4:
+                    continue
+                # DIAMOND reports bitscore in AS and e-value in ZE
+                tags = parse_tags(fields[11:])
+                row = (fields[2], tags.get('ZE'), tags.get('AS'),
+                       tags.get('ZI'), int(fields[3]), tags.get('ZS'),
+                       fields[5], tags.get('MD'))
+                qseqid = fields[0]
+                if column is None:
+                    hits.append((qseqid, row))
+                    continue
+                if any(row[i] is None for i in idx):
+                    missing = [c for c, i in zip(by, idx) if row[i] is None]
+                    raise SAMFormatError(
+                        'No %s in the alignment of %s to rank the hits by.' % (
+                            ', '.join(missing), qseqid))
+                key = tuple(sign * row[i] for i, sign in zip(idx, signs))
+                best = hits.get(qseqid)
+                if best is None or key > best[0]:
+                    hits[qseqid] = key, row
+        if column is not None:
+            hits = [(k, v) for k, (_, v) in hits.items()]
+        index = [i for i, _ in hits]
+        df = pd.DataFrame([i for _, i in hits], index=index, columns=columns)
+        df.index.name = 'qseqid'
         return df
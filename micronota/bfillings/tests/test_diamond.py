@@ -12,12 +12,15 @@ from os import getcwd
 from os.path import join
 from unittest import TestCase, main
 
+import pandas as pd
+
 from skbio.util import get_data_path
 from burrito.util import ApplicationError
 
 from micronota.util import _get_named_data_path
+from micronota.parsers.sam import SAMFormatError
 from micronota.bfillings.diamond import (
-    DiamondMakeDB, make_db, FeatureAnnt)
+    DiamondMakeDB, make_db, FeatureAnnt, rank_hits)
 
 
 class DiamondTests(TestCase):
@@ -81,5 +84,85 @@ class DiamondBlastTests(DiamondTests):
                     pred(i, aligner=aligner)
 
 
+class DiamondParseTests(TestCase):
+    def setUp(self):
+        self.sam = _get_named_data_path('hits.sam')
+
+    def test_parse_sam(self):
+        obs = FeatureAnnt.parse_sam(self.sam)
+        # the unmapped WP_3 is not a hit
+        self.assertEqual(list(obs.index), ['WP_1', 'WP_2'])
+        self.assertEqual(list(obs['sseqid']),
+                         ['UniRef100_P2', 'UniRef100_P4'])
+        self.assertEqual(list(obs.loc['WP_1']),
+                         ['UniRef100_P2', 3.5e-25, 95, 70, 5, 3,
+                          '40M', '12A27'])
+
+    def test_parse_sam_column(self):
+        obs = FeatureAnnt.parse_sam(self.sam, column='pident')
+        self.assertEqual(obs.loc['WP_1', 'sseqid'], 'UniRef100_P3')
+        obs = FeatureAnnt.parse_sam(self.sam, column='evalue')
+        self.assertEqual(obs.loc['WP_1', 'sseqid'], 'UniRef100_P2')
+
+    def test_parse_sam_all(self):
+        obs = FeatureAnnt.parse_sam(self.sam, column=None)
+        self.assertEqual(list(obs.index), ['WP_1'] * 3 + ['WP_2'])
+
+    def test_parse_sam_missing_tag(self):
+        tmp_dir = mkdtemp()
+        fp = join(tmp_dir, 'hits.sam')
+        with open(self.sam) as f, open(fp, 'w') as out:
+            for line in f:
+                if not line.startswith('@'):
+                    line = '\t'.join(
+                        i for i in line.rstrip('\n').split('\t')
+                        if not i.startswith('ZI:')) + '\n'
+                out.write(line)
+        try:
+            with self.assertRaisesRegex(SAMFormatError, r'No pident in'):
+                FeatureAnnt.parse_sam(fp)
+            # all the alignments are kept as is if they are not ranked
+            obs = FeatureAnnt.parse_sam(fp, column=None)
+            self.assertTrue(obs['pident'].isnull().all())
+        finally:
+            rmtree(tmp_dir)
+
+
+class RankHitsTests(TestCase):
+    def setUp(self):
+        self.hits = pd.DataFrame({
+            'qseqid': ['b', 'a', 'b', 'a', 'b', 'c'],
+            'sseqid': ['u', 'v', 'w', 'x', 'y', 'z'],
+            'bitscore': [10.0, 20, 30, 20, 30, 5],
+            'evalue': [1e-3, 1e-5, 1e-9, 1e-6, 1e-9, 1],
+            'pident': [50, 60, 70, 80, 90, 10]})
+
+    def test_rank_hits(self):
+        obs = rank_hits(self.hits)
+        self.assertEqual(list(obs.index), ['b', 'a', 'c'])
+        # ties of bitscore are broken by evalue and then pident
+        self.assertEqual(list(obs['sseqid']), ['y', 'x', 'z'])
+
+    def test_rank_hits_by(self):
+        obs = rank_hits(self.hits, by=['pident'], ascending=[True])
+        self.assertEqual(list(obs['sseqid']), ['u', 'v', 'z'])
+
+    def test_rank_hits_top(self):
+        obs = rank_hits(self.hits, top=2)
+        self.assertEqual(list(obs.index), ['b', 'b', 'a', 'a', 'c'])
+        self.assertEqual(list(obs['sseqid']), ['y', 'w', 'x', 'v', 'z'])
+
+    def test_rank_hits_within(self):
+        obs = rank_hits(self.hits, top=None, within=50)
+        self.assertEqual(list(obs['sseqid']), ['y', 'w', 'x', 'v', 'z'])
+        obs = rank_hits(self.hits, top=None, within=70)
+        self.assertEqual(list(obs['sseqid']), ['y', 'w', 'u', 'x', 'v', 'z'])
+
+    def test_rank_hits_empty(self):
+        obs = rank_hits(self.hits.iloc[:0])
+        self.assertEqual(len(obs), 0)
+        self.assertIn('sseqid', obs.columns)
+
+
 if __name__ == '__main__':
     main()
@@ -81,9 +81,13 @@ class ComplexCLI(AliasedGroup):
 @click.option('--log', default=None,
               type=click.Path(exists=True, dir_okay=False),
               help='Logging config file.')
+@click.option('--profile', default=None,
+              type=click.Path(dir_okay=False),
+              help=('Profile the command and write the profile into this '
+                    'file. Summarize it with "micronota profile_report".'))
 @click.version_option()   # add --version option
 @click.pass_context
-def cmd(ctx, cfg, param, log):
+def cmd(ctx, cfg, param, log, profile):
     '''Annotation pipeline for Bacterial and Archaeal (meta)genomes.
 
     It predicts features (ncRNA, coding genes, etc.) on the input sequences
@@ -94,5 +98,11 @@ def cmd(ctx, cfg, param, log):
 
     For more info, please check out https://github.com/biocore/micronota.
     '''
+    if profile is not None:
+        from .profiling import Profiler
+        profiler = Profiler()
+        profiler.start()
+        # it is called after the subcommand returns
+        ctx.call_on_close(lambda: profiler.stop(profile))
     # load the config.
     ctx.config = Configuration(misc_fp=cfg, param_fp=param, log_fp=log)
@@ -8,13 +8,11 @@
 
 import click
 
-from ..workflow import annotate
-
 
 @click.command()
 @click.option('-i', '--input_fp', type=click.Path(exists=True, dir_okay=False),
               required=True,
-              help='Input file path.')
+              help='Input file path. It can be gzip/bgzip/zstd compressed.')
 @click.option('--in_fmt', type=click.Choice(['fasta', 'genbank']),
               default='fasta',
               help='The format of input file.')
@@ -24,18 +22,80 @@ from ..workflow import annotate
 @click.option('--out_fmt', type=click.Choice(['gff3', 'genbank']),
               default='genbank',
               help='Output format for the annotated sequences.')
+@click.option('--out_compression',
+              type=click.Choice(['none', 'gzip', 'bgzip', 'zstd']),
+              default='none',
+              help='Compression of the output file.')
 @click.option('--cpus', type=int, default=1,
               help='Number of CPUs to use.')
 @click.option('--kingdom',
-              type=click.Choice(['Bacteria', 'Archaea', 'Viruses']),
+              type=click.Choice(
+                  ['Bacteria', 'Archaea', 'Viruses', 'Eukaryota', 'other']),
               default='Bacteria',
               help='Kingdom of the input sequence organism.')
 @click.option('--force', is_flag=True,
               help='Force overwrite if the output directory exists')
+@click.option('--no_seq', is_flag=True,
+              help='Only write the features without the sequences.')
+@click.option('--keep_intermediates', is_flag=True,
+              help=('Keep the intermediate files of each input sequence '
+                    'in the sqlite files "intermediate_*.db".'))
+@click.option('--scratch_dir', type=click.Path(file_okay=False),
+              default=None,
+              help=('Directory to hold the intermediate files, e.g. '
+                    '/dev/shm or a local disk. It overrides the setting '
+                    'in the config file.'))
+@click.option('--trace', is_flag=True,
+              help=('Write the trace of the stages in Chrome trace event '
+                    'format, in addition to the run report.'))
+@click.option('--adaptive_order', is_flag=True,
+              help=('Search the UniRef partitions in the order learned from '
+                    'previous runs, instead of the fixed order of the '
+                    'kingdom. The annotation can vary between runs.'))
+@click.option('--incremental', is_flag=True,
+              help=('Reuse the results of the previous run into the output '
+                    'directory for the sequences, databases and tool '
+                    'settings that have not changed, and rewrite the '
+                    'output.'))
+@click.option('--resume', is_flag=True,
+              help=('Resume the interrupted run into the output directory '
+                    'from the journal of the completed stages.'))
+@click.option('--dry_run', '--dry-run', 'dry_run', is_flag=True,
+              help=('Print the input size, the tools and the UniRef '
+                    'partitions to search without annotating.'))
+@click.option('--estimate', is_flag=True,
+              help=('Do not run; annotate a sample of the input with '
+                    'the same config and CPUs, and print the estimated '
+                    'wall time per stage and disk usage of the full run.'))
+@click.option('--sample_fraction', type=float, default=0.05,
+              help='Fraction of the input sequence length to sample.')
 @click.pass_context
-def cli(ctx, input_fp, in_fmt, output_dir, out_fmt,
-        cpus, kingdom, force):
+def cli(ctx, input_fp, in_fmt, output_dir, out_fmt, out_compression,
+        cpus, kingdom, force, no_seq, keep_intermediates, scratch_dir, trace,
+        adaptive_order, incremental, resume, dry_run, estimate,
+        sample_fraction):
     '''Annotate prokaryotic genomes.'''
+    # defer the import of skbio, pandas, etc. until the command is run
+    from ..workflow import annotate
+    if out_compression == 'none':
+        out_compression = None
+    if adaptive_order:
+        ctx.parent.config.partition_order = 'adaptive'
+    if dry_run or estimate:
+        from ..estimate import describe, format_estimate
+        from ..estimate import estimate as run_estimate
+        click.echo(describe(input_fp, in_fmt, kingdom, ctx.parent.config))
+        if estimate:
+            est = run_estimate(input_fp, in_fmt, out_fmt, cpus, kingdom,
+                               ctx.parent.config, fraction=sample_fraction,
+                               scratch_dir=scratch_dir, out_seq=not no_seq,
+                               out_compression=out_compression)
+            click.echo(format_estimate(est))
+        return
     annotate(input_fp, in_fmt, output_dir, out_fmt,
              cpus, kingdom, force,
-             ctx.parent.config)
+             ctx.parent.config, out_seq=not no_seq,
+             out_compression=out_compression,
+             keep_intermediates=keep_intermediates,
+             scratch_dir=scratch_dir, trace=trace, incremental=incremental,
+             resume=resume)
@@ -0,0 +1,70 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import click
+
+
+@click.command()
+@click.option('-i', '--input_fp', type=click.Path(exists=True, dir_okay=False),
+              required=True,
+              help=('Manifest file listing the input file paths, one per '
+                    'line. Relative paths are relative to the manifest.'))
+@click.option('--in_fmt', type=click.Choice(['fasta', 'genbank']),
+              default='fasta',
+              help='The format of input files.')
+@click.option('-o', '--output_dir', type=click.Path(file_okay=False),
+              required=True,
+              help='Output directory path.')
+@click.option('--out_fmt', type=click.Choice(['gff3', 'genbank']),
+              default='genbank',
+              help='Output format for the annotated sequences.')
+@click.option('--out_compression',
+              type=click.Choice(['none', 'gzip', 'bgzip', 'zstd']),
+              default='none',
+              help='Compression of the output files.')
+@click.option('--cpus', type=int, default=1,
+              help='Number of CPUs to use.')
+@click.option('--kingdom',
+              type=click.Choice(
+                  ['Bacteria', 'Archaea', 'Viruses', 'Eukaryota', 'other']),
+              default='Bacteria',
+              help='Kingdom of the input sequence organisms.')
+@click.option('--force', is_flag=True,
+              help='Force overwrite if the output directory exists')
+@click.option('--no_seq', is_flag=True,
+              help='Only write the features without the sequences.')
+@click.option('--scratch_dir', type=click.Path(file_okay=False),
+              default=None,
+              help=('Directory to hold the intermediate files, e.g. '
+                    '/dev/shm or a local disk. It overrides the setting '
+                    'in the config file.'))
+@click.option('--trace', is_flag=True,
+              help=('Write the trace of the stages in Chrome trace event '
+                    'format, in addition to the run report.'))
+@click.option('--adaptive_order', is_flag=True,
+              help=('Search the UniRef partitions in the order learned from '
+                    'previous runs, instead of the fixed order of the '
+                    'kingdom. The annotation can vary between runs.'))
+@click.pass_context
+def cli(ctx, input_fp, in_fmt, output_dir, out_fmt, out_compression,
+        cpus, kingdom, force, no_seq, scratch_dir, trace, adaptive_order):
+    '''Annotate many small genomes together.
+
+    The proteins of all the input files are searched in a single run
+    against each database and the annotation of each input file is
+    written into its own output file.'''
+    from ..workflow import annotate_batch, read_batch
+    if out_compression == 'none':
+        out_compression = None
+    if adaptive_order:
+        ctx.parent.config.partition_order = 'adaptive'
+    annotate_batch(read_batch(input_fp), in_fmt, output_dir, out_fmt,
+                   cpus, kingdom, force,
+                   ctx.parent.config, out_seq=not no_seq,
+                   out_compression=out_compression,
+                   scratch_dir=scratch_dir, trace=trace)
@@ -14,6 +14,7 @@ import click
 
 from ..cli import cmd, AliasedGroup
 from .. import db
+from ..db._manifest import update_manifest
 
 
 @cmd.group(cls=AliasedGroup)
@@ -31,8 +32,11 @@ def cli(ctx):
                     'do not need to be downloaded again if it exists there.'))
 @click.option('-f', '--force', is_flag=True,
               help='Force overwrite.')
+@click.option('--no_checksum', is_flag=True,
+              help=('Do not compute the md5 checksums of the database files '
+                    'in the manifest.'))
 @click.pass_context
-def create_db(ctx, databases, cache_dir, force):
+def create_db(ctx, databases, cache_dir, force, no_checksum):
     '''Prepare database.
 
     Download the files for the specified DATABASES and manipulate
@@ -41,10 +45,15 @@ def create_db(ctx, databases, cache_dir, force):
     grandparent_ctx = ctx.parent.parent
     config = grandparent_ctx.config
     func_name = 'prepare_db'
-
+    versions = {}
     for d in databases:
         submodule = import_module('.%s' % d, db.__name__)
         f = getattr(submodule, func_name)
         out_d = join(config.db_dir, d)
         makedirs(out_d, exist_ok=True)
         f(out_d, cache_dir, force=force)
+        versions[d] = getattr(submodule, '_version', None)
+    # record the prepared databases so they are found without walking
+    # the database directory
+    update_manifest(config.db_dir, versions=versions,
+                    checksum=not no_checksum)
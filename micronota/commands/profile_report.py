@@ -0,0 +1,33 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import click
+
+
+@click.command()
+@click.argument('profile', type=click.Path(exists=True, dir_okay=False))
+@click.option('-n', '--top', type=int, default=20,
+              help='Number of the modules and functions to show.')
+@click.option('--sort', type=click.Choice(['tottime', 'cumulative']),
+              default='tottime',
+              help='How to sort the functions.')
+def cli(profile, top, sort):
+    '''Summarize the profile from "micronota --profile".
+
+    It shows the modules and the functions that took the most time.'''
+    import pstats
+    from ..profiling import summarize
+    total, modules = summarize(profile, top)
+    click.echo('{:>10} {:>6} {:>10}  {}'.format(
+        'time', '%', 'calls', 'module'))
+    for m, t, n in modules:
+        click.echo('{:>10.3f} {:>6.1f} {:>10}  {}'.format(
+            t, 100 * t / total if total else 0, n, m))
+    click.echo()
+    stats = pstats.Stats(profile, stream=click.get_text_stream('stdout'))
+    stats.sort_stats(sort).print_stats(top)
@@ -0,0 +1,97 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from os.path import abspath
+
+import click
+
+from ..cli import cmd, AliasedGroup
+
+
+_SOCKET = click.option(
+    '-s', '--socket', 'sock_fp', default='micronota.sock',
+    type=click.Path(dir_okay=False),
+    help='The Unix socket file of the server.')
+
+
+@cmd.group(cls=AliasedGroup)
+@click.pass_context
+def cli(ctx):
+    '''Annotation server operations.
+
+    The server keeps the configuration, modules and databases loaded
+    and runs the submitted jobs one after another.'''
+    pass
+
+
+@cli.command('start')
+@_SOCKET
+@click.option('--cpus', type=int, default=1,
+              help='Number of CPUs to use for each job.')
+@click.pass_context
+def start(ctx, sock_fp, cpus):
+    '''Start the server in the foreground.'''
+    from ..server import Server
+    config = ctx.parent.parent.config
+    server = Server(sock_fp, config, cpus=cpus)
+    click.echo('Serving on %s' % sock_fp)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+@cli.command('submit')
+@_SOCKET
+@click.option('-i', '--input_fp', type=click.Path(exists=True, dir_okay=False),
+              required=True,
+              help='Input file path. It can be gzip/bgzip/zstd compressed.')
+@click.option('--in_fmt', type=click.Choice(['fasta', 'genbank']),
+              default='fasta',
+              help='The format of input file.')
+@click.option('-o', '--output_dir', type=click.Path(file_okay=False),
+              required=True,
+              help='Output directory path.')
+@click.option('--out_fmt', type=click.Choice(['gff3', 'genbank']),
+              default='genbank',
+              help='Output format for the annotated sequences.')
+@click.option('--kingdom',
+              type=click.Choice(
+                  ['Bacteria', 'Archaea', 'Viruses', 'Eukaryota', 'other']),
+              default='Bacteria',
+              help='Kingdom of the input sequence organism.')
+@click.option('--force', is_flag=True,
+              help='Force overwrite if the output directory exists')
+@click.option('--no_seq', is_flag=True,
+              help='Only write the features without the sequences.')
+def submit(sock_fp, input_fp, in_fmt, output_dir, out_fmt, kingdom, force,
+           no_seq):
+    '''Submit an annotation job and wait for it to finish.'''
+    from ..server import request
+    # the server may run in a different working directory
+    job = {'in_fp': abspath(input_fp), 'in_fmt': in_fmt,
+           'out_dir': abspath(output_dir), 'out_fmt': out_fmt,
+           'kingdom': kingdom, 'force': force, 'out_seq': not no_seq}
+    for msg in request(sock_fp, {'cmd': 'annotate', 'job': job}):
+        if msg['status'] == 'queued':
+            click.echo('Queued at position %d' % msg['position'])
+        elif msg['status'] == 'running':
+            click.echo('Running')
+        elif msg['status'] == 'done':
+            click.echo('Done: %s' % msg['out_dir'])
+        else:
+            raise click.ClickException(msg['message'])
+
+
+@cli.command('stop')
+@_SOCKET
+def stop(sock_fp):
+    '''Stop the server after the queued jobs are finished.'''
+    from ..server import request
+    for msg in request(sock_fp, {'cmd': 'shutdown'}):
+        click.echo(msg['status'])
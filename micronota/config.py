@@ -6,7 +6,7 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from os import walk
+from os import walk, makedirs
 from os.path import join, exists, expanduser, abspath, dirname, basename
 from configparser import ConfigParser
 from logging.config import fileConfig
@@ -39,8 +39,21 @@ class Configuration(object):
         {tool: {param: value}}.
     db_dir : str
         database directory.
+    scratch_dir : str or None
+        directory for intermediate files.
+    partition_order : str
+        "adaptive" or "fixed" order to search the UniRef partitions.
+    partition_stats : ``micronota.db._partition.PartitionStats`` or None
+        The statistics of the partitions searched in previous runs if the
+        partition order is adaptive.
+    diamond_outfmt : str
+        "tab" or "sam" format of the DIAMOND results.
+    residency : ``micronota.residency.DBResidency`` or None
+        It keeps the databases in memory if ``db_residency`` is set. It is
+        created when it is accessed for the first time.
     db : dict
-        database name and their abs path
+        database name and their abs path. It is discovered from ``db_dir``
+        when it is accessed for the first time.
     app_dir : str
         directory for micronota data files. It is different in
         different OS.
@@ -97,7 +110,35 @@ class Configuration(object):
         '''read in the config
         '''
         config = self._read_config(fp, allow_no_value=True)
-        self.db_dir = expanduser(config['general']['db_dir'])
+        general = config['general']
+        self.db_dir = expanduser(general['db_dir'])
+        scratch_dir = general.get('scratch_dir')
+        if scratch_dir:
+            self.scratch_dir = expanduser(scratch_dir)
+        else:
+            self.scratch_dir = None
+        self.db_residency = general.get('db_residency') or None
+        self.db_cache_dir = general.get('db_cache_dir') or None
+        if self.db_cache_dir is not None:
+            self.db_cache_dir = expanduser(self.db_cache_dir)
+        size = general.get('db_cache_size')
+        self.db_cache_size = int(float(size) * 1e9) if size else None
+        self._residency = None
+        self.partition_order = general.get('partition_order') or 'fixed'
+        if self.partition_order not in ('adaptive', 'fixed'):
+            raise ValueError(
+                'Unknown partition order: %s' % self.partition_order)
+        self.diamond_outfmt = general.get('diamond_outfmt') or 'tab'
+        if self.diamond_outfmt not in ('tab', 'sam'):
+            raise ValueError(
+                'Unknown DIAMOND output format: %s' % self.diamond_outfmt)
+        fp = general.get('partition_stats')
+        if fp:
+            self._partition_stats_fp = expanduser(fp)
+        else:
+            self._partition_stats_fp = join(
+                self.app_dir, 'partition_stats.db')
+        self._partition_stats = None
         if 'feature' in config:
             self.features = config['feature']
         if 'cds' in config:
@@ -126,12 +167,59 @@ class Configuration(object):
 
     @db_dir.setter
     def db_dir(self, db_dir):
-        db = {}
         self._db_dir = db_dir
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self._find_db(self._db_dir)
+        return self._db
+
+    @db.setter
+    def db(self, db):
+        self._db = db
+
+    @property
+    def residency(self):
+        if self._residency is None and self.db_residency is not None:
+            from .residency import DBResidency
+            self._residency = DBResidency(
+                self.db_residency, self.db_cache_dir, self.db_cache_size)
+        return self._residency
+
+    @property
+    def partition_stats(self):
+        if self.partition_order != 'adaptive':
+            return None
+        if self._partition_stats is None:
+            from .db._partition import PartitionStats
+            makedirs(dirname(self._partition_stats_fp), exist_ok=True)
+            self._partition_stats = PartitionStats(self._partition_stats_fp)
+        return self._partition_stats
+
+    @staticmethod
+    def _find_db(db_dir):
+        '''Return the leaf dirs in ``db_dir`` as databases.
+
+        They are read from the database manifest if it is up to date.
+        Otherwise ``db_dir`` is walked and the manifest is rewritten.
+        '''
+        from .db._manifest import read_manifest, update_manifest
+        manifest = read_manifest(db_dir)
+        if manifest is not None:
+            return {k: v['path'] for k, v in manifest['databases'].items()}
+        db = {}
         for dirpath, dirnames, filenames in walk(db_dir):
             if not dirnames:
                 db[basename(dirpath)] = dirpath
-        self.db = db
+        if db:
+            try:
+                update_manifest(db_dir)
+            except OSError:
+                # e.g. the database directory is read only
+                pass
+        return db
 
     def __repr__(self):
         from sys import platform, version
@@ -144,6 +232,10 @@ class Configuration(object):
 
         info['micronota'] = OrderedDict([
             ('database directory', self.db_dir),
+            ('scratch directory', self.scratch_dir),
+            ('database residency', self.db_residency),
+            ('partition order', self.partition_order),
+            ('DIAMOND output format', self.diamond_outfmt),
             ('global config directory', self.app_dir),
             ('general config file', self._misc_fp),
             ('log config file', self._log_fp),
@@ -0,0 +1,151 @@
+r'''
+Database manifest
+=================
+
+.. currentmodule:: micronota.db._manifest
+
+The manifest is a JSON file named ``manifest.json`` in the database
+directory. It is written after the databases are prepared and it records
+each database's name, path, version, and the size, modification time and
+md5 checksum of its files, so that the databases can be found without
+walking the whole database directory, which can be slow on network
+file systems.
+
+The manifest is stale if any of the recorded directories or files is
+missing or has been modified since it was written, or if the entries in
+the database directory itself have changed.
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+import hashlib
+from os import walk, stat, replace, listdir
+from os.path import join, basename, relpath
+from logging import getLogger
+
+
+_MANIFEST = 'manifest.json'
+
+
+def _md5(fp, size=2**20):
+    md5 = hashlib.md5()
+    with open(fp, 'rb') as f:
+        for chunk in iter(lambda: f.read(size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def update_manifest(db_dir, versions=None, checksum=False):
+    '''Walk the database directory and (re)write the manifest.
+
+    The leaf directories are taken as databases and named after the
+    directory name.
+
+    Parameters
+    ----------
+    db_dir : str
+        The database directory.
+    versions : dict or None
+        The version of each database, keyed by the name of the top level
+        directory in ``db_dir``. The versions in the existing manifest
+        are kept if they are not given.
+    checksum : bool
+        Whether to compute the md5 checksums of the files that are new or
+        modified since the last manifest. The checksums of the unmodified
+        files are always kept.
+
+    Returns
+    -------
+    dict
+        The manifest.
+    '''
+    logger = getLogger(__name__)
+    logger.info('Updating the database manifest in %s' % db_dir)
+    if versions is None:
+        versions = {}
+    old = _read(db_dir) or {'databases': {}}
+    manifest = {'databases': {}, 'dirs': {}, 'entries': _entries(db_dir)}
+    for dirpath, dirnames, filenames in walk(db_dir):
+        # the mtime of db_dir changes when the manifest is written, so
+        # its entries are recorded instead
+        if dirpath != db_dir:
+            manifest['dirs'][dirpath] = stat(dirpath).st_mtime
+        if dirnames:
+            continue
+        name = basename(dirpath)
+        top = relpath(dirpath, db_dir).split('/', 1)[0]
+        old_db = old['databases'].get(name, {})
+        old_files = old_db.get('files', {})
+        files = {}
+        for fn in filenames:
+            if fn.startswith(_MANIFEST):
+                continue
+            st = stat(join(dirpath, fn))
+            f = {'size': st.st_size, 'mtime': st.st_mtime, 'md5': None}
+            old_f = old_files.get(fn)
+            if (old_f is not None and old_f['size'] == f['size'] and
+                    old_f['mtime'] == f['mtime']):
+                f['md5'] = old_f['md5']
+            if f['md5'] is None and checksum:
+                f['md5'] = _md5(join(dirpath, fn))
+            files[fn] = f
+        manifest['databases'][name] = {
+            'path': dirpath,
+            'version': versions.get(top, old_db.get('version')),
+            'files': files}
+    # write to a temp file first so a reader never sees partial manifest
+    fp = join(db_dir, _MANIFEST)
+    with open(fp + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    replace(fp + '.tmp', fp)
+    return manifest
+
+
+def _entries(db_dir):
+    return sorted(i for i in listdir(db_dir) if not i.startswith(_MANIFEST))
+
+
+def _read(db_dir):
+    try:
+        with open(join(db_dir, _MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_stale(db_dir, manifest):
+    try:
+        if _entries(db_dir) != manifest['entries']:
+            return True
+        for d, mtime in manifest['dirs'].items():
+            if stat(d).st_mtime != mtime:
+                return True
+        for db in manifest['databases'].values():
+            for fn, f in db['files'].items():
+                st = stat(join(db['path'], fn))
+                if st.st_size != f['size'] or st.st_mtime != f['mtime']:
+                    return True
+    except OSError:
+        return True
+    return False
+
+
+def read_manifest(db_dir):
+    '''Read the manifest.
+
+    Returns
+    -------
+    dict or None
+        The manifest or ``None`` if it does not exist or is stale.
+    '''
+    manifest = _read(db_dir)
+    if manifest is None or _is_stale(db_dir, manifest):
+        return None
+    return manifest
@@ -0,0 +1,134 @@
+r'''
+UniRef partition order
+======================
+
+.. currentmodule:: micronota.db._partition
+
+The UniRef database is split into partitions by review status and
+kingdom (see :mod:`micronota.db._uniref`), which are searched in cascade:
+the proteins that hit a partition are not searched against the next. The
+partitions of the kingdom of the input genome are searched first by the
+fixed order.
+
+The order can also be adapted to the hit rates and search times of the
+partitions in previous runs, recorded per kingdom in a small sqlite
+database. For a cascade, the expected search time is minimized by
+searching first the partitions with the lowest ratio of the search time
+per query to the hit rate. To keep the curated annotations first, only
+the partitions of the same review status are reordered and "_other" is
+always the last. The partitions never searched keep their places.
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from sqlite3 import connect
+
+
+_status = ['Swiss-Prot', 'TrEMBL']
+_kingdom = ['Bacteria', 'Archaea', 'Viruses', 'Eukaryota', 'other']
+
+
+def fixed_order(kingdom):
+    '''Return the partitions in the fixed order for the kingdom.
+
+    Parameters
+    ----------
+    kingdom : str
+        One of Bacteria, Archaea, Viruses, Eukaryota and other. It is
+        case insensitive.
+
+    Returns
+    -------
+    list of str
+    '''
+    kingdoms = {i.lower(): i for i in _kingdom}
+    try:
+        first = kingdoms[kingdom.lower()]
+    except KeyError:
+        raise ValueError('Unknown kingdom: %s' % kingdom)
+    order = [first] + [i for i in _kingdom if i != first]
+    dbs = ['%s_%s' % (s, k) for s in _status for k in order]
+    dbs.append('_other')
+    return dbs
+
+
+class PartitionStats(object):
+    '''The search statistics of the partitions in previous runs.
+
+    Parameters
+    ----------
+    fp : str
+        The sqlite3 file. It is created if it does not exist.
+    '''
+    def __init__(self, fp):
+        self.fp = fp
+        with connect(fp) as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS search (
+                                kingdom   TEXT NOT NULL,
+                                partition TEXT NOT NULL,
+                                queries   INT  NOT NULL,
+                                hits      INT  NOT NULL,
+                                seconds   REAL NOT NULL,
+                                PRIMARY KEY (kingdom, partition));''')
+
+    def record(self, kingdom, searched):
+        '''Add the statistics of a cascade search.
+
+        Parameters
+        ----------
+        kingdom : str
+            The kingdom of the input genome.
+        searched : iterable of dict
+            The ``partition`` searched, and the number of ``queries``
+            searched, of ``hits`` and the ``seconds`` it took.
+        '''
+        kingdom = kingdom.lower()
+        with connect(self.fp) as conn:
+            for i in searched:
+                key = (kingdom, i['partition'])
+                conn.execute('''INSERT OR IGNORE INTO search
+                                VALUES (?, ?, 0, 0, 0);''', key)
+                conn.execute('''UPDATE search
+                                SET queries = queries + ?,
+                                    hits = hits + ?,
+                                    seconds = seconds + ?
+                                WHERE kingdom = ? AND partition = ?;''',
+                             (i['queries'], i['hits'], i['seconds']) + key)
+
+    def get(self, kingdom):
+        '''Return the (queries, hits, seconds) keyed by partition.'''
+        with connect(self.fp) as conn:
+            rows = conn.execute('''SELECT partition, queries, hits, seconds
+                                   FROM search WHERE kingdom = ?;''',
+                                (kingdom.lower(),)).fetchall()
+        return {i[0]: i[1:] for i in rows}
+
+    def order(self, kingdom):
+        '''Return the partitions in the order of the least expected time.
+
+        Only the partitions searched before are reordered, among the
+        places they take in the fixed order; the others keep their
+        places. The hit rate is estimated with Laplace smoothing and the
+        ties keep the fixed order, so it is the fixed order if there are
+        no statistics.
+        '''
+        dbs = fixed_order(kingdom)
+        stats = {k: v for k, v in self.get(kingdom).items() if v[0] > 0}
+
+        def key(db):
+            q, h, s = stats[db]
+            return (s / q) / ((h + 1) / (q + 2))
+
+        for status in _status:
+            places = [i for i, db in enumerate(dbs)
+                      if db.startswith(status) and db in stats]
+            ordered = sorted((dbs[i] for i in places), key=key)
+            for i, db in zip(places, ordered):
+                dbs[i] = db
+        return dbs
@@ -93,6 +93,7 @@ from ..util import _overwrite, _download
 from ..bfillings.diamond import make_db
 
 
+_version = '2016_01'
 _status = ['Swiss-Prot', 'TrEMBL']
 _kingdom = ['Bacteria', 'Archaea', 'Viruses', 'Eukaryota', 'other']
 
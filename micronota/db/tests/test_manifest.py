@@ -0,0 +1,80 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import makedirs, utime, stat
+from os.path import join, exists
+
+from micronota.db._manifest import update_manifest, read_manifest, _md5
+
+
+class ManifestTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.tigrfam = join(self.tmp_dir, 'tigrfam')
+        self.uniref = join(self.tmp_dir, 'uniref50', 'uniref50')
+        for d in (self.tigrfam, self.uniref):
+            makedirs(d)
+        self.fp = join(self.tigrfam, 'tigrfam_v15.0.hmm')
+        with open(self.fp, 'w') as f:
+            f.write('HMMER3/f\n')
+        with open(join(self.uniref, 'TrEMBL_other.dmnd'), 'w') as f:
+            f.write('diamond\n')
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_update_manifest(self):
+        obs = update_manifest(self.tmp_dir, versions={'tigrfam': '15.0'})
+        self.assertTrue(exists(join(self.tmp_dir, 'manifest.json')))
+        self.assertEqual(
+            {k: v['path'] for k, v in obs['databases'].items()},
+            {'tigrfam': self.tigrfam, 'uniref50': self.uniref})
+        tigrfam = obs['databases']['tigrfam']
+        self.assertEqual(tigrfam['version'], '15.0')
+        self.assertIsNone(obs['databases']['uniref50']['version'])
+        self.assertEqual(tigrfam['files']['tigrfam_v15.0.hmm']['size'], 9)
+        self.assertIsNone(tigrfam['files']['tigrfam_v15.0.hmm']['md5'])
+
+    def test_update_manifest_keep(self):
+        update_manifest(self.tmp_dir, versions={'tigrfam': '15.0'},
+                        checksum=True)
+        obs = update_manifest(self.tmp_dir)
+        tigrfam = obs['databases']['tigrfam']
+        self.assertEqual(tigrfam['version'], '15.0')
+        self.assertEqual(tigrfam['files']['tigrfam_v15.0.hmm']['md5'],
+                         _md5(self.fp))
+
+    def test_read_manifest(self):
+        exp = update_manifest(self.tmp_dir)
+        self.assertEqual(read_manifest(self.tmp_dir), exp)
+
+    def test_read_manifest_missing(self):
+        self.assertIsNone(read_manifest(self.tmp_dir))
+
+    def test_read_manifest_stale_file(self):
+        update_manifest(self.tmp_dir)
+        mtime = stat(self.fp).st_mtime
+        utime(self.fp, (mtime + 10, mtime + 10))
+        self.assertIsNone(read_manifest(self.tmp_dir))
+
+    def test_read_manifest_stale_new_db(self):
+        update_manifest(self.tmp_dir)
+        makedirs(join(self.tmp_dir, 'uniref90', 'uniref90'))
+        self.assertIsNone(read_manifest(self.tmp_dir))
+
+    def test_read_manifest_stale_removed_db(self):
+        update_manifest(self.tmp_dir)
+        rmtree(self.tigrfam)
+        self.assertIsNone(read_manifest(self.tmp_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join
+
+from micronota.db._partition import fixed_order, PartitionStats
+
+
+class PartitionTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.stats = PartitionStats(join(self.tmp_dir, 'stats.db'))
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_fixed_order(self):
+        obs = fixed_order('Archaea')
+        self.assertEqual(len(obs), 11)
+        self.assertEqual(obs[:2],
+                         ['Swiss-Prot_Archaea', 'Swiss-Prot_Bacteria'])
+        self.assertEqual(obs[5:7], ['TrEMBL_Archaea', 'TrEMBL_Bacteria'])
+        self.assertEqual(obs[-1], '_other')
+        self.assertEqual(fixed_order('eukaryota')[0], 'Swiss-Prot_Eukaryota')
+        self.assertEqual(fixed_order('other')[0], 'Swiss-Prot_other')
+        with self.assertRaisesRegex(ValueError, 'Unknown kingdom'):
+            fixed_order('foo')
+
+    def test_record(self):
+        searched = [{'partition': 'Swiss-Prot_Bacteria', 'queries': 10,
+                     'hits': 4, 'seconds': 2.0}]
+        self.stats.record('Bacteria', searched)
+        self.stats.record('Bacteria', searched)
+        self.assertEqual(self.stats.get('bacteria'),
+                         {'Swiss-Prot_Bacteria': (20, 8, 4.0)})
+        self.assertEqual(self.stats.get('Archaea'), {})
+
+    def test_order(self):
+        self.assertEqual(self.stats.order('Bacteria'),
+                         fixed_order('Bacteria'))
+        # Swiss-Prot_Archaea hits more queries in less time per query
+        self.stats.record('Bacteria', [
+            {'partition': 'Swiss-Prot_Bacteria', 'queries': 100,
+             'hits': 10, 'seconds': 100.0},
+            {'partition': 'Swiss-Prot_Archaea', 'queries': 90,
+             'hits': 60, 'seconds': 45.0},
+            {'partition': 'TrEMBL_Bacteria', 'queries': 30,
+             'hits': 20, 'seconds': 30.0}])
+        obs = self.stats.order('Bacteria')
+        exp = fixed_order('Bacteria')
+        # the partitions never searched keep their places, and TrEMBL
+        # partitions are still after Swiss-Prot
+        exp[:2] = ['Swiss-Prot_Archaea', 'Swiss-Prot_Bacteria']
+        self.assertEqual(obs, exp)
+        # the statistics are kept per kingdom
+        self.assertEqual(self.stats.order('Archaea'), fixed_order('Archaea'))
+
+
+if __name__ == '__main__':
+    main()
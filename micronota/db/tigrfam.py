@@ -135,6 +135,9 @@ from ..bfillings.hmmer import hmmpress_hmm
 from ..util import _overwrite, _download
 
 
+_version = '15.0'
+
+
 def prepare_db(out_d, downloaded, prefix='tigrfam_v15.0', force=False,
                hmm='ftp://ftp.tigr.org/pub/data/TIGRFAMs/TIGRFAMs_15.0_HMM.LIB.gz',
                metadata='ftp://ftp.tigr.org/pub/data/TIGRFAMs/TIGRFAMs_15.0_INFO.tar.gz'):
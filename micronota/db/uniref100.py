@@ -8,7 +8,7 @@
 
 from logging import getLogger
 
-from ._uniref import _prepare
+from ._uniref import _prepare, _version  # noqa
 
 
 def prepare_db(downloaded, out_d='uniref',
@@ -0,0 +1,325 @@
+r'''
+Runtime estimate
+================
+
+.. currentmodule:: micronota.estimate
+
+This module (:mod:`micronota.estimate`) estimates the wall time and the
+disk usage of annotating an input file before the full run. A fraction
+of the input sequences is sampled and annotated by
+:func:`micronota.workflow.annotate` with the same configuration and
+number of CPUs, and the stages recorded in its run report (see
+:mod:`micronota.report`) are extrapolated to the whole input. The sample
+is searched against the UniRef partitions in the fixed order, so it does
+not change the partition statistics of the adaptive order.
+
+The wall time of a stage on a sequence is modelled as a fixed cost plus
+a cost proportional to the sequence length, fitted by least squares on
+the sampled sequences. The fixed cost matters for the stages started per
+sequence, e.g. DIAMOND loads the databases for each contig. The total
+wall time is extrapolated from the wall time of the sample run, so the
+overlap of the pipelined stages is accounted for. The output file and
+the intermediate files grow with the sequence length.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import copy
+import json
+import random
+from collections import OrderedDict
+from os import listdir
+from os.path import join, getsize, basename, splitext
+from shutil import rmtree
+from tempfile import mkdtemp
+from logging import getLogger
+
+import numpy as np
+
+from .util import _open, _strip_compression_suffix
+
+
+def _read_lengths(fp, fmt):
+    '''Return the list of the (ID, length) of the input sequences.
+
+    Raises
+    ------
+    ValueError
+        If a fasta header has no sequence ID.
+    '''
+    lengths = []
+    with _open(fp) as f:
+        if fmt == 'fasta':
+            # much faster than building the sequence objects
+            seq_id, n = None, 0
+            for i, line in enumerate(f, 1):
+                if line.startswith('>'):
+                    if seq_id is not None:
+                        lengths.append((seq_id, n))
+                    fields = line[1:].split(None, 1)
+                    if not fields:
+                        raise ValueError(
+                            'No sequence ID in the header at line %d of %s'
+                            % (i, fp))
+                    seq_id, n = fields[0], 0
+                else:
+                    n += len(line.strip())
+            if seq_id is not None:
+                lengths.append((seq_id, n))
+        else:
+            from skbio import read
+            for seq in read(f, format=fmt):
+                lengths.append((seq.metadata['id'], len(seq)))
+    return lengths
+
+
+def _sample(lengths, fraction, seed=0):
+    '''Randomly select sequences up to the fraction of the total length.
+
+    At least one sequence is selected, the shortest if none fits.
+
+    Returns
+    -------
+    list of int
+        The indices of the selected sequences in the input order.
+    '''
+    target = fraction * sum(n for _, n in lengths)
+    idx = list(range(len(lengths)))
+    random.Random(seed).shuffle(idx)
+    selected = []
+    total = 0
+    for i in idx:
+        n = lengths[i][1]
+        if total + n <= target:
+            selected.append(i)
+            total += n
+    if not selected and lengths:
+        selected.append(min(idx, key=lambda i: lengths[i][1]))
+    return sorted(selected)
+
+
+def _write_sample(in_fp, fmt, selected, out_fp):
+    '''Write the selected sequences into a new file of the same format.'''
+    selected = set(selected)
+    with _open(in_fp) as in_f, open(out_fp, 'w') as out:
+        if fmt == 'fasta':
+            i = -1
+            for line in in_f:
+                if line.startswith('>'):
+                    i += 1
+                if i in selected:
+                    out.write(line)
+        else:
+            from skbio import read
+            for i, seq in enumerate(read(in_f, format=fmt)):
+                if i in selected:
+                    seq.write(out, format=fmt)
+
+
+def _fit(x, y):
+    '''Fit ``y = a + b * x`` by least squares with non-negative a and b.'''
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) > 1 and x.std() > 0:
+        A = np.column_stack([np.ones_like(x), x])
+        (a, b), *_ = np.linalg.lstsq(A, y, rcond=None)
+        if a >= 0 and b >= 0:
+            return a, b
+        if a < 0:
+            # proportional to the length
+            return 0.0, y.sum() / x.sum()
+    # a fixed cost per sequence
+    return y.mean(), 0.0
+
+
+def _dir_size(d, select=lambda fn: True):
+    return sum(getsize(join(d, fn)) for fn in listdir(d) if select(fn))
+
+
+def extrapolate(records, lengths, selected):
+    '''Extrapolate the stages recorded on the sample to the whole input.
+
+    Parameters
+    ----------
+    records : list of dict
+        The records of the run report of the sample run.
+    lengths : list of tuple
+        The ID and the length of all the input sequences.
+    selected : list of int
+        The indices of the sampled sequences.
+
+    Returns
+    -------
+    OrderedDict
+        The ``sample`` and ``estimate`` seconds keyed by stage name, in
+        the order the stages first run. Only the stages recorded per
+        sequence are included; the tool calls nested in them (e.g.
+        "diamond blastp") are not.
+    '''
+    from .workflow import _seq_fn
+
+    seq_len = {}
+    for i in selected:
+        seq_id, n = lengths[i]
+        seq_len[seq_id] = seq_len[_seq_fn(seq_id)] = n
+    walls = OrderedDict()
+    for rec in sorted(records, key=lambda x: x['start']):
+        if rec['seq'] in seq_len:
+            walls.setdefault(rec['name'], {}).setdefault(rec['seq'], 0)
+            walls[rec['name']][rec['seq']] += rec['wall']
+    count = len(lengths)
+    total = sum(n for _, n in lengths)
+    stages = OrderedDict()
+    for name, d in walls.items():
+        x = [seq_len[k] for k in d]
+        y = list(d.values())
+        a, b = _fit(x, y)
+        stages[name] = {'sample': sum(y), 'estimate': a * count + b * total}
+    return stages
+
+
+def describe(in_fp, in_fmt, kingdom, config):
+    '''Describe what annotating the input would run, without running it.
+
+    Returns
+    -------
+    str
+        The input size, the tools to run and the UniRef partitions in
+        the order to search.
+    '''
+    from .workflow import _get_uniref_db
+
+    lengths = _read_lengths(in_fp, in_fmt)
+    lines = ['%d sequences (%d bp)' % (
+        len(lengths), sum(n for _, n in lengths))]
+    lines.append('features: %s' % ', '.join(config.features))
+    lines.append('cds: %s' % ', '.join(
+        '%s (%s)' % (k, config.cds[k]) for k in config.cds))
+    lines.append('UniRef partitions: %s' % ', '.join(
+        _get_uniref_db(kingdom, config.partition_stats)))
+    return '\n'.join(lines)
+
+
+def estimate(in_fp, in_fmt, out_fmt, cpus, kingdom, config,
+             fraction=0.05, seed=0, scratch_dir=None, **kwargs):
+    '''Estimate the wall time and disk usage of annotating the input.
+
+    Parameters
+    ----------
+    in_fp : str
+        Input file path.
+    in_fmt, out_fmt, cpus, kingdom, config
+        See :func:`micronota.workflow.annotate`.
+    fraction : float
+        The fraction of the total sequence length to sample.
+    seed : int
+        The seed to sample the sequences.
+    scratch_dir : str or None
+        The directory for the sample run. Default to
+        ``config.scratch_dir`` or the system temp dir.
+    kwargs : dict
+        Other parameters passed to :func:`micronota.workflow.annotate`,
+        e.g. ``out_seq`` and ``out_compression``.
+
+    Returns
+    -------
+    dict
+        The number and the total length of the ``sequences``, the same
+        of the ``sample``, the ``stages`` (see :func:`extrapolate`), the
+        ``wall`` seconds of the sample run and the estimate for the whole
+        input, and the bytes of the ``output`` and the ``intermediates``
+        (as kept with ``keep_intermediates``).
+    '''
+    from .workflow import annotate
+
+    logger = getLogger(__name__)
+    lengths = _read_lengths(in_fp, in_fmt)
+    selected = _sample(lengths, fraction, seed)
+    total = sum(n for _, n in lengths)
+    sample_total = sum(lengths[i][1] for i in selected)
+    logger.info('Sampled %d of %d sequences (%d of %d bp).' % (
+        len(selected), len(lengths), sample_total, total))
+    if scratch_dir is None:
+        scratch_dir = config.scratch_dir
+    tmp_dir = mkdtemp(prefix='estimate', dir=scratch_dir)
+    try:
+        # the file name is kept so the sample run writes the same files
+        fn = _strip_compression_suffix(basename(in_fp))
+        sample_fp = join(tmp_dir, fn)
+        _write_sample(in_fp, in_fmt, selected, sample_fp)
+        out_dir = join(tmp_dir, 'out')
+        # the sample run should not change the partition order learned
+        # for the later runs
+        sample_config = copy.copy(config)
+        sample_config.partition_order = 'fixed'
+        annotate(sample_fp, in_fmt, out_dir, out_fmt, cpus, kingdom, False,
+                 sample_config, keep_intermediates=True, scratch_dir=tmp_dir,
+                 **kwargs)
+        prefix = splitext(fn)[0]
+        with open(join(out_dir, '%s.report.json' % prefix)) as f:
+            records = json.load(f)['records']
+        out_size = _dir_size(
+            out_dir, lambda x: not x.startswith(('intermediate_', prefix +
+                                                 '.report.')))
+        im_size = _dir_size(out_dir, lambda x: x.startswith('intermediate_'))
+    finally:
+        rmtree(tmp_dir, ignore_errors=True)
+
+    stages = extrapolate(records, lengths, selected)
+    wall = max((r['start'] + r['wall'] for r in records), default=0)
+    sample_sum = sum(i['sample'] for i in stages.values())
+    ratio = total / sample_total if sample_total else 0
+    if sample_sum > 0:
+        # keep the overlap of the stages in the sample run
+        est_wall = wall * sum(i['estimate']
+                              for i in stages.values()) / sample_sum
+    else:
+        est_wall = wall * ratio
+    return {'sequences': (len(lengths), total),
+            'sample': (len(selected), sample_total),
+            'cpus': cpus,
+            'stages': stages,
+            'wall': {'sample': wall, 'estimate': est_wall},
+            'output': {'sample': out_size, 'estimate': out_size * ratio},
+            'intermediates': {'sample': im_size, 'estimate': im_size * ratio}}
+
+
+def _human(n, units, step):
+    for unit in units[:-1]:
+        if abs(n) < step[0]:
+            break
+        n /= step[0]
+        step = step[1:] or step
+    else:
+        unit = units[-1]
+    return '%.1f %s' % (n, unit)
+
+
+def format_estimate(est):
+    '''Format the estimate as a table of text.'''
+    def seconds(s):
+        return _human(s, ['s', 'min', 'h'], [60, 60])
+
+    def size(n):
+        return _human(n, ['B', 'KB', 'MB', 'GB', 'TB'], [1024])
+
+    lines = ['%d sequences (%d bp), sampled %d (%d bp), at %d CPUs' % (
+        est['sequences'] + est['sample'] + (est['cpus'],))]
+    rows = [('stage', 'sample', 'estimate')]
+    for name, d in est['stages'].items():
+        rows.append((name, seconds(d['sample']), seconds(d['estimate'])))
+    rows.append(('total wall time', seconds(est['wall']['sample']),
+                 seconds(est['wall']['estimate'])))
+    for k in ('output', 'intermediates'):
+        rows.append((k, size(est[k]['sample']), size(est[k]['estimate'])))
+    width = max(len(r[0]) for r in rows)
+    for r in rows:
+        lines.append('%-*s  %12s  %12s' % ((width,) + r))
+    return '\n'.join(lines)
@@ -0,0 +1,215 @@
+r'''
+Incremental annotation
+======================
+
+.. currentmodule:: micronota.incremental
+
+This module (:mod:`micronota.incremental`) caches the results of the
+annotation stages of each input sequence, so that a re-run only
+recomputes what has changed, e.g. when contigs are added to an assembly
+or a database is updated.
+
+Each result is stored with a fingerprint of everything it depends on:
+
+* a feature identification tool (e.g. Prodigal) depends on the sequence,
+  the tool, its database and its parameters;
+
+* the CDS annotation depends on the proteins identified, the kingdom and
+  the CDS tools with their databases and parameters.
+
+A database is fingerprinted by the names, sizes and modification times of
+its files, like the database manifest (see :mod:`micronota.db._manifest`),
+so a new release invalidates only the stages that use it: the DIAMOND
+cascade re-runs when UniRef changes while the Prodigal calls are kept.
+The order of the UniRef partitions is not part of the fingerprint, so the
+partition order learned from previous runs does not invalidate the cache.
+
+The same cache serves as the journal of the stages completed in a run,
+so an interrupted run can be resumed (see
+:func:`micronota.workflow.annotate`).
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import zlib
+import time
+import pickle
+import hashlib
+from os import walk, stat
+from os.path import join, isdir, relpath
+from sqlite3 import connect
+from threading import Lock
+
+
+def fingerprint(*parts):
+    '''Return the hex digest of the parts.
+
+    Each part is a ``str`` or a (nested) ``list`` or ``tuple`` of them.
+    '''
+    h = hashlib.sha1()
+
+    def update(x):
+        if isinstance(x, (list, tuple)):
+            h.update(b'[')
+            for i in x:
+                update(i)
+            h.update(b']')
+        else:
+            x = str(x).encode()
+            # the length prefix keeps ('ab', 'c') from ('a', 'bc')
+            h.update(b'%d:' % len(x))
+            h.update(x)
+
+    update(parts)
+    return h.hexdigest()
+
+
+def _db_fingerprint(path):
+    '''Return the fingerprint of the files of a database.'''
+    if path is None:
+        return fingerprint()
+    files = []
+    if isdir(path):
+        for dirpath, dirnames, filenames in walk(path):
+            dirnames.sort()
+            for fn in sorted(filenames):
+                # the manifest is rewritten without the data changing
+                if fn.startswith('manifest.json'):
+                    continue
+                st = stat(join(dirpath, fn))
+                files.append((relpath(join(dirpath, fn), path),
+                              st.st_size, st.st_mtime))
+    else:
+        st = stat(path)
+        files.append(('', st.st_size, st.st_mtime))
+    return fingerprint(files)
+
+
+class ResultCache(object):
+    '''The cached results of the annotation stages of each sequence.
+
+    Parameters
+    ----------
+    fp : str
+        The sqlite3 file. It is created if it does not exist.
+    batch : int
+        The max number of results added before they are committed.
+    interval : float
+        The max seconds from the last commit before the results added
+        are committed.
+
+    Notes
+    -----
+    The results are committed in batches rather than one by one, as the
+    file is usually in the output dir, which can be a slow or network
+    file system. The results not committed yet are lost if the process
+    is killed, so a resumed run redoes at most the last batch.
+
+    The database file has a table named ``result`` with following
+    columns:
+
+    1. ``contig``. TEXT. The input sequence file name (see
+       :func:`micronota.workflow.annotate`).
+
+    2. ``stage``. TEXT. The tool name for the feature identification or
+       "cds" for the CDS annotation.
+
+    3. ``key``. TEXT. The fingerprint of the inputs of the stage.
+
+    4. ``data``. BLOB. zlib compressed pickle of the result.
+    '''
+    def __init__(self, fp, batch=100, interval=10):
+        self.fp = fp
+        self.batch = batch
+        self.interval = interval
+        self._lock = Lock()
+        self._dbs = {}
+        self._pending = 0
+        self._committed = time.monotonic()
+        # the stages run in different threads (see micronota.pipeline)
+        self._conn = connect(fp, check_same_thread=False)
+        # the file stays consistent; only the last commits can be lost
+        # on a power failure
+        self._conn.execute('PRAGMA synchronous = NORMAL;')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS result (
+                                  contig TEXT NOT NULL,
+                                  stage  TEXT NOT NULL,
+                                  key    TEXT NOT NULL,
+                                  data   BLOB NOT NULL,
+                                  PRIMARY KEY (contig, stage));''')
+        self.hits = self.misses = 0
+
+    def db_fingerprint(self, path):
+        '''Return the fingerprint of a database, computed once per run.'''
+        with self._lock:
+            if path not in self._dbs:
+                self._dbs[path] = _db_fingerprint(path)
+            return self._dbs[path]
+
+    def get(self, contig, stage, key):
+        '''Return the cached result, or ``None`` if its key has changed.'''
+        with self._lock:
+            row = self._conn.execute(
+                '''SELECT data FROM result
+                   WHERE contig = ? AND stage = ? AND key = ?;''',
+                (contig, stage, key)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def put(self, contig, stage, key, result):
+        '''Add (or replace) the result of a stage.'''
+        data = zlib.compress(pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO result VALUES (?,?,?,?);',
+                (contig, stage, key, data))
+            self._pending += 1
+            if (self._pending >= self.batch or
+                    time.monotonic() - self._committed >= self.interval):
+                self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._pending = 0
+        self._committed = time.monotonic()
+
+    def commit(self):
+        '''Commit the results added.'''
+        with self._lock:
+            self._commit()
+
+    def contigs(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT contig FROM result;').fetchall()
+        return {i[0] for i in rows}
+
+    def prune(self, contigs):
+        '''Remove the results of the sequences not in ``contigs``.
+
+        Returns
+        -------
+        int
+            The number of sequences removed.
+        '''
+        old = self.contigs() - set(contigs)
+        with self._lock:
+            self._conn.executemany('DELETE FROM result WHERE contig = ?;',
+                                   ((i,) for i in old))
+            self._commit()
+        return len(old)
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
@@ -0,0 +1,204 @@
+r'''
+Intermediate files
+==================
+
+.. currentmodule:: micronota.intermediate
+
+This module (:mod:`micronota.intermediate`) manages the intermediate files
+created while annotating the input sequences. An input needed by several
+tools is written only once and the same file path is handed to each of
+them. The files are reference counted and, according to the ``keep``
+policy, either removed as soon as no tool needs them any more or moved
+into the output directory at the end of the run.
+
+The intermediate files can be staged in a scratch directory (e.g.
+``/dev/shm`` or a local disk) instead of the output directory, which
+avoids the metadata traffic of many small files on network file systems.
+Only the final outputs and the files to keep are copied back.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import shutil
+from os import makedirs, remove, listdir, replace
+from os.path import join, exists, isdir
+from tempfile import mkdtemp
+from threading import Lock
+from contextlib import contextmanager
+
+
+def _write_fasta(fh, id, seq):
+    '''Write a single sequence in fasta format without line wrapping.
+
+    It is much faster than constructing ``skbio.Sequence`` object to
+    write.
+
+    Parameters
+    ----------
+    fh : file handle
+        Opened in text mode.
+    id : str
+        Sequence ID.
+    seq : str
+        Sequence.
+    '''
+    fh.write('>%s\n%s\n' % (id, seq))
+
+
+class Intermediate(object):
+    '''Manage the intermediate files of a run.
+
+    Parameters
+    ----------
+    dest : str
+        The output directory. Kept intermediate files are moved here.
+    keep : bool
+        Whether to keep the intermediate files.
+    root : str or None
+        The scratch directory. A temp directory is created inside it to
+        hold the intermediate files. Default to ``dest``.
+
+    Attributes
+    ----------
+    root : str
+        The directory holding the intermediate files.
+    '''
+    def __init__(self, dest, keep=False, root=None):
+        self.dest = dest
+        self.keep = keep
+        makedirs(dest, exist_ok=True)
+        if root is None:
+            root = dest
+        makedirs(root, exist_ok=True)
+        self.root = mkdtemp(prefix='tmp', dir=root)
+        self._count = {}
+        self._outputs = []
+        self._kept = []
+        self._lock = Lock()
+
+    def path(self, *names):
+        '''Return the path of a file or dir inside ``root``.'''
+        return join(self.root, *names)
+
+    def workdir(self, *names):
+        '''Create and return a directory inside ``root``.'''
+        d = self.path(*names)
+        makedirs(d, exist_ok=True)
+        return d
+
+    def output(self, name):
+        '''Return the path of a final output file.
+
+        The file is written inside ``root`` and moved to ``dest`` when
+        the manager is closed, whatever the ``keep`` policy is.
+        '''
+        self._outputs.append(name)
+        return self.path(name)
+
+    def keep_file(self, name):
+        '''Return the path of a file to keep.
+
+        The file is written inside ``root`` and moved to ``dest`` when
+        the manager is closed, even if the run failed, e.g. to debug it.
+        '''
+        self._kept.append(name)
+        return self.path(name)
+
+    def acquire(self, name, write, n=1):
+        '''Return the path of the file, writing it if it does not exist.
+
+        Parameters
+        ----------
+        name : str
+            The file name relative to ``root``.
+        write : callable
+            Accepts a file handle opened in text mode and writes the
+            content. Only called the first time the file is acquired.
+        n : int
+            The number of references to add.
+
+        Returns
+        -------
+        str
+            The file path.
+        '''
+        fp = self.path(name)
+        with self._lock:
+            if name not in self._count:
+                with open(fp, 'w') as f:
+                    write(f)
+                self._count[name] = 0
+            self._count[name] += n
+        return fp
+
+    def release(self, name):
+        '''Drop a reference to the file or dir.
+
+        It is removed once it is not referenced, unless it should be kept.
+        '''
+        with self._lock:
+            self._count[name] -= 1
+            if self._count[name] > 0:
+                return
+            del self._count[name]
+        if not self.keep:
+            self._remove(self.path(name))
+
+    @contextmanager
+    def use(self, name, write):
+        '''Context manager to acquire and release a file.'''
+        fp = self.acquire(name, write)
+        try:
+            yield fp
+        finally:
+            self.release(name)
+
+    def discard(self, *names):
+        '''Remove a file or dir inside ``root`` unless it should be kept.'''
+        if not self.keep:
+            self._remove(self.path(*names))
+
+    @staticmethod
+    def _remove(fp):
+        if isdir(fp):
+            shutil.rmtree(fp)
+        elif exists(fp):
+            remove(fp)
+
+    def close(self, outputs=True):
+        '''Move the outputs and kept files to ``dest`` and remove ``root``.
+
+        Parameters
+        ----------
+        outputs : bool
+            Whether to move the outputs. Set it to ``False`` if the run
+            failed so no incomplete output is left in ``dest``.
+        '''
+        if self.keep:
+            names = listdir(self.root)
+        else:
+            names = []
+        names.extend(i for i in self._kept if i not in names)
+        if outputs:
+            names.extend(i for i in self._outputs if i not in names)
+        else:
+            names = [i for i in names if i not in self._outputs]
+        names = [i for i in names if exists(self.path(i))]
+        for f in names:
+            dest = join(self.dest, f)
+            # it copies the file if root and dest are on different devices,
+            # so it is moved to a temp name first and then renamed, in
+            # order not to leave a half-written file in dest
+            tmp = join(self.dest, '.%s.tmp' % f)
+            self._remove(tmp)
+            shutil.move(self.path(f), tmp)
+            self._remove(dest)
+            replace(tmp, dest)
+        shutil.rmtree(self.root, ignore_errors=True)
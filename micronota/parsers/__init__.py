@@ -13,3 +13,16 @@ This module parse the outputs.
 
    embl
 '''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+# register the formats to skbio.io when the parsers are imported. It is not
+# done in the top level package, so the command line interface starts
+# without importing skbio.
+from . import embl  # noqa
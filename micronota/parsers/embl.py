@@ -181,11 +181,21 @@ Reference
 .. [#] ftp://ftp.ebi.ac.uk/pub/databases/embl/doc/usrman.txt
 '''
 
+import mmap
+import struct
+import zlib
+from logging import getLogger
+from multiprocessing import Pool
+from os.path import exists, getsize
+from sqlite3 import connect
+
 from skbio.io import create_format, FileFormatError
 from skbio.sequence import Sequence, DNA, RNA, Protein
 from skbio.io.format._base import (
     _line_generator, _get_nth_sequence, _too_many_blanks)
 
+from ..util import _open, _overwrite, _sniff_compression
+
 
 class EMBLFormatError(FileFormatError):
     pass
@@ -370,8 +380,9 @@ def _parse_oh(lines):
 def _parse_dr(lines):
     '''Parse the DR (Database Cross-reference) line.'''
     res = dict()
-    for db_name, db_lines in _yield_section(lines, lambda s: s.split('; ', 1)):
-        res[db_name] = db_lines
+    for line in lines:
+        db_name, data = line.split('; ', 1)
+        res.setdefault(db_name, []).append(data.strip())
     return res
 
 
@@ -388,6 +399,393 @@ def _parse_sq(lines):
     return ''.join(''.join(lines[1:]).split())
 
 
+# delete the spaces and line breaks in the sequence lines
+_SQ_DELETE = str.maketrans('', '', ' \n\r')
+
+
+def read_fields(fp, fields=('AC', 'OC', 'OX', 'DR', 'KW'), sequence=False,
+                dr=None):
+    '''Stream the selected fields of each entry in an EMBL file.
+
+    It is a much faster alternative to the ``embl`` reader for the large
+    UniProtKB flat files (e.g. ``uniprot_trembl.dat``). The lines of the
+    fields that are not asked for are skipped by their line code without
+    being split or parsed, and no ``skbio.Sequence`` is constructed.
+
+    Parameters
+    ----------
+    fp : str or file handle
+        The EMBL file. If it is a file path, it can be compressed.
+    fields : iterable of str
+        The line codes of the fields to parse. They are parsed the same
+        way as the ``embl`` reader does.
+    sequence : bool
+        Whether to parse the sequence. It is skipped by default.
+    dr : iterable of str or None
+        Only keep the DR lines of these databases (e.g. "GO", "Pfam").
+
+    Yields
+    ------
+    dict
+        The parsed fields of each entry keyed by line code. The sequence
+        is keyed by "SQ" if asked for. A field missing in the entry is
+        missing in the dict.
+    '''
+    if isinstance(fp, str):
+        with _open(fp) as fh:
+            yield from read_fields(fh, fields, sequence, dr)
+        return
+    # the sequence is only parsed if ``sequence`` is set
+    fields = frozenset(fields) - {'SQ'}
+    if dr is not None:
+        dr = tuple('%s;' % i for i in dr)
+    entry = {}
+    seq = []
+    for line in fp:
+        code = line[:2]
+        if code == '//':
+            record = {k: _PARSER_TABLE.get(k, list)(v)
+                      for k, v in entry.items()}
+            if sequence:
+                record['SQ'] = ''.join(seq).translate(_SQ_DELETE)
+                seq = []
+            yield record
+            entry = {}
+        elif code == '  ':
+            if sequence:
+                seq.append(line)
+        elif code in fields:
+            data = line[2:].strip()
+            if dr is not None and code == 'DR' and not data.startswith(dr):
+                continue
+            entry.setdefault(code, []).append(data)
+
+
+def index_embl(fp, index_fp=None, secondary=False, force=False):
+    '''Index the byte offset and length of each entry by accession.
+
+    It is like ``samtools faidx`` for EMBL files. The index is a sqlite3
+    database file with a table named ``entry`` of 3 columns: ``ac``
+    (TEXT), ``offset`` (INT) and ``length`` (INT). The entries can then
+    be fetched randomly with ``EMBLIndex``.
+
+    Parameters
+    ----------
+    fp : str
+        The EMBL file. It must not be compressed.
+    index_fp : str or None
+        The index file. Default to ``fp`` with suffix ".idx".
+    secondary : bool
+        Whether to index the secondary accessions too. By default only
+        the primary (i.e. the 1st) accession of each entry is indexed.
+    force : bool
+        Whether to overwrite the existing index file.
+
+    Returns
+    -------
+    int
+        The number of entries indexed.
+    '''
+    if _sniff_compression(fp) is not None:
+        raise ValueError('Compressed file can not be indexed: %s' % fp)
+    if index_fp is None:
+        index_fp = fp + '.idx'
+    _overwrite(index_fp, force)
+    n = 0
+    rows = []
+    with open(fp, 'rb') as f, connect(index_fp) as conn:
+        conn.execute('''CREATE TABLE entry (
+                            ac     TEXT PRIMARY KEY,
+                            offset INT  NOT NULL,
+                            length INT  NOT NULL) WITHOUT ROWID;''')
+        insert = 'INSERT OR REPLACE INTO entry VALUES (?,?,?);'
+        offset = start = 0
+        acs = []
+        for line in f:
+            code = line[:2]
+            if code == b'ID':
+                start = offset
+                acs = []
+            elif code == b'AC' and (secondary or not acs):
+                acs.extend(i.strip().decode()
+                           for i in line[2:].split(b';') if i.strip())
+            offset += len(line)
+            if code == b'//':
+                if not secondary:
+                    acs = acs[:1]
+                rows.extend((ac, start, offset - start) for ac in acs)
+                n += 1
+                if len(rows) >= 100000:
+                    conn.executemany(insert, rows)
+                    rows = []
+        conn.executemany(insert, rows)
+        conn.commit()
+    return n
+
+
+class EMBLIndex(object):
+    '''Fetch the entries of an indexed EMBL file by accession.
+
+    The EMBL file is memory mapped, so only the pages of the fetched
+    entries are read from disk.
+
+    Parameters
+    ----------
+    fp : str
+        The EMBL file.
+    index_fp : str or None
+        The index file created by ``index_embl``. Default to ``fp`` with
+        suffix ".idx". It is created if it does not exist.
+
+    Examples
+    --------
+    >>> with EMBLIndex('uniprot_sprot.dat') as idx:  # doctest: +SKIP
+    ...     entry = idx.fetch('Q6GZX4', fields=['OC', 'OX'])
+    '''
+    def __init__(self, fp, index_fp=None):
+        if index_fp is None:
+            index_fp = fp + '.idx'
+        if not exists(index_fp):
+            index_embl(fp, index_fp)
+        self._conn = connect(index_fp, check_same_thread=False)
+        self._f = open(fp, 'rb')
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM entry;').fetchone()[0]
+
+    def __contains__(self, ac):
+        return self._locate(ac) is not None
+
+    def _locate(self, ac):
+        return self._conn.execute(
+            'SELECT offset, length FROM entry WHERE ac = ?;',
+            (ac,)).fetchone()
+
+    def __getitem__(self, ac):
+        '''Return the text of the entry.
+
+        Raises
+        ------
+        KeyError
+            If the accession is not in the index.
+        '''
+        loc = self._locate(ac)
+        if loc is None:
+            raise KeyError(ac)
+        offset, length = loc
+        return self._mm[offset:offset + length].decode()
+
+    def fetch(self, ac, **kwargs):
+        '''Return the parsed fields of the entry.
+
+        Parameters
+        ----------
+        ac : str
+            The accession.
+        kwargs : dict
+            Passed to ``read_fields``.
+        '''
+        return next(read_fields(self[ac].splitlines(True), **kwargs))
+
+    def close(self):
+        self._mm.close()
+        self._f.close()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _is_bgzf(fp):
+    '''Return whether the file is in BGZF (block gzip) format.'''
+    with open(fp, 'rb') as f:
+        header = f.read(16)
+    return header[:4] == b'\x1f\x8b\x08\x04' and header[12:14] == b'BC'
+
+
+def _bgzf_blocks(fp):
+    '''Return the offsets of the BGZF blocks and of the end of file.
+
+    Only the block headers are read; nothing is decompressed.
+    '''
+    offsets = []
+    offset = 0
+    with open(fp, 'rb') as f:
+        while True:
+            header = f.read(18)
+            if len(header) < 18:
+                break
+            offsets.append(offset)
+            # BSIZE is the total block size minus 1
+            offset += struct.unpack('<H', header[16:18])[0] + 1
+            f.seek(offset)
+    offsets.append(offset)
+    return offsets
+
+
+def _bgzf_block(f, offset):
+    '''Decompress the BGZF block starting at the offset.'''
+    f.seek(offset)
+    header = f.read(18)
+    bsize = struct.unpack('<H', header[16:18])[0] + 1
+    # strip the header and the 8 bytes of crc32 and input size
+    return zlib.decompress(f.read(bsize - 18)[:-8], -15)
+
+
+def _entry_end(data, start):
+    '''Return the position after the 1st "//" line that ends at or after
+    ``start``, or -1 if there is none in ``data``.'''
+    i = max(start - 3, 0)
+    while True:
+        i = data.find(b'//', i)
+        if i == -1:
+            return -1
+        end = data.find(b'\n', i)
+        if end == -1:
+            return -1
+        if (i == 0 or data[i - 1] == 10) and end + 1 >= start:
+            return end + 1
+        i = end
+
+
+def _split_plain(fp, chunk_size):
+    '''Split the file into byte ranges aligned to the ends of entries.'''
+    size = getsize(fp)
+    ends = [0]
+    with open(fp, 'rb') as f:
+        pos = chunk_size
+        while pos < size:
+            # move to the 1st line start at or after ``pos``
+            f.seek(pos - 1)
+            f.readline()
+            for line in f:
+                if line.startswith(b'//'):
+                    break
+            pos = f.tell()
+            ends.append(pos)
+            pos += chunk_size
+    if ends[-1] < size:
+        ends.append(size)
+    return list(zip(ends[:-1], ends[1:]))
+
+
+def _split_bgzf(fp, chunk_size):
+    '''Split the file into virtual offset ranges aligned to entry ends.
+
+    A virtual offset is a tuple of the compressed offset of a block and
+    the offset in its decompressed data.
+    '''
+    blocks = _bgzf_blocks(fp)
+    last = len(blocks) - 1
+    eof = (blocks[last], 0)
+    starts = [(blocks[0], 0)]
+    with open(fp, 'rb') as f:
+        i = 1
+        while i < last:
+            if blocks[i] - starts[-1][0] < chunk_size:
+                i += 1
+                continue
+            # the end of the previous block tells whether block ``i``
+            # starts right after a "//" line
+            prev = _bgzf_block(f, blocks[i - 1])
+            sizes = []
+            data = prev
+            pos = -1
+            j = i
+            while pos == -1 and j < last:
+                block = _bgzf_block(f, blocks[j])
+                sizes.append(len(block))
+                data += block
+                pos = _entry_end(data, len(prev))
+                j += 1
+            if pos == -1:
+                break
+            # locate the block that the position falls in
+            pos -= len(prev)
+            k = i
+            for n in sizes:
+                if pos < n:
+                    break
+                pos -= n
+                k += 1
+            if k >= last:
+                break
+            starts.append((blocks[k], pos))
+            i = k + 1
+    return list(zip(starts, starts[1:] + [eof]))
+
+
+def _read_range(fp, start, end, bgzf):
+    '''Read the (decompressed) bytes in the range of the file.'''
+    with open(fp, 'rb') as f:
+        if not bgzf:
+            f.seek(start)
+            return f.read(end - start)
+        (c0, u0), (c1, u1) = start, end
+        data = []
+        offset = c0
+        while offset < c1:
+            data.append(_bgzf_block(f, offset))
+            offset = f.tell()
+        if u1:
+            data.append(_bgzf_block(f, c1)[:u1])
+        return b''.join(data)[u0:]
+
+
+def _read_chunk(args):
+    fp, start, end, bgzf, kwargs = args
+    data = _read_range(fp, start, end, bgzf).decode()
+    return list(read_fields(data.splitlines(True), **kwargs))
+
+
+def read_fields_parallel(fp, processes=None, chunk_size=1 << 26, **kwargs):
+    '''Parse the selected fields of an EMBL file with multiple processes.
+
+    The file is split into chunks of about ``chunk_size`` bytes at the
+    "//" lines, so each chunk holds whole entries and is parsed by
+    ``read_fields`` in a worker process.
+
+    Parameters
+    ----------
+    fp : str
+        The EMBL file. It can be uncompressed or compressed in BGZF
+        format (e.g. with ``bgzip``), whose blocks can be decompressed
+        independently. Other compressed files are parsed sequentially.
+    processes : int or None
+        The number of worker processes. Default to the number of CPUs.
+    chunk_size : int
+        The approximate size of the chunks in (compressed) bytes.
+    kwargs : dict
+        Passed to ``read_fields``.
+
+    Yields
+    ------
+    dict
+        The same as ``read_fields``, in the same order as in the file.
+    '''
+    compression = _sniff_compression(fp)
+    if compression is None:
+        bgzf = False
+        ranges = _split_plain(fp, chunk_size)
+    elif compression == 'gzip' and _is_bgzf(fp):
+        bgzf = True
+        ranges = _split_bgzf(fp, chunk_size)
+    else:
+        getLogger(__name__).warning(
+            '%s is parsed sequentially: it is neither uncompressed nor '
+            'in BGZF format.' % fp)
+        yield from read_fields(fp, **kwargs)
+        return
+    tasks = ((fp, start, end, bgzf, kwargs) for start, end in ranges)
+    with Pool(processes) as pool:
+        for records in pool.imap(_read_chunk, tasks):
+            yield from records
+
+
 def _yield_section(lines, split_header, **kwargs):
     '''Yield the lines with the same header.
 
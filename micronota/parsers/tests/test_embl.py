@@ -6,13 +6,20 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import gzip
 from unittest import TestCase, main
+from unittest.mock import patch
+from tempfile import mkdtemp
+from shutil import rmtree, copy
+from os.path import join, exists
 
 from skbio.util import get_data_path
 from skbio import Protein
 
 from micronota.parsers.embl import (
-    _embl_sniffer, _embl_to_protein, _embl_to_generator)
+    _embl_sniffer, _embl_to_protein, _embl_to_generator, read_fields,
+    index_embl, EMBLIndex, read_fields_parallel)
+from micronota.util import _open, _BGZFWriter
 
 
 class EmblIOTests(TestCase):
@@ -88,5 +95,114 @@ class ReaderTests(EmblIOTests):
             self.assertEqual(exp, obs)
 
 
+class ReadFieldsTests(EmblIOTests):
+    def test_read_fields(self):
+        obs = list(read_fields(self.single_fp))
+        md = self.single_exp[1]
+        exp = [{k: md[k] for k in ['AC', 'OC', 'OX', 'DR', 'KW']}]
+        self.assertEqual(obs, exp)
+
+    def test_read_fields_sequence(self):
+        obs = list(read_fields(self.single_fp, fields=['ID', 'DE'],
+                               sequence=True))
+        md = self.single_exp[1]
+        exp = [{'ID': md['ID'], 'DE': md['DE'], 'SQ': self.single_exp[0]}]
+        self.assertEqual(obs, exp)
+
+    def test_read_fields_dr(self):
+        obs = list(read_fields(self.single_fp, fields=['DR'],
+                               dr=['GO', 'Pfam']))
+        dr = self.single_exp[1]['DR']
+        self.assertEqual(obs, [{'DR': {'GO': dr['GO'], 'Pfam': dr['Pfam']}}])
+
+    def test_read_fields_multi(self):
+        with open(self.multi_fp) as f:
+            obs = list(read_fields(f, fields=['AC']))
+        exp = [i.metadata['AC'] for i in _embl_to_generator(self.multi_fp)]
+        self.assertEqual([i['AC'] for i in obs], exp)
+
+
+class IndexTests(EmblIOTests):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = mkdtemp()
+        self.fp = join(self.tmp_dir, 'uniprot.embl')
+        copy(self.multi_fp, self.fp)
+        self.acs = [i.metadata['AC'] for i in _embl_to_generator(self.fp)]
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_index_embl(self):
+        self.assertEqual(index_embl(self.fp), len(self.acs))
+        self.assertTrue(exists(self.fp + '.idx'))
+        with self.assertRaisesRegex(FileExistsError, 'exists'):
+            index_embl(self.fp)
+
+    def test_index_embl_compressed(self):
+        fp = self.fp + '.gz'
+        with open(self.fp, 'rb') as i_f, gzip.open(fp, 'wb') as o_f:
+            o_f.write(i_f.read())
+        with self.assertRaisesRegex(ValueError, 'Compressed'):
+            index_embl(fp)
+
+    def test_embl_index(self):
+        with EMBLIndex(self.fp) as idx:
+            self.assertEqual(len(idx), len(set(self.acs)))
+            self.assertIn('Q6GZX4', idx)
+            self.assertNotIn('foo', idx)
+            obs = idx['Q6GZX4']
+            self.assertTrue(obs.startswith('ID   001R_FRG3G'))
+            self.assertTrue(obs.endswith('//\n'))
+            with self.assertRaises(KeyError):
+                idx['foo']
+
+    def test_embl_index_fetch(self):
+        with EMBLIndex(self.fp) as idx:
+            obs = idx.fetch('Q6GZX4', fields=['AC', 'OX'], sequence=True)
+        md = self.single_exp[1]
+        self.assertEqual(obs, {'AC': md['AC'], 'OX': md['OX'],
+                               'SQ': self.single_exp[0]})
+
+
+class ParallelTests(EmblIOTests):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = mkdtemp()
+        self.fp = join(self.tmp_dir, 'uniprot.embl')
+        with open(self.multi_fp) as f:
+            entries = f.read()
+        with open(self.fp, 'w') as f:
+            f.write(entries * 5)
+        self.exp = list(read_fields(self.fp, sequence=True))
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_read_fields_parallel(self):
+        for chunk_size in [1, 1000, 1 << 26]:
+            obs = list(read_fields_parallel(
+                self.fp, 2, chunk_size, sequence=True))
+            self.assertEqual(obs, self.exp)
+
+    def test_read_fields_parallel_bgzf(self):
+        fp = self.fp + '.gz'
+        # small blocks so entries span multiple blocks
+        with patch.object(_BGZFWriter, '_block_size', 500):
+            with open(self.fp) as i_f, _open(fp, 'w', 'bgzip') as o_f:
+                o_f.write(i_f.read())
+        for chunk_size in [1, 1000, 1 << 26]:
+            obs = list(read_fields_parallel(
+                fp, 2, chunk_size, sequence=True))
+            self.assertEqual(obs, self.exp)
+
+    def test_read_fields_parallel_gzip(self):
+        fp = self.fp + '.gz'
+        with open(self.fp, 'rb') as i_f, gzip.open(fp, 'wb') as o_f:
+            o_f.write(i_f.read())
+        obs = list(read_fields_parallel(fp, 2, sequence=True))
+        self.assertEqual(obs, self.exp)
+
+
 if __name__ == '__main__':
     main()
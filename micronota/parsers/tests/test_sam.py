@@ -4,7 +4,7 @@ from skbio.util import get_data_path
 from skbio import Protein, Sequence
 
 from micronota.parsers.sam import (
-    _sam_sniffer, _sam_to_protein, _sam_to_generator)
+    _sam_sniffer, _sam_to_protein, _sam_to_generator, read_table)
 
 
 class SamIOTests(TestCase):
@@ -81,5 +81,35 @@ class ReaderTests(SamIOTests):
                              sorted(exp.metadata.items()))
             self.assertEqual(str(obs), str(exp))
 
+
+class ReadTableTests(SamIOTests):
+    def test_read_table(self):
+        df, header = read_table(self.multi_fp)
+        md = self.single_exp[1]
+        self.assertEqual(df.shape, (3, 6))
+        self.assertEqual(list(df.columns),
+                         ['QNAME', 'FLAG', 'RNAME', 'POS', 'MAPQ', 'CIGAR'])
+        for k in df.columns:
+            self.assertEqual(df[k][0], md[k])
+        self.assertEqual(df['MAPQ'].dtype.kind, 'i')
+        self.assertEqual(header['HD'], md['HD'])
+        self.assertEqual(header['PG'], md['PG'])
+        self.assertEqual(len(header['CO']), 2)
+
+    def test_read_table_columns(self):
+        df, _ = read_table(self.single_fp, columns=['QNAME', 'SEQ'])
+        self.assertEqual(df['SEQ'][0], self.single_exp[0])
+
+    def test_read_table_tags(self):
+        df, _ = read_table(self.single_fp, columns=['QNAME'],
+                           tags=['AS', 'ZE', 'MD', 'XX'])
+        md = self.single_exp[1]
+        self.assertEqual(df['AS'][0], md['AS'])
+        self.assertEqual(df['AS'].dtype.kind, 'i')
+        self.assertAlmostEqual(df['ZE'][0], md['ZE'])
+        self.assertEqual(df['MD'][0], md['MD'])
+        self.assertIsNone(df['XX'][0])
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,134 @@
+r'''
+Pipelined execution
+===================
+
+.. currentmodule:: micronota.pipeline
+
+This module (:mod:`micronota.pipeline`) provides a small thread-based
+pipeline to overlap the stages of the annotation workflow. Each stage
+runs in its own thread and the stages are connected with bounded queues,
+so that a slow stage (e.g. running an external tool) applies back pressure
+to the stages upstream of it and the number of items held in memory at
+any time stays bounded.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from queue import Queue, Full, Empty
+from threading import Thread, Event
+
+
+# sentinel put into the queue to signal the end of the input
+_DONE = object()
+
+
+class _Failure(object):
+    '''Carry the exception raised in a stage down to the consumer.'''
+    def __init__(self, error):
+        self.error = error
+
+
+def _put(q, item, stop, timeout=0.1):
+    '''Put item into the queue unless the pipeline is stopped.'''
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=timeout)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _get(q, stop, timeout=0.1):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=timeout)
+        except Empty:
+            continue
+    return _DONE
+
+
+def _feed(source, q, stop):
+    try:
+        for item in source:
+            if not _put(q, item, stop):
+                return
+    except BaseException as e:
+        _put(q, _Failure(e), stop)
+        return
+    _put(q, _DONE, stop)
+
+
+def _work(func, in_q, out_q, stop):
+    while True:
+        item = _get(in_q, stop)
+        if item is _DONE or isinstance(item, _Failure):
+            _put(out_q, item, stop)
+            return
+        try:
+            res = func(item)
+        except BaseException as e:
+            _put(out_q, _Failure(e), stop)
+            return
+        if not _put(out_q, res, stop):
+            return
+
+
+def pipeline(source, stages, maxsize=2):
+    '''Pass the items from source through the stages concurrently.
+
+    The source is iterated in its own thread and each stage is run in a
+    separate thread, so the stages work on different items at the same
+    time. The order of the items is preserved.
+
+    Parameters
+    ----------
+    source : iterable
+        Input items.
+    stages : list of callable
+        Each callable accepts the output of the previous stage (or an item
+        from ``source`` for the first stage) and returns the input for the
+        next stage.
+    maxsize : int
+        The max number of items waiting between two adjacent stages.
+
+    Yields
+    ------
+    object
+        The output of the last stage for each item of ``source``.
+
+    Raises
+    ------
+    Exception
+        Any exception raised while iterating ``source`` or in a stage
+        is re-raised in the consumer.
+    '''
+    stop = Event()
+    queues = [Queue(maxsize) for _ in range(len(stages) + 1)]
+    threads = [Thread(target=_feed, args=(source, queues[0], stop))]
+    for i, func in enumerate(stages):
+        threads.append(
+            Thread(target=_work, args=(func, queues[i], queues[i+1], stop)))
+    for t in threads:
+        t.daemon = True
+        t.start()
+    try:
+        while True:
+            item = _get(queues[-1], stop)
+            if item is _DONE:
+                break
+            elif isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # also release the threads if the consumer stops early
+        stop.set()
+        for t in threads:
+            t.join()
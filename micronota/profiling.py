@@ -0,0 +1,143 @@
+r'''
+Profiling
+=========
+
+.. currentmodule:: micronota.profiling
+
+This module (:mod:`micronota.profiling`) profiles the Python side of
+micronota with ``cProfile``, including the threads started while the
+profiler is running (e.g. the stages of :mod:`micronota.pipeline`).
+Before Python 3.12 a profiler only sees the thread that enables it, so
+each new thread enables its own; from 3.12 ``cProfile`` runs on
+``sys.monitoring``, where only one profiler can be active and it sees
+all the threads. The profiles of all the threads are merged into a
+single ``.prof`` file that can be loaded with ``pstats`` or visualized
+with snakeviz, and can be summarized by module with :func:`summarize`.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import re
+import sys
+import cProfile
+import pstats
+import threading
+from os.path import normpath, sep
+from logging import getLogger
+
+
+# a profiler sees all the threads since it runs on sys.monitoring
+_GLOBAL = sys.version_info >= (3, 12)
+
+
+class Profiler(object):
+    '''Profile the current thread and the threads it starts.'''
+    def __init__(self):
+        self._profilers = []
+        self._lock = threading.Lock()
+
+    def _new(self):
+        prof = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(prof)
+        return prof
+
+    def _thread_hook(self, frame, event, arg):
+        # it is called on the first event of each new thread and replaces
+        # itself with a profiler for that thread
+        sys.setprofile(None)
+        try:
+            self._new().enable()
+        except Exception as e:
+            # the thread runs on unprofiled rather than dying
+            getLogger(__name__).warning(
+                'Cannot profile thread %s: %s' % (
+                    threading.current_thread().name, e))
+
+    def start(self):
+        if not _GLOBAL:
+            threading.setprofile(self._thread_hook)
+        self._new().enable()
+
+    def stop(self, fp):
+        '''Stop profiling and write the merged profile into a file.'''
+        if not _GLOBAL:
+            threading.setprofile(None)
+        with self._lock:
+            profilers = self._profilers
+            self._profilers = []
+        # the 1st is the profiler of this thread
+        profilers[0].disable()
+        stats = pstats.Stats(profilers[0])
+        for prof in profilers[1:]:
+            stats.add(prof)
+        stats.dump_stats(fp)
+
+
+def _module(fn):
+    '''Return the module name of a file path in the profile.'''
+    if fn == '~':
+        return '<built-in>'
+    if fn.startswith('<'):
+        # e.g. "<string>"
+        return fn
+    parts = normpath(fn).split(sep)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] in ('site-packages', 'dist-packages'):
+            parts = parts[i+1:]
+            break
+    else:
+        if 'micronota' in parts:
+            i = len(parts) - 1 - parts[::-1].index('micronota')
+            parts = parts[i:]
+        else:
+            # the standard library
+            for i in range(len(parts) - 1, -1, -1):
+                if re.match(r'python\d', parts[i]):
+                    parts = parts[i+1:]
+                    break
+            else:
+                parts = parts[-1:]
+    name = '.'.join(parts)
+    if name.endswith('.py'):
+        name = name[:-3]
+    if name.endswith('.__init__'):
+        name = name[:-9]
+    return name
+
+
+def summarize(fp, top=20):
+    '''Summarize the time spent in each module.
+
+    Parameters
+    ----------
+    fp : str
+        The profile file.
+    top : int
+        The number of the modules to return.
+
+    Returns
+    -------
+    float
+        The total time of the profile.
+    list of tuple
+        The (module, time, calls) of the modules that took the most time,
+        where time is the time spent in the functions of the module
+        excluding their sub-function calls.
+    '''
+    stats = pstats.Stats(fp)
+    modules = {}
+    for (fn, _, _), (_, ncalls, tottime, _, _) in stats.stats.items():
+        m = _module(fn)
+        t, n = modules.get(m, (0.0, 0))
+        modules[m] = t + tottime, n + ncalls
+    res = sorted(((m, t, n) for m, (t, n) in modules.items()),
+                 key=lambda x: x[1], reverse=True)
+    return stats.total_tt, res[:top]
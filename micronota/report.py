@@ -0,0 +1,196 @@
+r'''
+Run report
+==========
+
+.. currentmodule:: micronota.report
+
+This module (:mod:`micronota.report`) instruments the stages of a run and
+the external tools they call. For each stage, it records the wall time,
+the CPU time of micronota itself and of its child processes, the peak
+RSS of the child processes, the bytes read and written, and the input and
+output record counts set by the stage. The records can be written as a
+JSON or TSV report and as a trace in Chrome trace event format, which can
+be loaded in ``chrome://tracing`` or speedscope to find the bottleneck
+tool or contig.
+
+Stages are recorded with the :func:`stage` context manager into the report
+activated with :meth:`Report.activate`. It does nothing if no report is
+active, so the instrumented code does not need to know about the report.
+
+Notes
+-----
+CPU time, child process usage and I/O are process wide. When stages run
+concurrently (see :mod:`micronota.pipeline`), the figures of a stage can
+include the work of other stages running at the same time. The peak RSS
+is the maximum of all the child processes that finished so far, so it is
+only reported when it grows during the stage.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+import time
+import resource
+from threading import Lock, get_ident
+from contextlib import contextmanager
+from os import getpid
+
+
+# the columns of the TSV report
+_COLUMNS = ['name', 'seq', 'start', 'wall', 'cpu', 'child_cpu',
+            'child_maxrss', 'read_bytes', 'write_bytes',
+            'records_in', 'records_out']
+
+
+def _io():
+    '''Return the bytes read and written by the process.
+
+    It is only available on Linux.
+    '''
+    try:
+        with open('/proc/self/io') as f:
+            io = dict(line.split(': ') for line in f)
+        return int(io['read_bytes']), int(io['write_bytes'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _usage():
+    child = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {'time': time.time(),
+            'cpu': time.process_time(),
+            'child_cpu': child.ru_utime + child.ru_stime,
+            # KB on Linux
+            'child_maxrss': child.ru_maxrss,
+            'io': _io()}
+
+
+def _delta(a, b):
+    if a is None or b is None:
+        return None
+    return b - a
+
+
+class Report(object):
+    '''Collect the records of the instrumented stages.
+
+    Attributes
+    ----------
+    records : list of dict
+        One record per stage with keys in ``_COLUMNS``, plus the
+        thread ID in ``tid``. ``start`` is the seconds since the report
+        was created.
+    '''
+    _active = None
+
+    def __init__(self):
+        self.records = []
+        self._t0 = time.time()
+        self._lock = Lock()
+
+    @contextmanager
+    def activate(self):
+        '''Make it the report that :func:`stage` records into.'''
+        prev = Report._active
+        Report._active = self
+        try:
+            yield self
+        finally:
+            Report._active = prev
+
+    @contextmanager
+    def stage(self, name, seq=None, **kwargs):
+        '''Record a stage.
+
+        Parameters
+        ----------
+        name : str
+            The stage or tool name.
+        seq : str or None
+            The sequence processed by the stage.
+        kwargs : dict
+            Other items of the record, e.g. ``records_in``.
+
+        Yields
+        ------
+        dict
+            The record. The stage can set ``records_in`` and
+            ``records_out`` on it.
+        '''
+        rec = {'name': name, 'seq': seq,
+               'records_in': None, 'records_out': None}
+        rec.update(kwargs)
+        a = _usage()
+        try:
+            yield rec
+        finally:
+            b = _usage()
+            rec['start'] = a['time'] - self._t0
+            rec['wall'] = b['time'] - a['time']
+            rec['cpu'] = b['cpu'] - a['cpu']
+            rec['child_cpu'] = b['child_cpu'] - a['child_cpu']
+            if b['child_maxrss'] > a['child_maxrss']:
+                rec['child_maxrss'] = b['child_maxrss']
+            else:
+                rec['child_maxrss'] = None
+            rec['read_bytes'] = _delta(a['io'][0], b['io'][0])
+            rec['write_bytes'] = _delta(a['io'][1], b['io'][1])
+            rec['tid'] = get_ident()
+            with self._lock:
+                self.records.append(rec)
+
+    def write_json(self, fp):
+        with open(fp, 'w') as f:
+            json.dump({'records': self.records}, f, indent=1)
+
+    def write_tsv(self, fp):
+        with open(fp, 'w') as f:
+            f.write('\t'.join(_COLUMNS))
+            f.write('\n')
+            for rec in self.records:
+                f.write('\t'.join(
+                    '' if rec.get(k) is None else str(rec[k])
+                    for k in _COLUMNS))
+                f.write('\n')
+
+    def write_trace(self, fp):
+        '''Write the records in Chrome trace event format.'''
+        pid = getpid()
+        events = []
+        for rec in self.records:
+            events.append({
+                'name': rec['name'],
+                'cat': 'stage',
+                'ph': 'X',
+                # in microseconds
+                'ts': int(rec['start'] * 1e6),
+                'dur': int(rec['wall'] * 1e6),
+                'pid': pid,
+                'tid': rec['tid'],
+                'args': {k: v for k, v in rec.items()
+                         if k not in ('name', 'start', 'wall', 'tid')}})
+        with open(fp, 'w') as f:
+            json.dump({'traceEvents': events}, f)
+
+
+@contextmanager
+def stage(name, seq=None, **kwargs):
+    '''Record a stage into the active report, if there is one.
+
+    See :meth:`Report.stage`.
+    '''
+    report = Report._active
+    if report is None:
+        rec = {'name': name, 'seq': seq}
+        rec.update(kwargs)
+        yield rec
+    else:
+        with report.stage(name, seq, **kwargs) as rec:
+            yield rec
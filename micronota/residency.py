@@ -0,0 +1,301 @@
+r'''
+Database residency
+==================
+
+.. currentmodule:: micronota.residency
+
+This module (:mod:`micronota.residency`) keeps the DIAMOND databases in
+memory across the partitions of the cascade search and across runs, so
+DIAMOND does not read them cold from disk every time. There are two
+modes:
+
+* "fadvise": the database file is prefetched into the page cache with
+  ``posix_fadvise`` and read through, like ``vmtouch -t``. Nothing is
+  done if it is already resident.
+
+* "tmpfs": the database file is copied into a memory backed directory
+  (e.g. ``/dev/shm``) and DIAMOND reads the copy. The copies are kept
+  across runs and the least recently used are removed when they exceed
+  the size limit, except the copy last returned to be searched. A
+  database that does not fit is read from its source instead. The
+  copies can be shared and removed by several processes, so a copy
+  that is gone is simply made again.
+
+The next partition of the cascade is prefetched in the background while
+the current one is searched (see :meth:`DBResidency.prefetch`). Each load
+is recorded as a "db load" stage in the active run report
+(:mod:`micronota.report`) with whether it was a cache hit.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import mmap
+import ctypes
+import shutil
+import hashlib
+from time import time
+from threading import Lock
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, basename, dirname, abspath, exists, getsize
+from logging import getLogger
+
+import numpy as np
+
+from .report import stage
+
+
+# the fraction of the free space of the cache dir to use by default
+_CACHE_FRACTION = 0.5
+
+
+def _resident_fraction(fp):
+    '''Return the fraction of the file that is in the page cache.
+
+    It uses ``mincore`` like ``vmtouch`` does. ``None`` is returned if
+    it is not available on the system.
+    '''
+    size = getsize(fp)
+    if size == 0:
+        return 1.0
+    try:
+        mincore = ctypes.CDLL(None, use_errno=True).mincore
+    except (OSError, AttributeError):
+        return None
+    mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t,
+                        ctypes.POINTER(ctypes.c_ubyte)]
+    pages = -(-size // mmap.PAGESIZE)
+    vec = (ctypes.c_ubyte * pages)()
+    with open(fp, 'rb') as f:
+        # a private mapping is writable, so its address can be taken;
+        # its pages are shared with the page cache until written
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        buf = ctypes.c_char.from_buffer(mm)
+        try:
+            ret = mincore(ctypes.addressof(buf), size, vec)
+        finally:
+            del buf
+            mm.close()
+    if ret != 0:
+        return None
+    # the lowest bit is set for the resident pages
+    vec = np.frombuffer(vec, dtype=np.uint8)
+    return np.count_nonzero(vec & 1) / pages
+
+
+def _read_through(fp, size=1 << 24):
+    '''Read the file into the page cache and return the bytes read.'''
+    n = 0
+    with open(fp, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        buf = bytearray(size)
+        while True:
+            m = f.readinto(buf)
+            if not m:
+                return n
+            n += m
+
+
+class DBResidency(object):
+    '''Keep the DIAMOND databases resident in memory.
+
+    Parameters
+    ----------
+    mode : str
+        "fadvise" or "tmpfs".
+    cache_dir : str or None
+        The memory backed directory to copy the databases into in
+        "tmpfs" mode. Default to "/dev/shm/micronota".
+    cache_size : int or None
+        The maximal total bytes of the databases kept in ``cache_dir``.
+        Default to half of its free space, counting the copies already
+        there.
+    suffix : str
+        The suffix of the database file after the database name.
+
+    Attributes
+    ----------
+    stats : dict of dict
+        The number of ``loads`` and cache ``hits`` and the ``seconds``
+        spent on loading, keyed by database.
+    '''
+    def __init__(self, mode='fadvise', cache_dir=None, cache_size=None,
+                 suffix='.dmnd'):
+        if mode not in ('fadvise', 'tmpfs'):
+            raise ValueError('Unknown database residency mode: %s' % mode)
+        self.mode = mode
+        if cache_dir is None:
+            cache_dir = '/dev/shm/micronota'
+        self.cache_dir = cache_dir
+        self.suffix = suffix
+        self.stats = {}
+        self._lock = Lock()
+        self._pending = {}
+        # the databases are loaded one at a time in the background
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        # the copies in cache_dir, from the least recently used
+        self._copies = OrderedDict()
+        # the copy last returned, which DIAMOND may be reading
+        self._pinned = None
+        if mode == 'tmpfs':
+            os.makedirs(cache_dir, exist_ok=True)
+            copies = [join(cache_dir, i) for i in os.listdir(cache_dir)
+                      if i.endswith(suffix)]
+            for fp in sorted(copies, key=lambda x: os.stat(x).st_atime):
+                self._copies[fp] = getsize(fp)
+            if cache_size is None:
+                # the cache dir is usually memory backed
+                free = shutil.disk_usage(cache_dir).free
+                cache_size = int(_CACHE_FRACTION * (
+                    free + sum(self._copies.values())))
+        self.cache_size = cache_size
+
+    def _copy_fp(self, fp):
+        # databases of the same name can be in different dirs
+        h = hashlib.md5(abspath(dirname(fp)).encode()).hexdigest()[:8]
+        return join(self.cache_dir, '%s_%s' % (h, basename(fp)))
+
+    def _evict(self, size):
+        '''Evict the copies to make room and return if the size fits.'''
+        if self.cache_size is None:
+            return True
+        # forget the copies removed by other processes
+        for fp in [i for i in self._copies if not exists(i)]:
+            del self._copies[fp]
+        total = sum(self._copies.values())
+        # the lock keeps the copy being returned from being evicted
+        with self._lock:
+            for fp in list(self._copies):
+                if total + size <= self.cache_size:
+                    break
+                if fp == self._pinned:
+                    continue
+                n = self._copies.pop(fp)
+                getLogger(__name__).info('Evict %s from %s' % (
+                    basename(fp), self.cache_dir))
+                try:
+                    os.remove(fp)
+                except FileNotFoundError:
+                    pass
+                total -= n
+        return total + size <= self.cache_size
+
+    def _copy(self, fp):
+        '''Copy the file into ``cache_dir`` if it is not there.
+
+        The source file is returned if it does not fit.
+        '''
+        dest = self._copy_fp(fp)
+        src = os.stat(fp)
+        try:
+            st = os.stat(dest)
+        except FileNotFoundError:
+            st = None
+        if (st is not None and st.st_size == src.st_size and
+                st.st_mtime == src.st_mtime):
+            # it can be copied by another process
+            self._copies[dest] = st.st_size
+            self._copies.move_to_end(dest)
+            return dest, True
+        self._copies.pop(dest, None)
+        if (self.cache_size is not None and src.st_size > self.cache_size or
+                not self._evict(src.st_size) or
+                shutil.disk_usage(self.cache_dir).free < src.st_size):
+            getLogger(__name__).warning(
+                '%s does not fit in %s; read it from the source' % (
+                    fp, self.cache_dir))
+            return fp, False
+        tmp = '%s.%d.tmp' % (dest, os.getpid())
+        shutil.copy2(fp, tmp)
+        os.replace(tmp, dest)
+        self._copies[dest] = src.st_size
+        return dest, False
+
+    def _load(self, db):
+        fp = db + self.suffix
+        with stage('db load', db=basename(db)) as rec:
+            start = time()
+            if self.mode == 'tmpfs':
+                dest, hit = self._copy(fp)
+                resident = dest[:-len(self.suffix)]
+            else:
+                frac = _resident_fraction(fp)
+                # mostly resident; the rest is read by DIAMOND itself
+                hit = frac is not None and frac > 0.99
+                if not hit:
+                    _read_through(fp)
+                resident = db
+            rec['cache_hit'] = hit
+            seconds = time() - start
+        with self._lock:
+            st = self.stats.setdefault(
+                db, {'loads': 0, 'hits': 0, 'seconds': 0.0})
+            st['loads'] += 1
+            st['hits'] += hit
+            st['seconds'] += seconds
+        getLogger(__name__).info('Load %s: %s in %.1f s' % (
+            db, 'hit' if hit else 'miss', seconds))
+        return resident
+
+    def _submit(self, db):
+        with self._lock:
+            fut = self._pending.get(db)
+            if fut is None:
+                fut = self._pool.submit(self._load, db)
+                self._pending[db] = fut
+        return fut
+
+    def prefetch(self, dbs):
+        '''Load the databases in the background.'''
+        for db in dbs:
+            self._submit(db)
+
+    def resident(self, db):
+        '''Load the database and return the path for DIAMOND to use.
+
+        Parameters
+        ----------
+        db : str
+            The database path without the suffix, as passed to DIAMOND.
+
+        Returns
+        -------
+        str
+            The database path of the resident copy. It is not evicted
+            until another database is returned.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the copy keeps being removed by other processes.
+        '''
+        for _ in range(3):
+            fut = self._submit(db)
+            try:
+                resident = fut.result()
+            finally:
+                # check the residency again for the next use
+                with self._lock:
+                    if self._pending.get(db) is fut:
+                        del self._pending[db]
+            fp = resident + self.suffix
+            with self._lock:
+                if self.mode == 'fadvise' or exists(fp):
+                    self._pinned = fp
+                    return resident
+            getLogger(__name__).info(
+                '%s was removed before use; copy it again' % fp)
+        raise FileNotFoundError('%s was removed before use.' % fp)
+
+    def close(self):
+        self._pool.shutdown()
@@ -0,0 +1,410 @@
+r'''
+Annotation server
+=================
+
+.. currentmodule:: micronota.server
+
+This module (:mod:`micronota.server`) runs micronota as a long-running
+local service listening on a Unix socket. The configuration is read, the
+modules are imported and the databases are discovered only once when the
+server starts, instead of for every ``micronota annotate`` run. The jobs
+submitted by the clients are queued and run one after another by a
+worker thread. The queued jobs of the same kingdom as the last job are
+run first, so they reuse the databases it loaded into memory (see
+:mod:`micronota.residency`). The jobs waiting in the queue with the same
+kingdom and formats are run together by
+:func:`micronota.workflow.annotate_batch`, so the proteins of all of them
+are searched in a single DIAMOND run.
+
+The protocol is line-based JSON. The client sends a single request line
+and the server streams back status lines until the connection is closed:
+
+* request: ``{"cmd": "annotate", "job": {...}}``. ``job`` contains the
+  keyword arguments of :func:`micronota.workflow.annotate` among
+  ``in_fp``, ``in_fmt``, ``out_dir``, ``out_fmt``, ``kingdom``, ``force``
+  and ``out_seq``; ``in_fp`` and ``out_dir`` are required. Replies:
+  ``{"status": "queued", "position": int}``, ``{"status": "running"}``
+  and at last ``{"status": "done", "out_dir": str}`` or ``{"status":
+  "error", "message": str}``.
+
+* request: ``{"cmd": "status"}``; reply: ``{"status": "ok", "queued":
+  int}``.
+
+* request: ``{"cmd": "shutdown"}``; reply: ``{"status": "ok"}``. The
+  jobs already queued are finished before the server exits.
+
+The socket is only accessible to the user running the server.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import os
+import json
+import shutil
+import socket
+from os import remove, makedirs
+from os.path import exists, join, basename, dirname, splitext
+from tempfile import mkdtemp
+from queue import Queue
+from threading import Thread, Event
+from socketserver import ThreadingUnixStreamServer, StreamRequestHandler
+from logging import getLogger
+
+from .util import _overwrite, _strip_compression_suffix
+
+
+# the job keys accepted from the clients
+_JOB_KEYS = {'in_fp', 'in_fmt', 'out_dir', 'out_fmt', 'kingdom', 'force',
+             'out_seq'}
+
+
+def _check_job(job):
+    '''Raise ``ValueError`` if the job has keys not accepted.'''
+    if not isinstance(job, dict):
+        raise ValueError('Invalid job.')
+    unknown = set(job) - _JOB_KEYS
+    if unknown:
+        raise ValueError('Unknown job keys: %s' % ', '.join(sorted(unknown)))
+    missing = {'in_fp', 'out_dir'} - set(job)
+    if missing:
+        raise ValueError('Missing job keys: %s' % ', '.join(sorted(missing)))
+
+
+def _batch_key(job):
+    '''The jobs of the same key can be run in one batch.'''
+    kwargs = job.kwargs
+    return (kwargs.get('kingdom', 'Bacteria'), kwargs.get('in_fmt', 'fasta'),
+            kwargs.get('out_fmt', 'genbank'), kwargs.get('out_seq', True))
+
+
+def _prefix(in_fp):
+    return splitext(_strip_compression_suffix(basename(in_fp)))[0]
+
+
+class _Job(object):
+    '''A queued annotation job and the channel to report its status.'''
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self._status = Queue()
+
+    def report(self, **msg):
+        self._status.put(msg)
+
+    def __iter__(self):
+        '''Yield the status messages until the job is done or failed.'''
+        while True:
+            msg = self._status.get()
+            yield msg
+            if msg['status'] in ('done', 'error'):
+                return
+
+
+class _AffinityQueue(Queue):
+    '''A job queue that prefers the jobs of the same kingdom as the last.
+
+    The earliest queued job of the same kingdom is got first, so the jobs
+    searching the same database partitions run back to back. To be fair,
+    the job at the head is not passed over more than ``max_skip`` times.
+    '''
+    max_skip = 4
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self._last = None
+        self._skips = 0
+
+    def _get(self):
+        head = self.queue[0]
+        if (head is not None and self._skips < self.max_skip and
+                head.kwargs.get('kingdom') != self._last):
+            for i, job in enumerate(self.queue):
+                # the jobs queued before stopping are all before ``None``
+                if job is None:
+                    break
+                if job.kwargs.get('kingdom') == self._last:
+                    del self.queue[i]
+                    self._skips += 1
+                    return job
+        job = self.queue.popleft()
+        self._skips = 0
+        if job is not None:
+            self._last = job.kwargs.get('kingdom')
+        return job
+
+
+class _Handler(StreamRequestHandler):
+    def _send(self, msg):
+        self.wfile.write(json.dumps(msg).encode() + b'\n')
+        self.wfile.flush()
+
+    def handle(self):
+        try:
+            req = json.loads(self.rfile.readline().decode())
+            cmd = req['cmd']
+        except (ValueError, KeyError, TypeError):
+            self._send({'status': 'error', 'message': 'Invalid request.'})
+            return
+        server = self.server
+        if cmd == 'annotate':
+            try:
+                _check_job(req.get('job'))
+            except ValueError as e:
+                self._send({'status': 'error', 'message': str(e)})
+                return
+            job = _Job(req['job'])
+            position = server.submit(job)
+            if position is None:
+                self._send({'status': 'error',
+                            'message': 'The server is shutting down.'})
+                return
+            self._send({'status': 'queued', 'position': position})
+            try:
+                for msg in job:
+                    self._send(msg)
+            except OSError:
+                # the client hung up; the job still runs to the end
+                pass
+        elif cmd == 'status':
+            self._send({'status': 'ok', 'queued': server.jobs.qsize()})
+        elif cmd == 'shutdown':
+            server.stop()
+            self._send({'status': 'ok'})
+        else:
+            self._send({'status': 'error',
+                        'message': 'Unknown command: %s' % cmd})
+
+
+class Server(ThreadingUnixStreamServer):
+    '''Serve annotation jobs on a Unix socket.
+
+    Parameters
+    ----------
+    sock_fp : str
+        The path of the Unix socket.
+    config : ``micronota.config.Configuration``
+        Container for configuration options. It is shared by all the jobs.
+    cpus : int
+        Number of CPUs to use for each job.
+    run : callable or None
+        The function to run a job. It accepts the keyword arguments of
+        the job. Default to :func:`micronota.workflow.annotate`.
+    run_batch : callable or None
+        The function to run the queued jobs together. It accepts the
+        arguments of :func:`micronota.workflow.annotate_batch`, which is
+        the default.
+    max_batch : int
+        The max number of jobs to run together.
+    '''
+    daemon_threads = True
+
+    def __init__(self, sock_fp, config, cpus=1, run=None, run_batch=None,
+                 max_batch=16):
+        if exists(sock_fp):
+            # remove the stale socket left by a server that was killed
+            if _is_alive(sock_fp):
+                raise FileExistsError(
+                    'A server is already running on %s.' % sock_fp)
+            remove(sock_fp)
+        super().__init__(sock_fp, _Handler)
+        self.sock_fp = sock_fp
+        self.config = config
+        self.cpus = cpus
+        if run is None:
+            from .workflow import annotate
+            # warm up the databases before any job arrives
+            config.db
+            run = annotate
+        if run_batch is None:
+            from .workflow import annotate_batch
+            run_batch = annotate_batch
+        self._run = run
+        self._run_batch = run_batch
+        self.max_batch = max_batch
+        self.jobs = _AffinityQueue()
+        self._stopping = Event()
+        self._worker = Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def submit(self, job):
+        '''Queue a job and return its position in the queue.
+
+        It returns ``None`` if the server is shutting down.
+        '''
+        if self._stopping.is_set():
+            return None
+        self.jobs.put(job)
+        return self.jobs.qsize()
+
+    def server_bind(self):
+        # create the socket accessible only to the user
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def _drain(self, job):
+        '''Remove and return the queued jobs that can run with the job.'''
+        key = _batch_key(job)
+        prefixes = {_prefix(job.kwargs['in_fp'])}
+        jobs = []
+        with self.jobs.mutex:
+            queue = self.jobs.queue
+            for other in list(queue):
+                if len(jobs) + 1 >= self.max_batch:
+                    break
+                # the jobs queued before stopping are all before ``None``
+                if other is None:
+                    break
+                prefix = _prefix(other.kwargs['in_fp'])
+                # the outputs of a batch are named after the inputs
+                if _batch_key(other) == key and prefix not in prefixes:
+                    queue.remove(other)
+                    prefixes.add(prefix)
+                    jobs.append(other)
+        return jobs
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            jobs = [job] + self._drain(job)
+            for i in jobs:
+                i.report(status='running')
+            if len(jobs) == 1:
+                self._run_one(job)
+            else:
+                self._run_jobs(jobs)
+
+    def _run_one(self, job):
+        kwargs = dict(job.kwargs)
+        kwargs.setdefault('cpus', self.cpus)
+        kwargs['config'] = self.config
+        try:
+            self._run(**kwargs)
+        except Exception as e:
+            getLogger(__name__).exception('Job failed: %r' % job.kwargs)
+            job.report(status='error', message=str(e))
+        else:
+            job.report(status='done', out_dir=kwargs.get('out_dir'))
+
+    def _run_jobs(self, jobs):
+        '''Run the jobs in a batch and move the outputs to their dirs.
+
+        If the batch fails, the jobs are run one by one, so each client
+        gets the status of its own job.
+        '''
+        logger = getLogger(__name__)
+        ready = []
+        for job in jobs:
+            out_dir = job.kwargs['out_dir']
+            if exists(out_dir) and not job.kwargs.get('force', False):
+                job.report(status='error',
+                           message='The file path %s exists.' % out_dir)
+            else:
+                ready.append(job)
+        if len(ready) < 2:
+            for job in ready:
+                self._run_one(job)
+            return
+        kingdom, in_fmt, out_fmt, out_seq = _batch_key(ready[0])
+        logger.info('Running %d jobs in a batch.' % len(ready))
+        try:
+            # next to the output dirs, so the outputs are moved by renaming
+            parent = dirname(ready[0].kwargs['out_dir'])
+            makedirs(parent, exist_ok=True)
+            tmp_dir = mkdtemp(prefix='.batch', dir=parent)
+        except OSError:
+            tmp_dir = mkdtemp(prefix='batch')
+        try:
+            try:
+                self._run_batch(
+                    [job.kwargs['in_fp'] for job in ready], in_fmt,
+                    tmp_dir, out_fmt, self.cpus, kingdom, True, self.config,
+                    out_seq=out_seq)
+            except Exception:
+                logger.exception('Batch failed; run the jobs one by one.')
+                for job in ready:
+                    self._run_one(job)
+                return
+            for job in ready:
+                out_dir = job.kwargs['out_dir']
+                prefix = _prefix(job.kwargs['in_fp'])
+                try:
+                    _overwrite(out_dir, overwrite=True)
+                    makedirs(out_dir)
+                    fn = '%s.%s' % (prefix, out_fmt)
+                    shutil.move(join(tmp_dir, fn), join(out_dir, fn))
+                    # the batch report covers all the jobs of the batch
+                    for ext in ('json', 'tsv'):
+                        shutil.copy(
+                            join(tmp_dir, 'batch.report.%s' % ext),
+                            join(out_dir, '%s.report.%s' % (prefix, ext)))
+                except Exception as e:
+                    logger.exception('Job failed: %r' % job.kwargs)
+                    job.report(status='error', message=str(e))
+                else:
+                    job.report(status='done', out_dir=out_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def stop(self):
+        '''Finish the queued jobs and stop serving.'''
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+
+        def _stop():
+            self.jobs.put(None)
+            self._worker.join()
+            self.shutdown()
+        # ``shutdown`` blocks until ``serve_forever`` returns, so it can't
+        # be called from the request handler thread directly
+        Thread(target=_stop, daemon=True).start()
+
+    def server_close(self):
+        super().server_close()
+        if exists(self.sock_fp):
+            remove(self.sock_fp)
+
+
+def _is_alive(sock_fp):
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(sock_fp)
+    except OSError:
+        return False
+    finally:
+        s.close()
+    return True
+
+
+def request(sock_fp, req):
+    '''Send a request to the server and yield the replies.
+
+    Parameters
+    ----------
+    sock_fp : str
+        The path of the Unix socket.
+    req : dict
+        The request.
+
+    Yields
+    ------
+    dict
+        The status messages from the server.
+    '''
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.connect(sock_fp)
+    with s, s.makefile('rb') as f:
+        s.sendall(json.dumps(req).encode() + b'\n')
+        for line in f:
+            yield json.loads(line.decode())
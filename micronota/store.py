@@ -0,0 +1,174 @@
+r'''
+Intermediate store
+==================
+
+.. currentmodule:: micronota.store
+
+This module (:mod:`micronota.store`) packs the intermediate files of each
+input sequence into a few sqlite3 database files, instead of leaving a
+directory tree for every sequence in the output directory. The files are
+keyed by the sequence ID, the tool and the file name, and the sequences
+are sharded into the database files by the hash of their IDs. A single
+file or all the files of a sequence can be fetched randomly, e.g. for
+debugging.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import zlib
+from os import walk, makedirs
+from os.path import join, relpath, dirname, exists
+from sqlite3 import connect
+from threading import Lock
+
+
+class Store(object):
+    '''Sharded store of the intermediate files.
+
+    Parameters
+    ----------
+    d : str
+        The directory of the database files.
+    shards : int
+        The number of database files.
+    prefix : str
+        The prefix of the database file names.
+
+    Notes
+    -----
+    Each database file has a table named ``intermediate`` with following
+    columns:
+
+    1. ``contig``. TEXT. The input sequence ID.
+
+    2. ``tool``. TEXT. The tool that created the file. It is empty for
+       the files not created by a specific tool.
+
+    3. ``name``. TEXT. The file name relative to the tool directory.
+
+    4. ``data``. BLOB. zlib compressed file content.
+    '''
+    _table = 'intermediate'
+
+    def __init__(self, d, shards=4, prefix='intermediate'):
+        self.fps = [join(d, '%s_%d.db' % (prefix, i)) for i in range(shards)]
+        self._lock = Lock()
+        self._conns = []
+        for fp in self.fps:
+            conn = connect(fp, check_same_thread=False)
+            conn.execute('''CREATE TABLE IF NOT EXISTS {t} (
+                                contig TEXT NOT NULL,
+                                tool   TEXT NOT NULL,
+                                name   TEXT NOT NULL,
+                                data   BLOB NOT NULL,
+                                PRIMARY KEY (contig, tool, name));'''.format(
+                                    t=self._table))
+            self._conns.append(conn)
+
+    def _conn(self, contig):
+        i = zlib.crc32(contig.encode()) % len(self._conns)
+        return self._conns[i]
+
+    def put(self, contig, tool, name, data):
+        '''Add (or replace) a file.
+
+        Parameters
+        ----------
+        contig, tool, name : str
+            The key of the file.
+        data : bytes
+            The file content.
+        '''
+        conn = self._conn(contig)
+        with self._lock:
+            conn.execute(
+                'INSERT OR REPLACE INTO {t} VALUES (?,?,?,?);'.format(
+                    t=self._table),
+                (contig, tool, name, zlib.compress(data)))
+            conn.commit()
+
+    def put_dir(self, contig, d):
+        '''Add all the files in a directory of a sequence.
+
+        The 1st level sub-directories are taken as tool names.
+
+        Returns
+        -------
+        int
+            The number of files added.
+        '''
+        rows = []
+        for dirpath, _, filenames in walk(d):
+            for fn in filenames:
+                path = relpath(join(dirpath, fn), d).split('/', 1)
+                if len(path) == 1:
+                    tool, name = '', path[0]
+                else:
+                    tool, name = path
+                with open(join(dirpath, fn), 'rb') as f:
+                    rows.append(
+                        (contig, tool, name, zlib.compress(f.read())))
+        conn = self._conn(contig)
+        with self._lock:
+            conn.executemany(
+                'INSERT OR REPLACE INTO {t} VALUES (?,?,?,?);'.format(
+                    t=self._table),
+                rows)
+            conn.commit()
+        return len(rows)
+
+    def get(self, contig, tool, name):
+        '''Return the content of a file.
+
+        Raises
+        ------
+        KeyError
+            If the file is not in the store.
+        '''
+        with self._lock:
+            row = self._conn(contig).execute(
+                '''SELECT data FROM {t}
+                   WHERE contig = ? AND tool = ? AND name = ?;'''.format(
+                       t=self._table),
+                (contig, tool, name)).fetchone()
+        if row is None:
+            raise KeyError((contig, tool, name))
+        return zlib.decompress(row[0])
+
+    def keys(self, contig=None):
+        '''Return the keys of the files, optionally of a single sequence.'''
+        if contig is None:
+            conns = self._conns
+            sql, args = 'SELECT contig, tool, name FROM {t};', ()
+        else:
+            conns = [self._conn(contig)]
+            sql = 'SELECT contig, tool, name FROM {t} WHERE contig = ?;'
+            args = (contig, )
+        keys = []
+        with self._lock:
+            for conn in conns:
+                keys.extend(conn.execute(sql.format(t=self._table), args))
+        return sorted(keys)
+
+    def extract(self, contig, out_dir):
+        '''Write the files of a sequence back into a directory tree.'''
+        for _, tool, name in self.keys(contig):
+            fp = join(out_dir, tool, name)
+            d = dirname(fp)
+            if not exists(d):
+                makedirs(d)
+            with open(fp, 'wb') as f:
+                f.write(self.get(contig, tool, name))
+
+    def close(self):
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
@@ -0,0 +1,28 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from subprocess import check_output
+import sys
+
+
+class LazyImportTests(TestCase):
+    def test_heavy_modules_not_imported(self):
+        '''Loading the commands should not import the heavy dependencies.'''
+        code = ('import sys\n'
+                'from micronota.cli import cmd\n'
+                'for i in cmd.list_commands(None):\n'
+                '    cmd.get_command(None, i)\n'
+                'print(" ".join(sorted(sys.modules)))\n')
+        modules = check_output([sys.executable, '-c', code]).decode().split()
+        for i in ['skbio', 'pandas', 'burrito', 'micronota.workflow']:
+            self.assertNotIn(i, modules)
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,8 @@ class ConfigurationTests(TestCase):
         exp = ConfigParser(allow_no_value=True)
         exp.read(self.misc_fp)
         self.assertEqual(exp['general']['db_dir'], obs.db_dir)
+        self.assertIsNone(obs.scratch_dir)
+        self.assertEqual(obs.diamond_outfmt, 'tab')
         self.assertEqual(exp['feature'], obs.features)
         self.assertEqual(exp['cds'], obs.cds)
         exp = ConfigParser(allow_no_value=True)
@@ -45,6 +47,7 @@ class ConfigurationTests(TestCase):
         exp = ConfigParser(allow_no_value=True)
         exp.read(self.misc_fp_local)
         self.assertEqual(exp['general']['db_dir'], obs.db_dir)
+        self.assertEqual(obs.diamond_outfmt, 'sam')
         self.assertEqual(exp['feature'], obs.features)
         self.assertEqual(exp['cds'], obs.cds)
         exp = ConfigParser(allow_no_value=True)
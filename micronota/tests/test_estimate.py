@@ -0,0 +1,121 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import makedirs
+from os.path import join
+from unittest.mock import patch
+
+from micronota.estimate import (
+    _read_lengths, _sample, _write_sample, _fit, extrapolate,
+    format_estimate, estimate)
+from micronota.report import Report
+
+
+class EstimateTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.fp = join(self.tmp_dir, 'in.fna')
+        with open(self.fp, 'w') as f:
+            f.write('>s1 first\nACGT\nAC\n>s.2\nACGTACGTAC\n>s3\nA\n')
+        self.lengths = [('s1', 6), ('s.2', 10), ('s3', 1)]
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_read_lengths(self):
+        self.assertEqual(_read_lengths(self.fp, 'fasta'), self.lengths)
+
+    def test_read_lengths_no_id(self):
+        with open(self.fp, 'a') as f:
+            f.write('>\nACGT\n')
+        with self.assertRaisesRegex(ValueError, 'No sequence ID .* line 8'):
+            _read_lengths(self.fp, 'fasta')
+
+    def test_sample(self):
+        obs = _sample(self.lengths, 0.5)
+        self.assertLessEqual(sum(self.lengths[i][1] for i in obs), 8.5)
+        self.assertEqual(obs, sorted(obs))
+        self.assertEqual(obs, _sample(self.lengths, 0.5))
+        # at least the shortest is sampled
+        self.assertEqual(_sample(self.lengths, 0), [2])
+        self.assertEqual(_sample(self.lengths, 1), [0, 1, 2])
+
+    def test_write_sample(self):
+        out_fp = join(self.tmp_dir, 'out.fna')
+        _write_sample(self.fp, 'fasta', [0, 2], out_fp)
+        with open(out_fp) as f:
+            self.assertEqual(f.read(), '>s1 first\nACGT\nAC\n>s3\nA\n')
+
+    def test_fit(self):
+        a, b = _fit([1, 2, 4], [3, 5, 9])
+        self.assertAlmostEqual(a, 1)
+        self.assertAlmostEqual(b, 2)
+        # the fixed cost cannot be negative
+        self.assertEqual(_fit([1, 2, 4], [0, 2, 6]), (0.0, 8 / 7))
+        self.assertEqual(_fit([5], [3]), (3, 0))
+
+    def test_extrapolate(self):
+        records = [
+            {'name': 'prodigal', 'seq': 's1', 'start': 0, 'wall': 2},
+            {'name': 'diamond', 'seq': 's_2', 'start': 2, 'wall': 6},
+            {'name': 'diamond blastp', 'seq': None, 'start': 2, 'wall': 5},
+            {'name': 'prodigal', 'seq': 's.2', 'start': 2, 'wall': 3},
+            {'name': 'diamond', 'seq': 's1', 'start': 3, 'wall': 5}]
+        obs = extrapolate(records, self.lengths, [0, 1])
+        self.assertEqual(list(obs), ['prodigal', 'diamond'])
+        self.assertEqual(obs['prodigal']['sample'], 5)
+        # 0.5 s per sequence plus 0.25 s per bp
+        self.assertAlmostEqual(obs['prodigal']['estimate'], 0.5 * 3 + 4.25)
+        self.assertEqual(obs['diamond']['sample'], 11)
+        self.assertAlmostEqual(obs['diamond']['estimate'], 3.5 * 3 + 4.25)
+
+    def test_estimate(self):
+        configs = []
+
+        def annotate(in_fp, in_fmt, out_dir, out_fmt, cpus, kingdom,
+                     force, config, **kwargs):
+            configs.append(config)
+            makedirs(out_dir)
+            with open(join(out_dir, 'in.genbank'), 'w') as f:
+                f.write('x' * 100)
+            Report().write_json(join(out_dir, 'in.report.json'))
+
+        class Config:
+            scratch_dir = self.tmp_dir
+            partition_order = 'adaptive'
+
+        config = Config()
+        with patch('micronota.workflow.annotate', side_effect=annotate):
+            obs = estimate(self.fp, 'fasta', 'genbank', 1, 'Bacteria',
+                           config, fraction=0.5)
+        # the sample run does not record the partition statistics
+        self.assertEqual(configs[0].partition_order, 'fixed')
+        self.assertEqual(config.partition_order, 'adaptive')
+        self.assertEqual(obs['sequences'], (3, 17))
+        sample = obs['sample'][1]
+        self.assertAlmostEqual(obs['output']['estimate'], 100 * 17 / sample)
+
+    def test_format_estimate(self):
+        est = {'sequences': (3, 17), 'sample': (2, 16), 'cpus': 4,
+               'stages': extrapolate([], self.lengths, []),
+               'wall': {'sample': 90, 'estimate': 7200},
+               'output': {'sample': 100, 'estimate': 3 << 20},
+               'intermediates': {'sample': 0, 'estimate': 0}}
+        obs = format_estimate(est).split('\n')
+        self.assertEqual(obs[0],
+                         '3 sequences (17 bp), sampled 2 (16 bp), at 4 CPUs')
+        self.assertIn('1.5 min', obs[2])
+        self.assertIn('2.0 h', obs[2])
+        self.assertIn('3.0 MB', obs[3])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import makedirs, utime
+from os.path import join
+
+from micronota.incremental import fingerprint, _db_fingerprint, ResultCache
+
+
+class FingerprintTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint('a', [('b', 1)]),
+                         fingerprint('a', [('b', '1')]))
+        self.assertNotEqual(fingerprint('ab', 'c'), fingerprint('a', 'bc'))
+        self.assertNotEqual(fingerprint(['a', 'b']), fingerprint('a', 'b'))
+
+    def test_db_fingerprint(self):
+        d = join(self.tmp_dir, 'db')
+        makedirs(join(d, 'sub'))
+        fp = join(d, 'sub', 'a.dmnd')
+        with open(fp, 'w') as f:
+            f.write('a')
+        obs = _db_fingerprint(d)
+        # the manifest is not part of the data
+        with open(join(d, 'manifest.json'), 'w') as f:
+            f.write('{}')
+        self.assertEqual(_db_fingerprint(d), obs)
+        utime(fp, (0, 0))
+        self.assertNotEqual(_db_fingerprint(d), obs)
+        self.assertNotEqual(_db_fingerprint(fp), _db_fingerprint(None))
+
+
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.fp = join(self.tmp_dir, 'cache.db')
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_get_put(self):
+        cache = ResultCache(self.fp)
+        self.assertIsNone(cache.get('c1', 'prodigal', 'k1'))
+        cache.put('c1', 'prodigal', 'k1', {'a': [(0, 3)]})
+        cache.close()
+        # the results are kept across runs
+        cache = ResultCache(self.fp)
+        self.assertEqual(cache.get('c1', 'prodigal', 'k1'), {'a': [(0, 3)]})
+        # the result is stale if its key changed
+        self.assertIsNone(cache.get('c1', 'prodigal', 'k2'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.put('c1', 'prodigal', 'k2', {})
+        self.assertIsNone(cache.get('c1', 'prodigal', 'k1'))
+        cache.close()
+
+    def test_batch(self):
+        cache = ResultCache(self.fp, batch=2, interval=3600)
+        cache.put('c1', 'prodigal', 'k', 1)
+        # another connection only sees the committed results
+        other = ResultCache(self.fp)
+        self.assertEqual(other.contigs(), set())
+        cache.put('c2', 'prodigal', 'k', 2)
+        self.assertEqual(other.contigs(), {'c1', 'c2'})
+        cache.put('c3', 'prodigal', 'k', 3)
+        cache.close()
+        self.assertEqual(other.contigs(), {'c1', 'c2', 'c3'})
+        other.close()
+
+    def test_prune(self):
+        cache = ResultCache(self.fp)
+        for contig in ['c1', 'c2']:
+            cache.put(contig, 'prodigal', 'k', 1)
+            cache.put(contig, 'cds', 'k', 2)
+        self.assertEqual(cache.prune(['c2', 'c3']), 1)
+        self.assertEqual(cache.contigs(), {'c2'})
+        cache.close()
+
+    def test_db_fingerprint(self):
+        fp = join(self.tmp_dir, 'a.dmnd')
+        with open(fp, 'w') as f:
+            f.write('a')
+        cache = ResultCache(self.fp)
+        obs = cache.db_fingerprint(fp)
+        utime(fp, (0, 0))
+        # computed once per run
+        self.assertEqual(cache.db_fingerprint(fp), obs)
+        cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import listdir
+from os.path import join, exists
+from io import StringIO
+
+from micronota.intermediate import Intermediate, _write_fasta
+
+
+class IntermediateTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.n = 0
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def _write(self, fh):
+        self.n += 1
+        _write_fasta(fh, 'seq1', 'ATGC')
+
+    def test_write_fasta(self):
+        f = StringIO()
+        _write_fasta(f, 'a', 'ATGC')
+        _write_fasta(f, 'b', 'GG')
+        self.assertEqual(f.getvalue(), '>a\nATGC\n>b\nGG\n')
+
+    def test_acquire_release(self):
+        files = Intermediate(self.tmp_dir)
+        fp1 = files.acquire('a.fna', self._write)
+        fp2 = files.acquire('a.fna', self._write)
+        # written only once and shared
+        self.assertEqual(fp1, fp2)
+        self.assertEqual(self.n, 1)
+        with open(fp1) as f:
+            self.assertEqual(f.read(), '>seq1\nATGC\n')
+        files.release('a.fna')
+        self.assertTrue(exists(fp1))
+        files.release('a.fna')
+        self.assertFalse(exists(fp1))
+        files.close()
+        self.assertEqual(listdir(self.tmp_dir), [])
+
+    def test_use(self):
+        files = Intermediate(self.tmp_dir)
+        with files.use('a.fna', self._write) as fp:
+            self.assertTrue(exists(fp))
+        self.assertFalse(exists(fp))
+        files.close()
+
+    def test_discard(self):
+        files = Intermediate(self.tmp_dir)
+        d = files.workdir('seq1', 'prodigal')
+        self.assertTrue(exists(d))
+        files.discard('seq1')
+        self.assertFalse(exists(files.path('seq1')))
+        files.close()
+        self.assertEqual(listdir(self.tmp_dir), [])
+
+    def test_keep(self):
+        files = Intermediate(self.tmp_dir, keep=True)
+        files.workdir('seq1', 'prodigal')
+        with files.use('a.fna', self._write):
+            pass
+        files.discard('seq1')
+        files.close()
+        self.assertCountEqual(listdir(self.tmp_dir), ['seq1', 'a.fna'])
+        self.assertTrue(exists(join(self.tmp_dir, 'seq1', 'prodigal')))
+
+    def test_scratch(self):
+        scratch = mkdtemp(dir=self.tmp_dir)
+        dest = join(self.tmp_dir, 'out')
+        files = Intermediate(dest, root=scratch)
+        self.assertTrue(files.root.startswith(scratch))
+        files.workdir('seq1')
+        with open(files.output('out.gbk'), 'w') as f:
+            f.write('//\n')
+        files.close()
+        # only the output is copied back
+        self.assertEqual(listdir(dest), ['out.gbk'])
+        self.assertEqual(listdir(scratch), [])
+
+    def test_close_without_outputs(self):
+        dest = join(self.tmp_dir, 'out')
+        files = Intermediate(dest, keep=True)
+        files.workdir('seq1')
+        with open(files.output('out.gbk'), 'w') as f:
+            f.write('incomplete')
+        files.close(outputs=False)
+        self.assertEqual(listdir(dest), ['seq1'])
+
+    def test_keep_file(self):
+        dest = join(self.tmp_dir, 'out')
+        files = Intermediate(dest, root=join(self.tmp_dir, 'scratch'))
+        with open(files.keep_file('store.db'), 'w') as f:
+            f.write('x')
+        with open(files.output('out.gbk'), 'w') as f:
+            f.write('incomplete')
+        # the kept file is moved even if the run failed
+        files.close(outputs=False)
+        self.assertEqual(listdir(dest), ['store.db'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from threading import Lock
+
+from micronota.pipeline import pipeline
+
+
+class PipelineTests(TestCase):
+    def test_order(self):
+        obs = list(pipeline(range(100), [lambda x: x + 1, lambda x: x * 2]))
+        self.assertEqual(obs, [(i + 1) * 2 for i in range(100)])
+
+    def test_no_stage(self):
+        self.assertEqual(list(pipeline(iter('abc'), [])), ['a', 'b', 'c'])
+
+    def test_empty(self):
+        self.assertEqual(list(pipeline([], [str])), [])
+
+    def test_bounded(self):
+        # the source can't run ahead of the consumer by more than the
+        # total capacity of the queues and the items held by the threads
+        lock = Lock()
+        n = [0]
+
+        def source():
+            for i in range(50):
+                with lock:
+                    n[0] += 1
+                yield i
+
+        for i, _ in enumerate(pipeline(source(), [str], maxsize=1)):
+            with lock:
+                self.assertLessEqual(n[0] - i, 5)
+
+    def test_stage_error(self):
+        def f(x):
+            if x == 3:
+                raise ValueError('bad item')
+            return x
+
+        with self.assertRaisesRegex(ValueError, 'bad item'):
+            list(pipeline(range(10), [f]))
+
+    def test_source_error(self):
+        def source():
+            yield 1
+            raise IOError('bad file')
+
+        with self.assertRaisesRegex(IOError, 'bad file'):
+            list(pipeline(source(), [str]))
+
+    def test_stop_early(self):
+        res = pipeline(range(1000), [str], maxsize=1)
+        self.assertEqual(next(res), '0')
+        # closing the generator must not hang
+        res.close()
+
+
+if __name__ == '__main__':
+    main()
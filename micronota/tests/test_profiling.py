@@ -0,0 +1,78 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import pstats
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join
+from threading import Thread
+
+from micronota.profiling import Profiler, summarize, _module
+from micronota.pipeline import pipeline
+
+
+def _busy(n=10000):
+    return sum(i * i for i in range(n))
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.fp = join(self.tmp_dir, 'test.prof')
+        profiler = Profiler()
+        profiler.start()
+        t = Thread(target=_busy)
+        t.start()
+        t.join()
+        _busy()
+        profiler.stop(self.fp)
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_profiler(self):
+        stats = pstats.Stats(self.fp)
+        calls = [v[1] for k, v in stats.stats.items() if k[2] == '_busy']
+        # called in both the main thread and the other thread
+        self.assertEqual(calls, [2])
+
+    def test_pipeline(self):
+        fp = join(self.tmp_dir, 'pipeline.prof')
+        profiler = Profiler()
+        profiler.start()
+        # the source and each stage run in their own thread
+        obs = list(pipeline(range(5), [_busy, _busy]))
+        profiler.stop(fp)
+        self.assertEqual(obs, [_busy(_busy(i)) for i in range(5)])
+        stats = pstats.Stats(fp)
+        calls = [v[1] for k, v in stats.stats.items() if k[2] == '_busy']
+        self.assertEqual(calls, [10])
+
+    def test_summarize(self):
+        total, obs = summarize(self.fp, top=3)
+        self.assertGreater(total, 0)
+        self.assertLessEqual(len(obs), 3)
+        self.assertIn('micronota.tests.test_profiling', [i[0] for i in obs])
+        self.assertEqual(obs, sorted(obs, key=lambda x: x[1], reverse=True))
+
+    def test_module(self):
+        for fn, exp in [
+                ('/a/micronota/micronota/bfillings/diamond.py',
+                 'micronota.bfillings.diamond'),
+                ('/a/micronota/micronota/__init__.py', 'micronota'),
+                ('/a/lib/python3.5/site-packages/pandas/core/frame.py',
+                 'pandas.core.frame'),
+                ('/a/lib/python3.5/json/decoder.py', 'json.decoder'),
+                ('~', '<built-in>'),
+                ('<string>', '<string>')]:
+            self.assertEqual(_module(fn), exp)
+
+
+if __name__ == '__main__':
+    main()
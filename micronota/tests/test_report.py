@@ -0,0 +1,87 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join
+from subprocess import check_call
+
+from micronota.report import Report, stage, _COLUMNS
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.report = Report()
+        with self.report.activate():
+            with stage('prodigal', 'seq1') as rec:
+                check_call(['true'])
+                rec['records_out'] = 3
+            with stage('diamond blastp', db='Swiss-Prot_Bacteria'):
+                pass
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_stage(self):
+        obs = self.report.records
+        self.assertEqual(len(obs), 2)
+        self.assertEqual(obs[0]['name'], 'prodigal')
+        self.assertEqual(obs[0]['seq'], 'seq1')
+        self.assertEqual(obs[0]['records_out'], 3)
+        self.assertIsNone(obs[0]['records_in'])
+        self.assertEqual(obs[1]['db'], 'Swiss-Prot_Bacteria')
+        for rec in obs:
+            for k in ['start', 'wall', 'cpu', 'child_cpu']:
+                self.assertGreaterEqual(rec[k], 0)
+        self.assertLessEqual(obs[0]['start'], obs[1]['start'])
+
+    def test_stage_inactive(self):
+        with stage('prodigal', 'seq2') as rec:
+            rec['records_out'] = 1
+        self.assertEqual(len(self.report.records), 2)
+
+    def test_stage_error(self):
+        with self.assertRaises(ValueError):
+            with self.report.stage('hmmscan'):
+                raise ValueError()
+        self.assertEqual(self.report.records[-1]['name'], 'hmmscan')
+
+    def test_write_json(self):
+        fp = join(self.tmp_dir, 'report.json')
+        self.report.write_json(fp)
+        with open(fp) as f:
+            obs = json.load(f)
+        self.assertEqual([i['name'] for i in obs['records']],
+                         ['prodigal', 'diamond blastp'])
+
+    def test_write_tsv(self):
+        fp = join(self.tmp_dir, 'report.tsv')
+        self.report.write_tsv(fp)
+        with open(fp) as f:
+            lines = [i.rstrip('\n').split('\t') for i in f]
+        self.assertEqual(lines[0], _COLUMNS)
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1][:2], ['prodigal', 'seq1'])
+        self.assertEqual(lines[1][-2:], ['', '3'])
+
+    def test_write_trace(self):
+        fp = join(self.tmp_dir, 'trace.json')
+        self.report.write_trace(fp)
+        with open(fp) as f:
+            obs = json.load(f)['traceEvents']
+        self.assertEqual(len(obs), 2)
+        self.assertEqual(obs[0]['ph'], 'X')
+        self.assertEqual(obs[0]['name'], 'prodigal')
+        self.assertEqual(obs[1]['args']['db'], 'Swiss-Prot_Bacteria')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree, disk_usage
+from os import makedirs, listdir, remove
+from os.path import join, exists, basename
+
+from micronota.residency import DBResidency, _resident_fraction
+from micronota.report import Report
+
+
+class DBResidencyTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.cache_dir = join(self.tmp_dir, 'shm')
+        self.dbs = []
+        for i, size in [('a', 3000), ('b', 2000)]:
+            d = join(self.tmp_dir, i)
+            makedirs(d)
+            # the databases of the same name in different dirs
+            db = join(d, 'uniref100_Bacteria')
+            with open(db + '.dmnd', 'wb') as f:
+                f.write(b'x' * size)
+            self.dbs.append(db)
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_resident_fraction(self):
+        obs = _resident_fraction(self.dbs[0] + '.dmnd')
+        if obs is not None:
+            self.assertGreaterEqual(obs, 0)
+            self.assertLessEqual(obs, 1)
+
+    def test_fadvise(self):
+        report = Report()
+        res = DBResidency()
+        with report.activate():
+            res.prefetch(self.dbs[1:])
+            obs = [res.resident(i) for i in self.dbs + self.dbs]
+        res.close()
+        self.assertEqual(obs, self.dbs + self.dbs)
+        self.assertEqual(res.stats[self.dbs[0]]['loads'], 2)
+        self.assertEqual([i['name'] for i in report.records],
+                         ['db load'] * 4)
+        self.assertIn('cache_hit', report.records[0])
+
+    def test_tmpfs(self):
+        res = DBResidency('tmpfs', self.cache_dir)
+        obs = [res.resident(i) for i in self.dbs + self.dbs]
+        res.close()
+        self.assertEqual(obs[:2], obs[2:])
+        self.assertNotEqual(obs[0], obs[1])
+        for db, copy in zip(self.dbs, obs):
+            with open(db + '.dmnd', 'rb') as i_f, \
+                    open(copy + '.dmnd', 'rb') as o_f:
+                self.assertEqual(i_f.read(), o_f.read())
+        stats = res.stats[self.dbs[0]]
+        self.assertEqual((stats['loads'], stats['hits']), (2, 1))
+
+        # the copies are reused across runs
+        res = DBResidency('tmpfs', self.cache_dir)
+        res.resident(self.dbs[0])
+        res.close()
+        self.assertEqual(res.stats[self.dbs[0]]['hits'], 1)
+
+    def test_tmpfs_evict(self):
+        d = join(self.tmp_dir, 'c')
+        makedirs(d)
+        db = join(d, 'uniref100_Archaea')
+        with open(db + '.dmnd', 'wb') as f:
+            f.write(b'x' * 1000)
+        res = DBResidency('tmpfs', self.cache_dir, cache_size=4000)
+        obs = [res.resident(self.dbs[0])]
+        # the copy returned last is in use and not evicted, so the next
+        # does not fit and is read from its source
+        obs.append(res.resident(self.dbs[1]))
+        self.assertEqual(obs[1], self.dbs[1])
+        self.assertTrue(exists(obs[0] + '.dmnd'))
+        obs.append(res.resident(db))
+        self.assertNotEqual(obs[2], db)
+        # the least recently used is evicted
+        obs.append(res.resident(self.dbs[1]))
+        res.close()
+        self.assertFalse(exists(obs[0] + '.dmnd'))
+        self.assertEqual(sorted(listdir(self.cache_dir)),
+                         sorted(basename(i) + '.dmnd' for i in obs[2:]))
+
+    def test_tmpfs_too_large(self):
+        res = DBResidency('tmpfs', self.cache_dir, cache_size=2500)
+        obs = [res.resident(i) for i in self.dbs]
+        res.close()
+        self.assertEqual(obs[0], self.dbs[0])
+        self.assertNotEqual(obs[1], self.dbs[1])
+        self.assertEqual(listdir(self.cache_dir), [basename(obs[1]) + '.dmnd'])
+
+    def test_tmpfs_default_size(self):
+        res = DBResidency('tmpfs', self.cache_dir)
+        res.close()
+        self.assertGreater(res.cache_size, 0)
+        self.assertLessEqual(res.cache_size,
+                             disk_usage(self.cache_dir).free)
+
+    def test_tmpfs_removed(self):
+        res = DBResidency('tmpfs', self.cache_dir, cache_size=5000)
+        copy = res.resident(self.dbs[0])
+        # removed by another process sharing the cache dir
+        remove(copy + '.dmnd')
+        res.resident(self.dbs[1])
+        # it is copied again
+        self.assertEqual(res.resident(self.dbs[0]), copy)
+        res.close()
+        self.assertTrue(exists(copy + '.dmnd'))
+
+    def test_mode(self):
+        with self.assertRaisesRegex(ValueError, 'Unknown'):
+            DBResidency('foo')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import stat
+from os.path import join, exists
+from threading import Thread, Event
+
+from micronota.server import Server, request, _Job, _AffinityQueue
+
+
+class ServerTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.sock_fp = join(self.tmp_dir, 'test.sock')
+        self.runs = []
+        self.batches = []
+        self.unblock = Event()
+
+        def run(**kwargs):
+            if kwargs['in_fp'] == 'bad':
+                raise ValueError('bad input')
+            if kwargs['in_fp'] == 'slow':
+                self.unblock.wait()
+            self.runs.append(kwargs)
+
+        def run_batch(in_fps, in_fmt, out_dir, out_fmt, cpus, kingdom,
+                      force, config, out_seq=True):
+            # the proteins of all the inputs are searched once here
+            self.batches.append(in_fps)
+            for fp in in_fps:
+                with open(join(out_dir, '%s.%s' % (fp, out_fmt)), 'w') as f:
+                    f.write(fp)
+            for ext in ('json', 'tsv'):
+                with open(join(out_dir, 'batch.report.%s' % ext), 'w'):
+                    pass
+
+        self.server = Server(self.sock_fp, 'config', cpus=2, run=run,
+                             run_batch=run_batch)
+        self.thread = Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.thread.join()
+        self.server.server_close()
+        rmtree(self.tmp_dir)
+
+    def test_annotate(self):
+        job = {'in_fp': 'a.fna', 'out_dir': 'out'}
+        obs = list(request(self.sock_fp, {'cmd': 'annotate', 'job': job}))
+        self.assertEqual(obs, [{'status': 'queued', 'position': 1},
+                               {'status': 'running'},
+                               {'status': 'done', 'out_dir': 'out'}])
+        self.assertEqual(self.runs, [{'in_fp': 'a.fna', 'out_dir': 'out',
+                                      'cpus': 2, 'config': 'config'}])
+
+    def test_annotate_error(self):
+        job = {'in_fp': 'bad', 'out_dir': 'out'}
+        obs = list(request(self.sock_fp, {'cmd': 'annotate', 'job': job}))
+        self.assertEqual(obs[-1], {'status': 'error', 'message': 'bad input'})
+        # the server still serves after a failed job
+        obs = list(request(self.sock_fp, {'cmd': 'status'}))
+        self.assertEqual(obs, [{'status': 'ok', 'queued': 0}])
+
+    def test_batch(self):
+        # the worker is busy while the next jobs are queued
+        slow = _Job({'in_fp': 'slow', 'out_dir': join(self.tmp_dir, 's')})
+        self.server.submit(slow)
+        self.assertEqual(next(iter(slow)), {'status': 'running'})
+        jobs = [_Job({'in_fp': i, 'out_dir': join(self.tmp_dir, i)})
+                for i in ['a', 'b']]
+        # a job of another kingdom is run on its own
+        jobs.append(_Job({'in_fp': 'c', 'out_dir': join(self.tmp_dir, 'c'),
+                          'kingdom': 'Archaea'}))
+        for job in jobs:
+            self.server.submit(job)
+        self.unblock.set()
+        obs = [list(job)[-1] for job in jobs]
+        self.assertEqual(
+            obs, [{'status': 'done', 'out_dir': join(self.tmp_dir, i)}
+                  for i in ['a', 'b', 'c']])
+        self.assertEqual(self.batches, [['a', 'b']])
+        self.assertEqual([i['in_fp'] for i in self.runs], ['slow', 'c'])
+        for i in ['a', 'b']:
+            with open(join(self.tmp_dir, i, '%s.genbank' % i)) as f:
+                self.assertEqual(f.read(), i)
+            self.assertTrue(
+                exists(join(self.tmp_dir, i, '%s.report.json' % i)))
+
+    def test_invalid_job(self):
+        job = {'in_fp': 'a.fna', 'out_dir': 'out', 'scratch_dir': '/'}
+        obs = list(request(self.sock_fp, {'cmd': 'annotate', 'job': job}))
+        self.assertEqual(obs, [{'status': 'error',
+                                'message': 'Unknown job keys: scratch_dir'}])
+        obs = list(request(self.sock_fp, {'cmd': 'annotate',
+                                          'job': {'in_fp': 'a.fna'}}))
+        self.assertEqual(obs, [{'status': 'error',
+                                'message': 'Missing job keys: out_dir'}])
+        self.assertEqual(self.runs, [])
+
+    def test_socket_mode(self):
+        self.assertEqual(stat(self.sock_fp).st_mode & 0o777, 0o600)
+
+    def test_invalid(self):
+        obs = list(request(self.sock_fp, {'foo': 'bar'}))
+        self.assertEqual(obs[0]['status'], 'error')
+        obs = list(request(self.sock_fp, {'cmd': 'foo'}))
+        self.assertEqual(
+            obs, [{'status': 'error', 'message': 'Unknown command: foo'}])
+
+    def test_shutdown(self):
+        obs = list(request(self.sock_fp, {'cmd': 'shutdown'}))
+        self.assertEqual(obs, [{'status': 'ok'}])
+        self.thread.join()
+        self.server.server_close()
+        self.assertFalse(exists(self.sock_fp))
+
+    def test_running(self):
+        with self.assertRaisesRegex(FileExistsError, 'already running'):
+            Server(self.sock_fp, 'config', run=print)
+
+
+class AffinityQueueTests(TestCase):
+    def test_get(self):
+        q = _AffinityQueue()
+        kingdoms = ['Bacteria', 'Archaea', 'Bacteria', 'Viruses', 'Archaea']
+        for i, k in enumerate(kingdoms):
+            q.put(_Job({'in_fp': i, 'kingdom': k}))
+        q.put(None)
+        obs = [q.get() for _ in kingdoms]
+        self.assertEqual([i.kwargs['in_fp'] for i in obs], [0, 2, 1, 4, 3])
+        self.assertIsNone(q.get())
+
+    def test_get_fair(self):
+        q = _AffinityQueue()
+        q.max_skip = 2
+        for i, k in enumerate(['Bacteria', 'Archaea'] + ['Bacteria'] * 3):
+            q.put(_Job({'in_fp': i, 'kingdom': k}))
+        obs = [q.get().kwargs['in_fp'] for _ in range(5)]
+        self.assertEqual(obs, [0, 2, 3, 1, 4])
+
+
+if __name__ == '__main__':
+    main()
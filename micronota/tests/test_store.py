@@ -0,0 +1,71 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import makedirs, listdir
+from os.path import join
+
+from micronota.store import Store
+
+
+class StoreTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.seq_dir = join(self.tmp_dir, 'seq1')
+        makedirs(join(self.seq_dir, 'prodigal'))
+        with open(join(self.seq_dir, 'seq1.fna'), 'w') as f:
+            f.write('>seq1\nATGC\n')
+        with open(join(self.seq_dir, 'prodigal', 'seq1.faa'), 'w') as f:
+            f.write('>1_1\nM\n')
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def test_put_get(self):
+        store = Store(self.tmp_dir, shards=2)
+        self.assertEqual(len(listdir(self.tmp_dir)), 3)
+        store.put('seq2', 'diamond', 'a.diamond', b'x\ty\n')
+        self.assertEqual(store.get('seq2', 'diamond', 'a.diamond'),
+                         b'x\ty\n')
+        # replace
+        store.put('seq2', 'diamond', 'a.diamond', b'z')
+        self.assertEqual(store.get('seq2', 'diamond', 'a.diamond'), b'z')
+        with self.assertRaises(KeyError):
+            store.get('seq2', 'diamond', 'b.diamond')
+        store.close()
+
+    def test_put_dir(self):
+        store = Store(self.tmp_dir)
+        self.assertEqual(store.put_dir('seq1', self.seq_dir), 2)
+        store.put('seq2', '', 'seq2.fna', b'')
+        self.assertEqual(store.keys('seq1'),
+                         [('seq1', '', 'seq1.fna'),
+                          ('seq1', 'prodigal', 'seq1.faa')])
+        self.assertEqual(len(store.keys()), 3)
+        self.assertEqual(store.get('seq1', 'prodigal', 'seq1.faa'),
+                         b'>1_1\nM\n')
+        store.close()
+
+    def test_reopen_extract(self):
+        store = Store(self.tmp_dir)
+        store.put_dir('seq1', self.seq_dir)
+        store.close()
+        store = Store(self.tmp_dir)
+        out_dir = join(self.tmp_dir, 'out')
+        store.extract('seq1', out_dir)
+        store.close()
+        with open(join(out_dir, 'prodigal', 'seq1.faa')) as f:
+            self.assertEqual(f.read(), '>1_1\nM\n')
+        with open(join(out_dir, 'seq1.fna')) as f:
+            self.assertEqual(f.read(), '>seq1\nATGC\n')
+
+
+if __name__ == '__main__':
+    main()
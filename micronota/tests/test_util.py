@@ -0,0 +1,73 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main, skipIf
+from tempfile import mkdtemp
+from shutil import rmtree
+from os.path import join
+import gzip
+
+from micronota.util import (
+    _open, _sniff_compression, _strip_compression_suffix, _BGZF_EOF)
+
+try:
+    import zstandard  # noqa
+except ImportError:
+    zstandard = None
+
+
+class OpenTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.content = ''.join('>seq%d\nATGCATGC\n' % i for i in range(20000))
+
+    def tearDown(self):
+        rmtree(self.tmp_dir)
+
+    def _round_trip(self, fn, compression, exp):
+        fp = join(self.tmp_dir, fn)
+        with _open(fp, 'w', compression) as f:
+            f.write(self.content)
+        self.assertEqual(_sniff_compression(fp), exp)
+        with _open(fp) as f:
+            self.assertEqual(f.read(), self.content)
+        return fp
+
+    def test_plain(self):
+        self._round_trip('a.fa', None, None)
+
+    def test_gzip(self):
+        fp = self._round_trip('a.fa.gz', 'auto', 'gzip')
+        with gzip.open(fp, 'rt') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_bgzip(self):
+        fp = self._round_trip('a.fa.gz', 'bgzip', 'gzip')
+        with open(fp, 'rb') as f:
+            data = f.read()
+        self.assertTrue(data.endswith(_BGZF_EOF))
+        # the content is larger than a single block
+        self.assertGreater(data.count(b'\x1f\x8b\x08\x04'), 2)
+
+    @skipIf(zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        self._round_trip('a.fa.zst', 'auto', 'zstd')
+
+    def test_unknown(self):
+        with self.assertRaisesRegex(ValueError, 'Unknown compression'):
+            _open(join(self.tmp_dir, 'a'), 'w', 'bz2')
+
+    def test_strip_compression_suffix(self):
+        for i, e in [('a.fa.gz', 'a.fa'),
+                     ('a.fa.zst', 'a.fa'),
+                     ('a.fa', 'a.fa')]:
+            self.assertEqual(_strip_compression_suffix(i), e)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,9 @@
 # ----------------------------------------------------------------------------
 
 from unittest import TestCase, main
-from os.path import join, abspath
+from unittest.mock import patch
+import json
+from os.path import join, abspath, exists
 from tempfile import mkdtemp
 from shutil import rmtree
 from filecmp import cmp
@@ -15,8 +17,16 @@ from filecmp import cmp
 from skbio import read, write
 from skbio.util import get_data_path
 
-from micronota.workflow import annotate
+import pandas as pd
+from pandas.util.testing import assert_frame_equal
+
+from micronota import workflow
+from micronota.workflow import (
+    annotate, annotate_batch, read_batch, _dedup, _fan_out)
 from micronota.config import Configuration
+from micronota.store import Store
+from micronota.estimate import estimate
+from micronota.profiling import Profiler, summarize
 
 
 class TestAnnotate(TestCase):
@@ -56,6 +66,176 @@ class TestAnnotate(TestCase):
             join(self.obs_tmp, self.test1_exp),
             shallow=False))
 
+    def test_annotate_sam(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        config.diamond_outfmt = 'sam'
+        annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                 1, 'archaea', True, config)
+        # the same best hits are parsed from the alignments
+        self.assertTrue(cmp(
+            get_data_path(self.test1_exp),
+            join(self.obs_tmp, self.test1_exp),
+            shallow=False))
+
+    def test_annotate_profile(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        fp = join(self.obs_tmp, 'annotate.prof')
+        profiler = Profiler()
+        profiler.start()
+        # the stages run in the threads of the pipeline
+        annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                 2, 'archaea', True, config)
+        profiler.stop(fp)
+        self.assertTrue(cmp(
+            get_data_path(self.test1_exp),
+            join(self.obs_tmp, self.test1_exp),
+            shallow=False))
+        _, obs = summarize(fp, top=None)
+        self.assertIn('micronota.workflow', [i[0] for i in obs])
+
+    def test_annotate_incremental(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        for _ in range(2):
+            annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                     1, 'archaea', False, config, incremental=True)
+            self.assertTrue(cmp(
+                get_data_path(self.test1_exp),
+                join(self.obs_tmp, self.test1_exp),
+                shallow=False))
+        self.assertTrue(exists(join(self.obs_tmp, 'test1.cache.db')))
+        # no tool is run again
+        with open(join(self.obs_tmp, 'test1.report.json')) as f:
+            names = {i['name'] for i in json.load(f)['records']}
+        self.assertEqual(names, {'write'})
+
+    def test_annotate_resume(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        with patch('micronota.workflow.search_cds',
+                   side_effect=RuntimeError('killed')):
+            with self.assertRaisesRegex(RuntimeError, 'killed'):
+                annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                         1, 'archaea', True, config)
+        # no half-written output and the journal is kept
+        self.assertFalse(exists(join(self.obs_tmp, self.test1_exp)))
+        journal = join(self.obs_tmp, 'test1.journal.db')
+        self.assertTrue(exists(journal))
+        with self.assertRaises(FileExistsError):
+            annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                     1, 'archaea', False, config)
+        annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                 1, 'archaea', False, config, resume=True)
+        self.assertTrue(cmp(
+            get_data_path(self.test1_exp),
+            join(self.obs_tmp, self.test1_exp),
+            shallow=False))
+        self.assertFalse(exists(journal))
+
+    def test_annotate_resume_keep_intermediates(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        in_fp = join(self.tmp, 'test2.fna')
+        with open(in_fp, 'w') as f:
+            for fn in ['Swiss-Prot_Archaea.fna', 'Swiss-Prot_Bacteria.fna']:
+                for seq in read(join(self.test_dir, fn), format='fasta'):
+                    write(seq, format='fasta', into=f)
+        ids = {seq.metadata['id'] for seq in read(in_fp, format='fasta')}
+        search_cds = workflow.search_cds
+        calls = []
+
+        def fail_2nd(*args, **kwargs):
+            calls.append(args)
+            if len(calls) > 1:
+                raise RuntimeError('killed')
+            return search_cds(*args, **kwargs)
+
+        with patch('micronota.workflow.search_cds', side_effect=fail_2nd):
+            with self.assertRaisesRegex(RuntimeError, 'killed'):
+                annotate(in_fp, 'fasta', self.obs_tmp, 'genbank',
+                         1, 'archaea', True, config, keep_intermediates=True)
+        annotate(in_fp, 'fasta', self.obs_tmp, 'genbank',
+                 1, 'archaea', False, config, keep_intermediates=True,
+                 resume=True)
+        # the 1st sequence is taken from the journal and its intermediate
+        # files are kept from the interrupted run
+        store = Store(self.obs_tmp)
+        self.assertEqual({i[0] for i in store.keys()}, ids)
+        store.close()
+
+    def test_annotate_keep_intermediates_failed(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        with patch('micronota.workflow.search_cds',
+                   side_effect=RuntimeError('killed')):
+            with self.assertRaisesRegex(RuntimeError, 'killed'):
+                annotate(self.test1, 'fasta', self.obs_tmp, 'genbank',
+                         1, 'archaea', True, config, keep_intermediates=True)
+        # the intermediates are kept to debug the failed run
+        for i in range(4):
+            self.assertTrue(
+                exists(join(self.obs_tmp, 'intermediate_%d.db' % i)))
+        self.assertFalse(exists(join(self.obs_tmp, self.test1_exp)))
+
+    def test_estimate(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        obs = estimate(self.test1, 'fasta', 'genbank', 1, 'archaea', config,
+                       fraction=1)
+        self.assertEqual(obs['sample'], obs['sequences'])
+        self.assertIn('write', obs['stages'])
+        self.assertGreater(obs['output']['estimate'], 0)
+
+    def test_annotate_batch(self):
+        config = Configuration()
+        config.db_dir = self.test_dir
+        manifest = join(self.tmp, 'batch.txt')
+        with open(manifest, 'w') as f:
+            f.write('# genomes\ntest1.fna\n\n')
+        annotate_batch(read_batch(manifest), 'fasta', self.obs_tmp,
+                       'genbank', 1, 'archaea', True, config)
+        self.assertTrue(cmp(
+            get_data_path(self.test1_exp),
+            join(self.obs_tmp, self.test1_exp),
+            shallow=False))
+
+    def test_read_batch(self):
+        manifest = join(self.tmp, 'batch.txt')
+        with open(manifest, 'w') as f:
+            f.write('# genomes\na.fna\n\n/b/b.fna\n')
+        self.assertEqual(read_batch(manifest),
+                         [join(self.tmp, 'a.fna'), '/b/b.fna'])
+
+    def test_annotate_batch_duplicate(self):
+        with self.assertRaisesRegex(ValueError, 'Duplicate output file'):
+            annotate_batch(['a/x.fna', 'b/x.fna.gz'], 'fasta', self.obs_tmp,
+                           'genbank', 1, 'archaea', True, Configuration())
+
+
+class TestDedup(TestCase):
+    def setUp(self):
+        self.cds = [('1_1', 'MKV'), ('1_2', 'MQ'), ('2_1', 'MKV'),
+                    ('2_2', 'MKV')]
+
+    def test_dedup(self):
+        uniq, groups = _dedup(self.cds)
+        self.assertEqual(uniq, [('1_1', 'MKV'), ('1_2', 'MQ')])
+        self.assertEqual(groups, {'1_1': ['1_1', '2_1', '2_2'],
+                                  '1_2': ['1_2']})
+
+    def test_fan_out(self):
+        _, groups = _dedup(self.cds)
+        res = pd.DataFrame({'sseqid': ['a', 'b']}, index=['1_1', '1_2'])
+        exp = pd.DataFrame({'sseqid': ['a', 'a', 'a', 'b']},
+                           index=['1_1', '2_1', '2_2', '1_2'])
+        assert_frame_equal(_fan_out(res, groups), exp)
+
+    def test_fan_out_empty(self):
+        res = pd.DataFrame()
+        self.assertIs(_fan_out(res, {}), res)
+
 
 if __name__ == '__main__':
     main()
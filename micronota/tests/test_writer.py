@@ -0,0 +1,109 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+from io import StringIO
+
+from skbio.metadata import Feature
+
+from micronota.writer import GenBankWriter, GFF3Writer, get_writer
+
+
+class WriterTests(TestCase):
+    def setUp(self):
+        self.im = {
+            Feature(type_='CDS', id='1_2', location='complement(21..30)',
+                    rc_=True, translation='MK*'): [(20, 30)],
+            Feature(type_='CDS', id='1_1', location='<1..9',
+                    rc_=False, left_partial_=True,
+                    note='"rbs_motif=None;gc_cont=0.236"',
+                    db_xref='UniRef100_B2SAT5'): [(0, 9)]}
+        self.seq = 'ATGAAATAG' * 4
+
+
+class GenBankWriterTests(WriterTests):
+    def test_write(self):
+        fh = StringIO()
+        writer = GenBankWriter(fh)
+        writer.write('seq1', self.im, self.seq)
+        writer.close()
+        exp = ('FEATURES             Location/Qualifiers\n'
+               '          CDS        <1..9\n'
+               '                     /db_xref=UniRef100_B2SAT5\n'
+               '                     /id=1_1\n'
+               '                     /note="rbs_motif=None;gc_cont=0.236"\n'
+               '          CDS        complement(21..30)\n'
+               '                     /id=1_2\n'
+               '                     /translation=MK*\n'
+               'ORIGIN\n'
+               '        1 atgaaataga tgaaatagat gaaatagatg aaatag\n'
+               '//\n')
+        self.assertEqual(fh.getvalue(), exp)
+
+    def test_write_no_seq(self):
+        fh = StringIO()
+        writer = GenBankWriter(fh, sequence=False)
+        writer.write('seq1', {}, self.seq)
+        self.assertEqual(fh.getvalue(), '//\n')
+
+
+class GFF3WriterTests(WriterTests):
+    def test_write(self):
+        fh = StringIO()
+        writer = GFF3Writer(fh)
+        writer.write('seq1', self.im, self.seq)
+        writer.write('seq2', {}, 'ATG')
+        writer.close()
+        exp = ('##gff-version 3\n'
+               '##sequence-region seq1 1 36\n'
+               'seq1\t.\tCDS\t1\t9\t.\t+\t0\t'
+               'Dbxref=UniRef100_B2SAT5;ID=1_1;'
+               'Note=rbs_motif%3DNone%3Bgc_cont%3D0.236\n'
+               'seq1\t.\tCDS\t21\t30\t.\t-\t0\tID=1_2;translation=MK*\n'
+               '##sequence-region seq2 1 3\n'
+               '##FASTA\n'
+               '>seq1\n' + self.seq + '\n'
+               '>seq2\nATG\n')
+        self.assertEqual(fh.getvalue(), exp)
+
+    def test_write_phase(self):
+        im = {
+            # 10 bases in the 1st interval leave 2 bases of a codon
+            Feature(type_='CDS', id='1', rc_=False): [(0, 10), (14, 20)],
+            Feature(type_='CDS', id='2', rc_=True): [(0, 8), (12, 20)],
+            # a 5' partial CDS starting at the 2nd base
+            Feature(type_='CDS', id='3', rc_=False,
+                    codon_start=2): [(0, 7), (10, 15)]}
+        fh = StringIO()
+        writer = GFF3Writer(fh, sequence=False)
+        writer.write('seq1', im)
+        writer.close()
+        obs = {}
+        for line in fh.getvalue().splitlines()[1:]:
+            fields = line.split('\t')
+            attrs = dict(i.split('=') for i in fields[8].split(';'))
+            obs.setdefault(attrs['ID'], []).append(fields[7])
+        self.assertEqual(obs, {'1': ['0', '2'], '2': ['1', '0'],
+                               '3': ['1', '0']})
+
+    def test_write_no_seq(self):
+        fh = StringIO()
+        writer = GFF3Writer(fh, sequence=False)
+        writer.write('seq1', self.im)
+        writer.close()
+        self.assertNotIn('##FASTA', fh.getvalue())
+        self.assertEqual(len(fh.getvalue().splitlines()), 3)
+
+    def test_get_writer(self):
+        self.assertIsInstance(get_writer('gff3', StringIO()), GFF3Writer)
+        with self.assertRaisesRegex(ValueError, 'Unsupported'):
+            get_writer('embl', StringIO())
+
+
+if __name__ == '__main__':
+    main()
@@ -17,13 +17,18 @@ including config config, unit-testing convenience function.
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import io
+import gzip
 import shutil
+import struct
+import zlib
 from os import remove
 from os.path import exists, isdir, join, abspath, dirname, basename, splitext
 from urllib.request import urlopen
 from unittest import TestCase
 from sqlite3 import connect
 from inspect import stack
+from subprocess import Popen, PIPE
 
 
 def _overwrite(fp, overwrite=False, append=False):
@@ -45,6 +50,169 @@ def _download(src, dest, **kwargs):
         shutil.copyfileobj(i_f, o_f)
 
 
+# file suffix for each compression codec
+_COMPRESSION_SUFFIX = {'gzip': '.gz', 'bgzip': '.gz', 'zstd': '.zst'}
+
+# magic number at the beginning of the compressed files
+_COMPRESSION_MAGIC = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+
+# end-of-file marker block of BGZF
+_BGZF_EOF = (b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00'
+             b'BC\x02\x00\x1b\x00\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00')
+
+
+def _sniff_compression(fp):
+    '''Return the compression codec of the file or ``None``.'''
+    with open(fp, 'rb') as f:
+        magic = f.read(4)
+    for k, v in _COMPRESSION_MAGIC.items():
+        if magic.startswith(k):
+            return v
+    return None
+
+
+def _compression_from_suffix(fp):
+    for codec in ['gzip', 'zstd']:
+        if fp.endswith(_COMPRESSION_SUFFIX[codec]):
+            return codec
+    return None
+
+
+def _strip_compression_suffix(fp):
+    '''Remove the suffix of compressed file, e.g. "a.fa.gz" -> "a.fa".'''
+    codec = _compression_from_suffix(fp)
+    if codec is None:
+        return fp
+    return fp[:-len(_COMPRESSION_SUFFIX[codec])]
+
+
+class _ProcessWriter(io.TextIOWrapper):
+    '''Write text through an external compression program.'''
+    def __init__(self, cmd, fp):
+        self._out = open(fp, 'wb')
+        self._proc = Popen(cmd, stdin=PIPE, stdout=self._out)
+        super().__init__(self._proc.stdin)
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self._proc.wait()
+        self._out.close()
+        if self._proc.returncode != 0:
+            raise IOError('Compression failed: %s' % ' '.join(self._proc.args))
+
+
+class _BGZFWriter(io.RawIOBase):
+    '''Write the data in BGZF (block gzip) format.
+
+    Each block is an independent gzip member with the block size recorded
+    in its extra field, so it can be read by any gzip reader and randomly
+    accessed by the block offsets.
+    '''
+    _block_size = 65280
+
+    def __init__(self, fp, level=6):
+        self._fh = open(fp, 'wb')
+        self._level = level
+        self._buf = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf.extend(b)
+        while len(self._buf) >= self._block_size:
+            self._write_block(bytes(self._buf[:self._block_size]))
+            del self._buf[:self._block_size]
+        return len(b)
+
+    def _write_block(self, data):
+        c = zlib.compressobj(self._level, zlib.DEFLATED, -15)
+        cdata = c.compress(data) + c.flush()
+        # 18 bytes of header and 8 bytes of crc32 and input size
+        bsize = len(cdata) + 26
+        header = (b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff'
+                  b'\x06\x00BC\x02\x00' + struct.pack('<H', bsize - 1))
+        self._fh.write(header)
+        self._fh.write(cdata)
+        self._fh.write(struct.pack('<II', zlib.crc32(data), len(data)))
+
+    def close(self):
+        if self.closed:
+            return
+        if self._buf:
+            self._write_block(bytes(self._buf))
+            self._buf = bytearray()
+        self._fh.write(_BGZF_EOF)
+        self._fh.close()
+        super().close()
+
+
+def _open_zstd(fp, mode, threads=1):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            'zstd compression requires the "zstandard" package.')
+    if 'r' in mode:
+        reader = zstandard.ZstdDecompressor().stream_reader(open(fp, 'rb'))
+        return io.TextIOWrapper(io.BufferedReader(reader))
+    else:
+        # threads=0 disables multi-threaded compression
+        c = zstandard.ZstdCompressor(threads=threads if threads > 1 else 0)
+        return io.TextIOWrapper(c.stream_writer(open(fp, 'wb')))
+
+
+def _open(fp, mode='r', compression='auto', threads=1):
+    '''Open a plain or compressed file in text mode.
+
+    Parameters
+    ----------
+    fp : str
+        File path.
+    mode : str
+        "r" or "w".
+    compression : str or None
+        "gzip", "bgzip", "zstd", or ``None`` for no compression. If it is
+        "auto", the codec is sniffed from the file content for reading and
+        inferred from the file suffix for writing.
+    threads : int
+        Number of threads to compress the output. More than 1 thread is
+        only used if ``pigz`` (for gzip) or ``bgzip`` is installed, or
+        for zstd.
+
+    Returns
+    -------
+    file object
+    '''
+    mode = mode.replace('t', '')
+    if compression == 'auto':
+        if 'r' in mode:
+            compression = _sniff_compression(fp)
+        else:
+            compression = _compression_from_suffix(fp)
+
+    if compression is None:
+        return open(fp, mode)
+    elif compression == 'zstd':
+        return _open_zstd(fp, mode, threads)
+    elif compression not in ('gzip', 'bgzip'):
+        raise ValueError('Unknown compression: %s' % compression)
+
+    if 'r' in mode:
+        # BGZF is valid multi-member gzip file
+        return gzip.open(fp, 'rt')
+    elif compression == 'bgzip':
+        if threads > 1 and shutil.which('bgzip'):
+            return _ProcessWriter(['bgzip', '-c', '-@', str(threads)], fp)
+        return io.TextIOWrapper(io.BufferedWriter(_BGZFWriter(fp)))
+    else:
+        if threads > 1 and shutil.which('pigz'):
+            return _ProcessWriter(['pigz', '-c', '-p', str(threads)], fp)
+        return gzip.open(fp, 'wt')
+
+
 def _get_named_data_path(fname):
     # get caller's file path
     caller_fp = abspath(stack()[1][1])
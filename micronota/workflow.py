@@ -6,24 +6,38 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from os.path import splitext, basename, join, exists
-from os import makedirs, stat
+from os.path import splitext, basename, join, exists, dirname, abspath
+from os import makedirs, remove, listdir
+from shutil import copy2
 from importlib import import_module
-from tempfile import NamedTemporaryFile
 from logging import getLogger
 
 from skbio.metadata import IntervalMetadata
-from skbio import read, Sequence
+from skbio import read
 import pandas as pd
 
 from . import bfillings
-from .util import _overwrite
+from .util import (
+    _overwrite, _open, _strip_compression_suffix, _COMPRESSION_SUFFIX)
+from .pipeline import pipeline
+from .writer import get_writer
+from .intermediate import Intermediate, _write_fasta
+from .store import Store
+from .report import Report, stage
+from .db._partition import fixed_order
+from .incremental import ResultCache, fingerprint
 
 
 def annotate(in_fp, in_fmt, out_dir, out_fmt,
-             cpus, kingdom, force, config):
+             cpus, kingdom, force, config, queue_size=2, out_seq=True,
+             out_compression=None, keep_intermediates=False,
+             scratch_dir=None, trace=False, incremental=False, resume=False):
     '''Annotate the sequences in the input file.
 
+    Feature identification, CDS annotation and output writing are
+    pipelined, so that the CDS of one sequence are searched while the
+    features of the next sequence are being identified.
+
     Parameters
     ----------
     in_fp : file_handle
@@ -42,30 +56,308 @@ def annotate(in_fp, in_fmt, out_dir, out_fmt,
         Force to overwrite.
     config : ``micronota.config.Configuration``
         Container for configuration options.
+    queue_size : int
+        The max number of sequences waiting between two stages. It
+        bounds the memory usage on large input files.
+    out_seq : bool
+        Whether to write the sequences into the output file.
+    out_compression : str or None
+        Compress the output file with "gzip", "bgzip" or "zstd". The
+        input file can be plain or compressed with any of them.
+    keep_intermediates : bool
+        Whether to keep the intermediate files of each sequence. They
+        are packed into ``micronota.store.Store`` files in ``out_dir``,
+        which are kept even if the run fails. With ``incremental`` or
+        ``resume``, the files of the sequences not computed again are
+        kept from the previous runs. By default, they are removed once
+        the sequence is written out.
+    scratch_dir : str or None
+        The directory to stage the intermediate files and the output
+        file. Default to ``config.scratch_dir`` or ``out_dir`` if it is
+        not set. The output file is moved into ``out_dir`` at the end.
+    trace : bool
+        Whether to write the trace of the stages in Chrome trace event
+        format. The run report (see ``micronota.report``) is always
+        written next to the output file.
+    incremental : bool
+        Whether to reuse the results of the previous runs into the same
+        ``out_dir`` (see ``micronota.incremental``). Only the stages of
+        the sequences whose inputs, databases or tool settings have
+        changed are run, and the output file is rewritten. The results
+        are cached in "<input name>.cache.db" in ``out_dir``, which is
+        not removed even if ``force`` is set.
+    resume : bool
+        Whether to resume the interrupted run into the same ``out_dir``.
+        The stages completed before the interruption are not run again.
+
+    Notes
+    -----
+    For fasta input, the features are streamed into the output file
+    without building the annotated ``skbio.Sequence`` object. For other
+    input formats, the features already present in the input are kept
+    and each annotated sequence is written through ``skbio``.
+
+    The result of each stage of each sequence is added into a journal
+    "<input name>.journal.db" in ``out_dir`` (the cache if
+    ``incremental`` is set) as soon as the stage is done, and committed
+    in batches (see ``micronota.incremental.ResultCache``). The journal
+    is removed once the run is completed. If the run is interrupted, the
+    journal is kept and the run can be resumed with ``resume``: the
+    stages committed are taken from the journal and the output file is
+    written again from the beginning. The output file is only moved into
+    ``out_dir`` when the run is completed, so it is never half-written.
     '''
+    logger = getLogger(__name__)
+    keep = incremental or resume
+    _overwrite(out_dir, overwrite=force and not keep, append=keep)
+    makedirs(out_dir, exist_ok=force or keep)
+    prefix = splitext(_strip_compression_suffix(basename(in_fp)))[0]
+    fn = '{p}.{f}'.format(p=prefix, f=out_fmt)
+    if out_compression is not None:
+        fn += _COMPRESSION_SUFFIX[out_compression]
+    if incremental:
+        cache_fp = join(out_dir, '%s.cache.db' % prefix)
+    else:
+        cache_fp = join(out_dir, '%s.journal.db' % prefix)
+        if resume and not exists(cache_fp):
+            logger.warning('No journal to resume from in %s. Start from '
+                           'the beginning.' % out_dir)
+    cache = ResultCache(cache_fp)
+    if scratch_dir is None:
+        scratch_dir = config.scratch_dir
+    files = Intermediate(out_dir, root=scratch_dir)
+    out_fp = files.output(fn)
+    store = None
+    if keep_intermediates:
+        if keep:
+            # add to the intermediates of the sequences done in the
+            # previous runs, which are not computed again
+            for fn in listdir(out_dir):
+                if fn.startswith('intermediate_') and fn.endswith('.db'):
+                    copy2(join(out_dir, fn), files.path(fn))
+        store = Store(files.root)
+        # they are kept even if the run fails
+        for fp in store.fps:
+            files.keep_file(basename(fp))
+
+    def _identify(seq):
+        # dir for useful intermediate files for the current input seq
+        seq_fn = _seq_fn(seq.metadata['id'])
+        seq_dir = files.workdir(seq_fn)
+        # identify all features specified
+        im = identify_all_features(seq, seq_dir, config, files, cache)
+        if in_fmt == 'fasta':
+            # drop the Sequence object and only keep what is written out
+            seq = seq.metadata['id'], str(seq) if out_seq else None
+        return seq, seq_fn, im
+
+    def _annotate(item):
+        seq, seq_fn, im = item
+        im = annotate_all_cds(im, files.path(seq_fn), kingdom, config, cpus,
+                              cache)
+        return seq, seq_fn, im
+
+    seen = []
+    report = Report()
+    try:
+        with report.activate(), _open(in_fp) as in_f, _open(
+                out_fp, 'w', out_compression, threads=cpus) as out:
+            writer = None
+            if in_fmt == 'fasta':
+                writer = get_writer(out_fmt, out, sequence=out_seq)
+            stages = [_identify, _annotate]
+            for seq, seq_fn, im in pipeline(read(in_f, format=in_fmt),
+                                            stages, maxsize=queue_size):
+                with stage('write', records_in=len(im)) as rec:
+                    seq_id = rec['seq'] = _write(out, writer, seq, im,
+                                                 out_fmt)
+                if store is not None:
+                    store.put_dir(seq_id, files.path(seq_fn))
+                files.discard(seq_fn)
+                seen.append(seq_fn)
+            if writer is not None:
+                writer.close()
+        _write_report(report, files, prefix, trace)
+    except BaseException:
+        if store is not None:
+            store.close()
+        cache.close()
+        files.close(outputs=False)
+        if not incremental:
+            logger.warning('The completed stages are kept in %s. Run again '
+                           'with resume to continue.' % cache_fp)
+        raise
+    if store is not None:
+        store.close()
+    # drop the sequences removed from the input
+    n = cache.prune(seen)
+    logger.info('Reused %d cached results and ran %d stages; removed %d '
+                'sequences from the cache.' % (cache.hits, cache.misses, n))
+    cache.close()
+    files.close()
+    if not incremental:
+        remove(cache_fp)
+
+
+def _seq_fn(seq_id):
+    '''Return the name of the intermediate dir of the sequence.
+
+    The non alphanumeric characters of the ID are replaced with "_".
+    '''
+    return ''.join(x if x.isalnum() else '_' for x in seq_id)
+
+
+def _write_report(report, files, prefix, trace=False):
+    '''Write the run report as the outputs of the run.'''
+    report.write_json(files.output('%s.report.json' % prefix))
+    report.write_tsv(files.output('%s.report.tsv' % prefix))
+    if trace:
+        report.write_trace(files.output('%s.trace.json' % prefix))
+
+
+def _write(out, writer, seq, im, out_fmt):
+    '''Write an annotated sequence and return its ID.
+
+    ``seq`` is a tuple of ID and sequence string (or ``None``) for the
+    streaming ``writer``, or a ``skbio.Sequence`` if ``writer`` is
+    ``None``.
+    '''
+    if writer is not None:
+        seq_id, seq_str = seq
+        writer.write(seq_id, im, seq_str)
+    else:
+        seq_id = seq.metadata['id']
+        seq.interval_metadata.concat(IntervalMetadata(im), inplace=True)
+        seq.write(out, format=out_fmt)
+    return seq_id
+
+
+def read_batch(fp):
+    '''Read the input file paths from a batch manifest file.
+
+    The manifest has one file path per line. Relative paths are relative
+    to the directory of the manifest. Empty lines and lines starting with
+    "#" are ignored.
+    '''
+    d = dirname(abspath(fp))
+    with open(fp) as f:
+        return [join(d, i) for i in (line.strip() for line in f)
+                if i and not i.startswith('#')]
+
+
+def annotate_batch(in_fps, in_fmt, out_dir, out_fmt,
+                   cpus, kingdom, force, config, out_seq=True,
+                   out_compression=None, scratch_dir=None, trace=False):
+    '''Annotate many small input files with shared CDS searches.
+
+    The features of all the input sequences are identified first. Then
+    the proteins of all of them are pooled into a single query for each
+    CDS database, so that the database is loaded only once for the whole
+    batch instead of once per input file. The hits are split back and
+    each input file is written into its own output file in ``out_dir``.
+
+    Parameters
+    ----------
+    in_fps : list of str
+        Input file paths. Their base names (without the suffixes) should
+        be unique because the output files are named after them.
+    in_fmt, out_dir, out_fmt, cpus, kingdom, force, config, out_seq,
+    out_compression, scratch_dir, trace
+        See :func:`annotate`. The run report is named "batch.report.*".
+
+    Notes
+    -----
+    The annotated features of all the input sequences are held in memory
+    until the searches are done. Use :func:`annotate` for large inputs.
+    '''
+    logger = getLogger(__name__)
+    fns = []
+    for in_fp in in_fps:
+        prefix = splitext(_strip_compression_suffix(basename(in_fp)))[0]
+        fn = '{p}.{f}'.format(p=prefix, f=out_fmt)
+        if out_compression is not None:
+            fn += _COMPRESSION_SUFFIX[out_compression]
+        if fn in fns:
+            raise ValueError('Duplicate output file name: %s' % fn)
+        fns.append(fn)
     _overwrite(out_dir, overwrite=force)
     makedirs(out_dir, exist_ok=force)
-    prefix = splitext(basename(in_fp))[0]
-    fn = '{p}.{f}'.format(p=prefix, f=out_fmt)
-    out_fp = join(out_dir, fn)
-    with open(out_fp, 'w') as out:
-        for seq in read(in_fp, format=in_fmt):
-            # dir for useful intermediate files for the current input seq
-            # replace non alnum char with "_"
-            seq_fn = ''.join(x if x.isalnum() else '_'
-                             for x in seq.metadata['id'])
-            seq_dir = join(out_dir, seq_fn)
-            # identify all features specified
-            im = identify_all_features(seq, seq_dir, config)
-            im = annotate_all_cds(im, seq_dir, kingdom, config)
-            seq.interval_metadata.concat(IntervalMetadata(im), inplace=True)
-            seq.write(out, format=out_fmt)
-
-
-def identify_all_features(seq, out_dir, config):
+    if scratch_dir is None:
+        scratch_dir = config.scratch_dir
+    files = Intermediate(out_dir, root=scratch_dir)
+    report = Report()
+    try:
+        with report.activate():
+            records, cds = _identify_batch(
+                in_fps, in_fmt, files, config, out_seq)
+            logger.info(
+                'Searching %d proteins of %d sequences in %d files.' % (
+                    len(cds), sum(len(i) for i in records), len(in_fps)))
+            res = search_cds(
+                cds, files.workdir('batch'), kingdom, config, cpus)
+            files.discard('batch')
+            # split the hits back to each sequence
+            hits = {}
+            for seq_fn, df in res.groupby(lambda x: x.split('|', 1)[0]):
+                df.index = [x.split('|', 1)[1] for x in df.index]
+                hits[seq_fn] = df
+            for fn, recs in zip(fns, records):
+                with _open(files.output(fn), 'w', out_compression,
+                           threads=cpus) as out:
+                    writer = None
+                    if in_fmt == 'fasta':
+                        writer = get_writer(out_fmt, out, sequence=out_seq)
+                    for seq_fn, seq, im in recs:
+                        im = _update(
+                            im, 'id', hits.get(seq_fn, pd.DataFrame()))
+                        with stage('write', records_in=len(im)) as rec:
+                            rec['seq'] = _write(out, writer, seq, im, out_fmt)
+                    if writer is not None:
+                        writer.close()
+        _write_report(report, files, 'batch', trace)
+    except BaseException:
+        files.close(outputs=False)
+        raise
+    files.close()
+
+
+def _identify_batch(in_fps, in_fmt, files, config, out_seq=True):
+    '''Identify the features of all the sequences in the input files.
+
+    Returns
+    -------
+    list of list of tuple
+        The (query ID prefix, seq, im) of each sequence in each input file.
+    list of tuple of str
+        The ID and sequence of all the proteins. The IDs are prefixed
+        with "<query ID prefix>|" to be unique across the sequences.
+    '''
+    id_key = 'id'
+    records = [[] for _ in in_fps]
+    cds = []
+    for i, in_fp in enumerate(in_fps):
+        with _open(in_fp) as in_f:
+            for j, seq in enumerate(read(in_f, format=in_fmt)):
+                # it is unique across all the input files
+                seq_fn = '%d_%d' % (i, j)
+                im = identify_all_features(
+                    seq, files.workdir(seq_fn), config, files)
+                files.discard(seq_fn)
+                if in_fmt == 'fasta':
+                    seq = seq.metadata['id'], str(seq) if out_seq else None
+                cds.extend(
+                    ('%s|%s' % (seq_fn, f[id_key]), f['translation'])
+                    for f in im if f['type_'] == 'CDS')
+                records[i].append((seq_fn, seq, im))
+    return records, cds
+
+
+def identify_all_features(seq, out_dir, config, files=None, cache=None):
     '''Identify all the features for the input sequence.
 
-    It runs through all the tasks specified in sequential order.
+    It runs through all the tasks specified in sequential order. The
+    sequence is written into a fasta file once and the file is shared
+    by all the tasks.
 
     Parameters
     ----------
@@ -75,6 +367,13 @@ def identify_all_features(seq, out_dir, config):
         Output directory.
     config : ``micronota.config.Configuration``
         Container for configuration options.
+    files : ``micronota.intermediate.Intermediate`` or None
+        The manager of the intermediate files. If it is ``None``, the
+        shared input file is created in a temp dir inside ``out_dir``
+        and removed afterwards.
+    cache : ``micronota.incremental.ResultCache`` or None
+        The cached results to reuse for the tools whose sequence,
+        database and parameters are unchanged.
 
     Returns
     -------
@@ -84,31 +383,55 @@ def identify_all_features(seq, out_dir, config):
     logger = getLogger(__name__)
     logger.info('Running feature identification.')
     im = dict()
-    with NamedTemporaryFile('w+') as f:
-        seq.write(f.name, format='fasta')
-        for tool in config.features:
-            db = config.features[tool]
-            if db is not None:
-                db = config.db[db]
-            seq_dir = join(out_dir, tool)
-            submodule = import_module('.%s' % tool, bfillings.__name__)
-            cls = getattr(submodule, 'FeaturePred')
-            obj = cls(db, seq_dir)
-            if tool in config.param:
-                params = config.param[tool]
-            else:
-                params = None
-            im.update(next(obj(f.name, params=params)))
+    own = files is None
+    if own:
+        files = Intermediate(out_dir)
+    seq_id = seq.metadata['id']
+    contig = basename(out_dir)
+    if cache is not None:
+        seq_key = fingerprint(str(seq))
+    # name the file after the seq dir so the tool outputs are named after it
+    fn = '%s.fna' % contig
+    try:
+        with files.use(fn, lambda f: _write_fasta(f, seq_id, str(seq))) as fp:
+            for tool in config.features:
+                db = config.features[tool]
+                if db is not None:
+                    db = config.db[db]
+                if tool in config.param:
+                    params = config.param[tool]
+                else:
+                    params = None
+                res = None
+                if cache is not None:
+                    key = fingerprint(seq_key, tool, cache.db_fingerprint(db),
+                                      _param_items(config, tool))
+                    res = cache.get(contig, tool, key)
+                if res is None:
+                    seq_dir = join(out_dir, tool)
+                    submodule = import_module(
+                        '.%s' % tool, bfillings.__name__)
+                    cls = getattr(submodule, 'FeaturePred')
+                    obj = cls(db, seq_dir)
+                    with stage(tool, seq_id) as rec:
+                        res = next(obj(fp, params=params))
+                        rec['records_out'] = len(res)
+                    if cache is not None:
+                        cache.put(contig, tool, key, res)
+                im.update(res)
+    finally:
+        if own:
+            files.close()
     return im
 
 
-def annotate_all_cds(im, out_dir, kingdom, config, cpus=1):
+def annotate_all_cds(im, out_dir, kingdom, config, cpus=1, cache=None):
     '''Annotate coding domain sequences (CDS).
 
     Parameters
     ----------
-    seq : skbio.Sequence
-        Input sequence object.
+    im : dict
+        dict of ``Feature`` to their intervals.
     out_dir : str
         Output directory.
     config : ``micronota.config.Configuration``
@@ -118,31 +441,89 @@ def annotate_all_cds(im, out_dir, kingdom, config, cpus=1):
         be used to prioritize databases to search.
     cpus : int
         Number of CPUs to use.
+    cache : ``micronota.incremental.ResultCache`` or None
+        The cached results to reuse if the proteins, the kingdom and the
+        CDS databases and parameters are unchanged.
 
     Returns
     -------
     im : skbio.metadata.IntervalMetadata
         Interval metadata object
     '''
+    id_key = 'id'
+    cds = [(f[id_key], f['translation']) for f in im if f['type_'] == 'CDS']
+    res = None
+    if cache is not None:
+        tools = [(tool, config.cds[tool],
+                  cache.db_fingerprint(config.db.get(config.cds[tool])),
+                  _param_items(config, tool),
+                  sorted(_annt_kwargs(config, tool).items()))
+                 for tool in config.cds]
+        key = fingerprint(kingdom.lower(), cds, tools)
+        res = cache.get(basename(out_dir), 'cds', key)
+    if res is None:
+        res = search_cds(cds, out_dir, kingdom, config, cpus)
+        if cache is not None:
+            cache.put(basename(out_dir), 'cds', key, res)
+    return _update(im, id_key, res)
+
+
+def _param_items(config, tool):
+    '''Return the parameters of the tool for the fingerprints.'''
+    if tool in config.param:
+        return sorted(config.param[tool].items())
+    return []
+
+
+def _annt_kwargs(config, tool):
+    '''Return the keyword arguments of the CDS tool set in the config.'''
+    if tool == 'diamond':
+        return {'outfmt': config.diamond_outfmt}
+    return {}
+
+
+def search_cds(cds, out_dir, kingdom, config, cpus=1):
+    '''Search the proteins against the CDS databases in cascade.
+
+    The proteins that hit a database are not searched against the next.
+    Identical proteins are searched only once and the hit is shared by
+    all of them.
+
+    Parameters
+    ----------
+    cds : list of tuple of str
+        The ID and the sequence of each protein.
+    out_dir, kingdom, config, cpus
+        See :func:`annotate_all_cds`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The best hit of each protein, indexed by protein ID.
+    '''
     logger = getLogger(__name__)
     logger.info('Running CDS functional annotation.')
-    id_key = 'id'
+    cds, groups = _dedup(cds)
+    n = sum(len(i) for i in groups.values())
+    if n > 0:
+        logger.info('Searching %d unique proteins out of %d (ratio %.3f).' % (
+            len(cds), n, len(cds) / n))
     res = pd.DataFrame()
     for tool in config.cds:
         d = join(out_dir, tool)
         makedirs(d, exist_ok=True)
-        pro_fp = join(d, '%s.fa' % tool)
+        # the query can be gzipped for diamond
+        pro_fp = join(d, '%s.fa.gz' % tool)
 
         # write the protein seq into a file
-        _write_cds(
-            pro_fp, im, id_key,
-            lambda x: x['type_'] == 'CDS' and x[id_key] not in res.index)
-        if stat(pro_fp).st_size == 0:
+        n = _write_cds(pro_fp, cds, lambda x: x not in res.index)
+        if n == 0:
             break
         db = config.cds[tool]
         if db in ['uniref100', 'uniref90', 'uniref50']:
             db_dir = config.db[db]
-            db_fp = [join(db_dir, i) for i in _get_uniref_db(kingdom)]
+            db_fp = [join(db_dir, i)
+                     for i in _get_uniref_db(kingdom, config.partition_stats)]
             # in case the db file is empty
             db_fp = [i for i in db_fp if exists('%s.dmnd' % i)]
         elif db == 'tigrfam':
@@ -152,14 +533,66 @@ def annotate_all_cds(im, out_dir, kingdom, config, cpus=1):
 
         submodule = import_module('.%s' % tool, bfillings.__name__)
         cls = getattr(submodule, 'FeatureAnnt')
-        obj = cls(dat=db_fp, out_dir=d)
+        kwargs = {}
+        if tool == 'diamond':
+            kwargs['cache'] = config.residency
+        obj = cls(dat=db_fp, out_dir=d, tmp_dir=join(d, 'tmp'), **kwargs)
         if tool in config.param:
             params = config.param[tool]
         else:
             params = None
-        res_ = obj(pro_fp, cpus=cpus, params=params)
+        with stage(tool, basename(out_dir), records_in=n) as rec:
+            res_ = obj(pro_fp, cpus=cpus, params=params,
+                       **_annt_kwargs(config, tool))
+            rec['records_out'] = len(res_)
+        if tool == 'diamond' and config.partition_stats is not None:
+            config.partition_stats.record(kingdom, obj.searched)
         res = res.append(res_)
-    return _update(im, id_key, res)
+    return _fan_out(res, groups)
+
+
+def _dedup(cds):
+    '''Collapse the identical proteins.
+
+    Parameters
+    ----------
+    cds : iterable of tuple of str
+        The ID and the sequence of each protein.
+
+    Returns
+    -------
+    list of tuple of str
+        The unique proteins. Each is represented by the ID of its first
+        occurrence.
+    dict
+        The IDs of all the proteins keyed by their representative ID.
+    '''
+    reps = {}
+    groups = {}
+    uniq = []
+    for id, seq in cds:
+        rep = reps.get(seq)
+        if rep is None:
+            reps[seq] = rep = id
+            groups[rep] = []
+            uniq.append((id, seq))
+        groups[rep].append(id)
+    return uniq, groups
+
+
+def _fan_out(res, groups):
+    '''Copy the hit of each representative protein to its group.'''
+    if res.empty:
+        return res
+    reps = []
+    ids = []
+    for rep in res.index:
+        members = groups.get(rep, [rep])
+        reps.extend([rep] * len(members))
+        ids.extend(members)
+    res = res.loc[reps]
+    res.index = ids
+    return res
 
 
 def _update(im, id_key, res):
@@ -177,40 +610,43 @@ def _update(im, id_key, res):
     return im
 
 
-def _write_cds(fp, im, id_key, select=lambda x: x['type_'] == 'CDS'):
-    '''Return a fasta file of all the proteins of a sequence.
+def _write_cds(fp, cds, select=lambda x: True):
+    '''Write the proteins into a fasta file.
 
     Parameters
     ----------
     fp : str
-        The output file path
-    im : iterable of Feature
-    id_key : str
-        key in ``Feature`` to get its value as seq ID
+        The output file path. It is gzipped if the file suffix is ".gz".
+    cds : iterable of tuple of str
+        The ID and the sequence of each protein.
     select : callable
-        what CDS to write down.
+        what CDS to write down. It accepts the protein ID.
+
+    Returns
+    -------
+    int
+        The number of protein sequences written.
+    '''
+    n = 0
+    with _open(fp, 'w') as f:
+        for id, seq in cds:
+            if select(id):
+                _write_fasta(f, id, seq)
+                n += 1
+    return n
+
+
+def _get_uniref_db(kingdom, stats=None):
+    '''Return the UniRef partitions in the order to search.
+
+    Parameters
+    ----------
+    kingdom : str
+        The kingdom of the input genome.
+    stats : ``micronota.db._partition.PartitionStats`` or None
+        The statistics of the previous runs to order the partitions by.
+        The fixed order is used if it is ``None``.
     '''
-    with open(fp, 'w') as f:
-        for feature in im:
-            if select(feature):
-                pro = Sequence(
-                    feature['translation'], {'id': feature[id_key]})
-                pro.write(f, format='fasta')
-
-
-def _get_uniref_db(kingdom):
-    dbs = ['Swiss-Prot_Bacteria',
-           'Swiss-Prot_Archaea',
-           'Swiss-Prot_Viruses',
-           'Swiss-Prot_Eukaryota',
-           'Swiss-Prot_other',
-           'TrEMBL_Bacteria',
-           'TrEMBL_Archaea',
-           'TrEMBL_Viruses',
-           'TrEMBL_Eukaryota',
-           'TrEMBL_other',
-           '_other']
-    order = {'bacteria': range(11),
-             'archaea': [1, 0, 2, 3, 4, 6, 5, 7, 8, 9, 10],
-             'viruses': [2, 0, 1, 3, 4, 7, 5, 6, 8, 9, 10]}
-    return [dbs[i] for i in order[kingdom.lower()]]
+    if stats is None:
+        return fixed_order(kingdom)
+    return stats.order(kingdom)
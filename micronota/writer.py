@@ -0,0 +1,201 @@
+r'''
+Streaming writers
+=================
+
+.. currentmodule:: micronota.writer
+
+This module (:mod:`micronota.writer`) writes the annotated features in
+GenBank or GFF3 format directly from the annotation result (``dict`` of
+``Feature`` to intervals), one sequence at a time, without constructing
+an annotated ``skbio.Sequence`` object for each sequence.
+
+'''
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2015--, micronota development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from tempfile import TemporaryFile
+from shutil import copyfileobj
+
+
+def _sort_features(im):
+    '''Sort the features by their positions.'''
+    return sorted(im.items(), key=lambda x: (min(x[1]), x[0]['type_']))
+
+
+def _qualifiers(feature):
+    '''Return the qualifiers of a feature that should be written out.
+
+    The keys ending with "_" (e.g. "type_", "rc_") are internal
+    attributes and "location" is written out separately.
+    '''
+    for k in sorted(feature):
+        if k.endswith('_') or k == 'location':
+            continue
+        yield k, feature[k]
+
+
+class GenBankWriter(object):
+    '''Write the features and sequences in GenBank format.
+
+    Parameters
+    ----------
+    fh : file handle
+        Opened for writing in text mode.
+    sequence : bool
+        Whether to write the ORIGIN section.
+    '''
+    def __init__(self, fh, sequence=True):
+        self.fh = fh
+        self.sequence = sequence
+
+    def write(self, seq_id, im, seq=None):
+        '''Write a single record.
+
+        Parameters
+        ----------
+        seq_id : str
+            The sequence ID.
+        im : dict
+            dict of ``Feature`` to their intervals.
+        seq : str or None
+            The sequence.
+        '''
+        write = self.fh.write
+        if im:
+            # magic number 21: the amount of indentation before
+            # feature table starts as defined by INSDC
+            write('{:<21}Location/Qualifiers\n'.format('FEATURES'))
+            for feature, _ in _sort_features(im):
+                write('{:10}{:<11}{}\n'.format(
+                    '', feature['type_'], feature['location']))
+                for k, v in _qualifiers(feature):
+                    write('{:21}/{}={}\n'.format('', k, v))
+        if self.sequence and seq is not None:
+            self._write_origin(seq)
+        write('//\n')
+
+    def _write_origin(self, seq, line_size=60, frag_size=10):
+        write = self.fh.write
+        seq = seq.lower()
+        write('ORIGIN\n')
+        for i in range(0, len(seq), line_size):
+            line = seq[i:i+line_size]
+            frags = [line[j:j+frag_size]
+                     for j in range(0, len(line), frag_size)]
+            write('{:>9} {}\n'.format(i + 1, ' '.join(frags)))
+
+    def close(self):
+        pass
+
+
+def _phases(feature, intervals):
+    '''Return the GFF3 phase of each interval of a CDS.
+
+    The phase is the number of bases to skip at the 5' end of the
+    interval to reach the next codon, which depends on the bases used by
+    the intervals upstream of it and on the ``codon_start`` of a partial
+    CDS.
+    '''
+    # the intervals from the 5' end
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][0],
+                   reverse=bool(feature.get('rc_')))
+    used = 1 - int(feature.get('codon_start', 1))
+    phases = [None] * len(intervals)
+    for i in order:
+        start, end = intervals[i]
+        phases[i] = str(-used % 3)
+        used += end - start
+    return phases
+
+
+class GFF3Writer(object):
+    '''Write the features and sequences in GFF3 format.
+
+    The GFF3 spec requires the sequences to be in a ``##FASTA`` section at
+    the end of the file, so the sequences are spooled to a temporary file
+    and appended when the writer is closed.
+
+    Parameters
+    ----------
+    fh : file handle
+        Opened for writing in text mode.
+    sequence : bool
+        Whether to write the sequences in the ``##FASTA`` section.
+    '''
+    # GFF3 reserved attribute names for the qualifiers
+    _attr_names = {'id': 'ID', 'note': 'Note', 'db_xref': 'Dbxref'}
+
+    def __init__(self, fh, sequence=True):
+        self.fh = fh
+        self.sequence = sequence
+        self._spool = TemporaryFile('w+') if sequence else None
+        self.fh.write('##gff-version 3\n')
+
+    @staticmethod
+    def _escape(s):
+        s = str(s).strip('"')
+        for c in '%;=&,\t\n\r':
+            s = s.replace(c, '%%%02X' % ord(c))
+        return s
+
+    def write(self, seq_id, im, seq=None):
+        '''Write a single record.
+
+        Parameters
+        ----------
+        seq_id : str
+            The sequence ID.
+        im : dict
+            dict of ``Feature`` to their intervals.
+        seq : str or None
+            The sequence.
+        '''
+        write = self.fh.write
+        if seq is not None:
+            write('##sequence-region {} 1 {}\n'.format(seq_id, len(seq)))
+        for feature, intervals in _sort_features(im):
+            type_ = feature['type_']
+            strand = '-' if feature.get('rc_') else '+'
+            if type_ == 'CDS':
+                phases = _phases(feature, intervals)
+            else:
+                phases = ['.'] * len(intervals)
+            attrs = ';'.join(
+                '%s=%s' % (self._attr_names.get(k, k), self._escape(v))
+                for k, v in _qualifiers(feature))
+            for (start, end), phase in zip(intervals, phases):
+                write('\t'.join([seq_id, '.', type_, str(start + 1),
+                                 str(end), '.', strand, phase, attrs]))
+                write('\n')
+        if self._spool is not None and seq is not None:
+            self._spool.write('>%s\n' % seq_id)
+            for i in range(0, len(seq), 60):
+                self._spool.write(seq[i:i+60])
+                self._spool.write('\n')
+
+    def close(self):
+        if self._spool is not None:
+            if self._spool.tell() > 0:
+                self.fh.write('##FASTA\n')
+                self._spool.seek(0)
+                copyfileobj(self._spool, self.fh)
+            self._spool.close()
+            self._spool = None
+
+
+_WRITERS = {'genbank': GenBankWriter,
+            'gff3': GFF3Writer}
+
+
+def get_writer(fmt, fh, **kwargs):
+    '''Return the streaming writer for the output format.'''
+    try:
+        return _WRITERS[fmt](fh, **kwargs)
+    except KeyError:
+        raise ValueError('Unsupported output format: %s' % fmt)
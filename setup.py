@@ -66,6 +66,7 @@ setup(name='micronota',
       ],
       extras_require={'test': ["nose", "pep8", "flake8"],
                       'coverage': ["coverage"],
+                      'zstd': ["zstandard"],
                       'doc': ["Sphinx == 1.3.3"]},
       entry_points={
           'console_scripts': [